@@ -9,7 +9,8 @@ from pages.dashboard import dashboard_layout
 from pages.analytics import analytics_layout
 from pages.reports import reports_layout
 from pages.recommendations import recommendations_layout
-from core import register_callbacks, parks_df
+from core import register_callbacks, cache_stats, filter_parks, pin_data, start_refresher
+from src.db import pool_stats
 
 app = Dash(
     __name__,
@@ -17,6 +18,7 @@ app = Dash(
     suppress_callback_exceptions=True,
 )
 app.title = "Tourist Flow & Seasonality Analyzer"
+server = app.server  # WSGI entry point for gunicorn (see gunicorn.conf.py)
 app.index_string = INDEX_STRING
 
 sidebar = html.Div(
@@ -92,9 +94,11 @@ def render_page(pathname):
     Input("btn-download-csv", "n_clicks"),
     prevent_initial_call=True,
 )
+@pin_data
 def download_csv(n_clicks):
+    # every row (read from the database with PARKS_BACKEND=sql)
     return dcc.send_data_frame(
-        parks_df.to_csv,
+        filter_parks().to_csv,
         "all_parks_recreation_visits.csv",
         index=False,
     )
@@ -102,5 +106,18 @@ def download_csv(n_clicks):
 register_callbacks(app)
 
 
+@app.server.route("/_cache-stats")
+def cache_stats_route():
+    # hit / miss / eviction counters of the result and filter-context caches
+    return cache_stats()
+
+
+@app.server.route("/_db-stats")
+def db_stats_route():
+    # pool occupancy + checkout latency of this worker's DB engines
+    return {"engines": pool_stats()}
+
+
 if __name__ == "__main__":
+    start_refresher()  # PARKS_RELOAD_SECONDS; gunicorn starts it per worker
     app.run(host="0.0.0.0", port=8050, debug=False)
\ No newline at end of file
@@ -1,11 +1,18 @@
 # core.py
 
 import os
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cache, cached_property, wraps
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from dash import html
+from dash import Patch, html
+from dash.exceptions import PreventUpdate
 from dash.dependencies import Input, Output
 
 from theme import (
@@ -18,90 +25,20 @@ from theme import (
     CORAL,
     BUBBLE,
 )
-from src.db import get_engine  # <- IMPORTANT: use src.db, not db
-
-# =========================================================
-# DATA  (RDS with local CSV + forecast fallback)
-# =========================================================
-
-BASE_DIR = os.path.dirname(__file__)
-
-TABLE_NAME = "parks_visits"
-
-# 1) Try RDS first, otherwise use local CSV
-try:
-    engine = get_engine()
-    parks_df = pd.read_sql(f"SELECT * FROM {TABLE_NAME}", engine)
-except Exception as e:
-    print("WARNING: Could not connect to RDS, using local CSV instead.")
-    print("Reason:", repr(e))
-    local_csv = os.path.join(BASE_DIR, "all_parks_recreation_visits.csv")
-    parks_df = pd.read_csv(local_csv)
-
-# Mark all rows loaded so far as historical (not forecast)
-parks_df["IsForecast"] = False
-
-# 2) Load monthly_forecasts.csv and append FUTURE years only
-FORECAST_PATH = os.path.join(BASE_DIR, "monthly_forecasts.csv")
-
-if os.path.exists(FORECAST_PATH):
-    fc_df = pd.read_csv(FORECAST_PATH)
-
-    # Expected columns (from your screenshots):
-    # Park, Best_Model, Forecast_Month, Predicted_Visits,
-    # Unit Code, Park Type, Region, State, Year, Month, _source_file
-
-    # If Forecast_Month exists, convert to Year / Month
-    if "Forecast_Month" in fc_df.columns:
-        fc_df["Forecast_Month"] = pd.to_datetime(
-            fc_df["Forecast_Month"],
-            dayfirst=True,        # because it's like 01-01-2025
-            errors="coerce",
-        )
-        fc_df["Year"] = fc_df["Forecast_Month"].dt.year
-        fc_df["Month"] = fc_df["Forecast_Month"].dt.month
-
-    # Match visit column name
-    if "Predicted_Visits" in fc_df.columns:
-        fc_df = fc_df.rename(columns={"Predicted_Visits": "Recreation Visits"})
-
-    # Ensure required columns exist
-    required_cols = ["Park", "State", "Year", "Month", "Recreation Visits", "Park Type"]
-    for col in required_cols:
-        if col not in fc_df.columns:
-            fc_df[col] = np.nan
-
-    # Keep only years AFTER the last historical year
-    hist_latest = pd.to_numeric(parks_df["Year"], errors="coerce").max()
-    fc_df = fc_df[pd.to_numeric(fc_df["Year"], errors="coerce") > hist_latest]
-
-    # Mark as forecast
-    fc_df["IsForecast"] = True
-
-    # Align columns where possible and append
-    common_cols = list(set(parks_df.columns).intersection(fc_df.columns))
-    parks_df = pd.concat(
-        [parks_df, fc_df[common_cols]],
-        ignore_index=True,
-        sort=False,
-    )
-
-# =========================================================
-# CLEANING
-# =========================================================
-
-parks_df = parks_df.dropna(
-    subset=["State", "Park", "Month", "Year", "Recreation Visits"]
+from src.loader import (  # <- IMPORTANT: use src.*, not top-level modules
+    FORECAST_PATH,
+    forecast_rows,
+    load_parks_df,
+    local_fingerprint,
+    refresh_parks_df,
 )
-
-parks_df["State"] = parks_df["State"].astype(str).str.strip()
-parks_df["Park"] = parks_df["Park"].astype(str).str.strip()
-parks_df["Month"] = parks_df["Month"].astype(int)
-parks_df["Year"] = parks_df["Year"].astype(int)
-parks_df["Recreation Visits"] = parks_df["Recreation Visits"].astype(float)
-
-if "Park Type" not in parks_df.columns:
-    parks_df["Park Type"] = "Unknown"
+from src import duckdb_backend, snapshot, sql_backend
+from src.db import get_engine
+from src.selection import FilterEngine
+from src.cube import VisitCube
+from src.state_map import StateMap, STATUS_LABELS
+from src.cache import LRUCache
+from src.warm_cache import ResultStore
 
 # =========================================================
 # CONSTANTS / HELPERS
@@ -152,16 +89,167 @@ def map_region_group(state_code: str) -> str:
     return "Other"
 
 
-parks_df["RegionGroup"] = parks_df["State"].map(map_region_group)
+# =========================================================
+# DATA  (RDS with local CSV + forecast fallback)
+# =========================================================
+
+# Loading, forecast merge and cleaning live in src.loader; the cleaned frame
+# is cached as a versioned Parquet snapshot keyed by the source data hash.
+#
+# PARKS_BACKEND picks where the rollups run:
+#   memory - parks_df is loaded and rolled up in an in-memory cube (default)
+#   sql    - the filters and rollups are pushed down to PostgreSQL
+#            (src/sql_backend.py); only the forecast rows are held in memory
+#   duckdb - the same SQL runs on an embedded DuckDB over the local Parquet
+#            dataset / CSV (src/duckdb_backend.py), no server needed
+BACKEND = os.getenv("PARKS_BACKEND", "memory")
+
+
+def add_region_group(parks_df):
+    parks_df["RegionGroup"] = parks_df["State"].map(map_region_group).astype("category")
+    return parks_df
+
+
+class DataBundle:
+    """
+    One loaded dataset and everything derived from it. Built whole, off the
+    request path, and swapped in as a unit by reload_data().
+
+    Built from parks_df (memory backend) or from a pushdown backend with
+    the same totals / status / top_parks API (parks_df is then None).
+    """
+
+    def __init__(self, parks_df=None, backend=None):
+        self.parks_df = parks_df
+        self.filters = None
+        self.cube = None
+        if backend is None:
+            add_region_group(parks_df)
+            # Snapshot key of the loaded data; part of every result-cache key.
+            self.version = parks_df.attrs.get("data_version", "")
+            self.years = sorted(parks_df["Year"].unique())
+            self.park_types = sorted(parks_df["Park Type"].dropna().unique())
+
+            # Masks per filter value are built once and ANDed per request;
+            # builders aggregate at the returned row positions instead of
+            # copying parks_df.
+            self.filters = FilterEngine(parks_df, REGIONS)
+
+            # Every builder / KPI reads rollups of the [park, year, month] cube.
+            self.cube = backend = VisitCube(parks_df, REGIONS)
+
+            # Per-state status tables + top parks for the choropleth (see
+            # src/state_map.py)
+            self.state_map = StateMap(self.cube, state_codes)
+        else:
+            self.version = backend.version
+            self.years = list(backend.years)
+            self.park_types = list(backend.park_types)
+            self.state_map = backend
+
+        # totals() for every builder / KPI
+        self.backend = backend
+        self.latest_year = max(self.years) if self.years else 0
+
+        # A park type fixes the destination class, so a matching destination
+        # filter selects the same rows as no destination filter (see
+        # context_key).
+        self.park_type_dest = {
+            ptype: "National Park" if is_np else "City"
+            for ptype, is_np in zip(backend.park_type, backend.park_is_np)
+        }
+
+        # Precomputed results for this data version (python -m
+        # src.warm_cache); None when no store has been built.
+        self.warm_store = ResultStore.open(self.version)
+
+        # Initial page figures (see initial_figures)
+        self.initial = None
+
+
+def _forecast_overlay(hist_latest):
+    overlay = forecast_rows(hist_latest)
+    return None if overlay is None else add_region_group(overlay)
+
+
+def load_bundle(loaded_version=None, previous=None):
+    """
+    DataBundle for the configured backend, or None when the source data is
+    still at loaded_version (pass the live version to poll for changes).
+    previous is the live parks_df, which a memory-mode refresh from RDS
+    only merges the changed rows into (see src/loader.py).
+    """
+    if BACKEND in ("sql", "duckdb"):
+        forecasts_fp = snapshot.file_fingerprint(FORECAST_PATH)
+        if BACKEND == "duckdb":
+            version = snapshot.snapshot_key(local_fingerprint(), forecasts_fp)
+            if version == loaded_version:
+                return None
+            engine = duckdb_backend.connect_local()
+            backend_cls = duckdb_backend.DuckDbBackend
+        else:
+            engine = get_engine()
+            version = sql_backend.data_version(engine, forecasts_fp)
+            if version == loaded_version:
+                return None
+            backend_cls = sql_backend.SqlBackend
+        backend = backend_cls(engine, REGIONS, state_codes, version, _forecast_overlay)
+        return DataBundle(backend=backend)
+
+    parks_df = refresh_parks_df(loaded_version, previous)
+    return None if parks_df is None else DataBundle(parks_df)
+
+
+def _initial_bundle():
+    if BACKEND != "memory":
+        try:
+            return load_bundle()
+        except Exception as e:
+            print(f"WARNING: Could not open the {BACKEND} backend, loading data into memory instead.")
+            print("Reason:", repr(e))
+    return DataBundle(load_parks_df())
 
-YEARS = sorted(parks_df["Year"].unique())
-LATEST_YEAR = max(YEARS) if YEARS else 0
+
+# The live bundle. Replaced by a single assignment, so a reader sees either
+# the old or the new data, never a mix.
+DATA = _initial_bundle()
+
+# Bundle pinned for the current callback (see pin_data)
+_PINNED = ContextVar("pinned_data", default=None)
+
+
+def current() -> DataBundle:
+    """The bundle to read from: the one pinned for this callback, else DATA."""
+    return _PINNED.get() or DATA
+
+
+@contextmanager
+def using(data: DataBundle):
+    """Read from `data` inside the block, whatever DATA is swapped to."""
+    token = _PINNED.set(data)
+    try:
+        yield data
+    finally:
+        _PINNED.reset(token)
+
+
+def pin_data(fn):
+    """
+    Run a callback against the bundle that was live when it started, so a
+    reload in the middle of it cannot mix old and new data.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with using(current()):
+            return fn(*args, **kwargs)
+    return wrapper
 
 # ===============
 # FILTERING
 # ===============
 
-def filter_parks(
+
+def filter_positions(
     month_val=None,
     year_val=None,
     region_val=None,
@@ -170,94 +258,243 @@ def filter_parks(
 ):
     """
     Common filter used by ALL charts / KPIs.
-    Month + Year + Region + Destination + Park Type.
+    Month + Year + Region + Destination + Park Type -> row positions in parks_df.
+    """
+    return current().filters.positions(month_val, year_val, region_val, dest_val, park_type_val)
+
+
+def filter_parks(
+    month_val=None,
+    year_val=None,
+    region_val=None,
+    dest_val=None,
+    park_type_val=None,
+):
+    """
+    Filtered rows as a DataFrame (only the selected rows are materialized).
+    """
+    data = current()
+    if data.filters is None:
+        return data.backend.rows(month_val, year_val, region_val, dest_val, park_type_val)
+    pos = filter_positions(month_val, year_val, region_val, dest_val, park_type_val)
+    return data.parks_df.take(pos)
+
+# ===============
+# AGGREGATION
+# ===============
+
+def totals(
+    keys,
+    month_val=None,
+    year_val=None,
+    region_val=None,
+    dest_val=None,
+    park_type_val=None,
+):
+    """
+    Visits summed by `keys` (Park / State / RegionGroup / Year / Month)
+    under the common filters. Same rows as
+    filter_parks(...).groupby(keys, as_index=False)["Recreation Visits"].sum().
     """
-    df = parks_df.copy()
+    return current().backend.totals(keys, month_val, year_val, region_val, dest_val, park_type_val)
 
-    if year_val is not None:
-        df = df[df["Year"] == int(year_val)]
 
-    if month_val is not None:
-        df = df[df["Month"] == int(month_val)]
+def _sum_by(frame, keys):
+    return frame.groupby(keys, as_index=False)["Recreation Visits"].sum()
 
-    if region_val and region_val != "All":
-        allowed = set(REGIONS.get(region_val, []))
-        df = df[df["State"].isin(allowed)]
+# ===============
+# FILTER CONTEXT
+# ===============
 
-    if dest_val == "National Park":
-        df = df[df["Park Type"].str.contains("National Park", case=False, na=False)]
-    elif dest_val == "City":
-        df = df[~df["Park Type"].str.contains("National Park", case=False, na=False)]
+def context_key(month_val, year_val, region_val, dest_val, park_type_val):
+    """
+    Normalized filter tuple; equivalent dropdown states map to the same key.
+    """
+    dest_val = dest_val if dest_val in ("National Park", "City") else "State"
+    park_type_val = park_type_val or "All"
+    if current().park_type_dest.get(park_type_val) == dest_val:
+        dest_val = "State"
+    return (
+        None if month_val is None else int(month_val),
+        None if year_val is None else int(year_val),
+        region_val or "All",
+        dest_val,
+        park_type_val,
+    )
 
-    if park_type_val and park_type_val != "All":
-        df = df[df["Park Type"] == park_type_val]
 
-    return df
+class FilterContext:
+    """
+    Aggregates shared by the storyline, KPIs and analytics charts for
+    one filter tuple. Each one is a single cube rollup computed on first
+    use; builders derive their series from these small frames.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        (
+            self.month_val,
+            self.year_val,
+            self.region_val,
+            self.dest_val,
+            self.park_type_val,
+        ) = key
+
+    def _totals(self, keys, month_val, year_val):
+        return totals(
+            keys, month_val, year_val, self.region_val, self.dest_val, self.park_type_val
+        )
+
+    @cached_property
+    def month_parks(self):
+        """(State, Park) totals for the selected month + year."""
+        return self._totals(["State", "Park"], self.month_val, self.year_val)
+
+    @cached_property
+    def year_parks(self):
+        """(Park, State, RegionGroup, Month) totals for the selected year."""
+        return self._totals(["Park", "State", "RegionGroup", "Month"], None, self.year_val)
+
+    @cached_property
+    def month_by_year(self):
+        """(Year, Park) totals for the selected month across all years."""
+        return self._totals(["Year", "Park"], self.month_val, None)
+
+    @cached_property
+    def yearly(self):
+        """Year totals across all years and months."""
+        return self._totals(["Year"], None, None)
+
+    @cached_property
+    def kpis(self):
+        return compute_kpis(*self.key, ctx=self)
+
+    def compute(self):
+        """Run every shared aggregate now (done once per filter change)."""
+        for name in ("month_parks", "year_parks", "month_by_year", "yearly", "kpis"):
+            getattr(self, name)
+        return self
+
+
+# Server-side store behind the "filter-context" dcc.Store; the browser
+# only holds the key.
+CONTEXT_CACHE_SIZE = 128
+CONTEXTS = LRUCache(max_entries=CONTEXT_CACHE_SIZE)
+
+
+def filter_context(
+    month_val=None,
+    year_val=None,
+    region_val=None,
+    dest_val=None,
+    park_type_val=None,
+):
+    key = context_key(month_val, year_val, region_val, dest_val, park_type_val)
+    # versioned so a context built from replaced data is never handed out
+    return CONTEXTS.get_or_compute(
+        (current().version,) + key, lambda: FilterContext(key)
+    )
+
+
+def clear_filter_contexts():
+    CONTEXTS.clear()
+
+# ===============
+# RESULT CACHE
+# ===============
+
+# Chart trace updates / KPI dicts, keyed by (function, data version,
+# normalized filter tuple). Bounded by entry count and approximate size.
+RESULT_CACHE = LRUCache(
+    max_entries=int(os.getenv("RESULT_CACHE_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("RESULT_CACHE_MB", "256")) * 1024 * 1024,
+)
+
+FILTER_ARGS = ("month_val", "year_val", "region_val", "dest_val", "park_type_val")
+
+# function name -> cached wrapper (enumerated by src.warm_cache)
+CACHED_BUILDERS = {}
+
+
+def cached_result(ignore=()):
+    """
+    Memoize a chart-data / KPI function in RESULT_CACHE, reading through
+    the bundle's warm store on a miss. Filter arguments are normalized with context_key;
+    arguments in `ignore` (or missing from the signature) are left out of
+    the key so e.g. month-independent charts share entries. `ctx` is never
+    part of the key.
+    """
+    def decorator(fn):
+        sig = inspect.signature(fn)
+        filter_args = [a for a in FILTER_ARGS if a in sig.parameters]
+        used = [a for a in filter_args if a not in ignore]
+
+        def cache_key(**filters):
+            key = context_key(*(filters.get(a) for a in FILTER_ARGS))
+            return tuple(v if a in used else None for a, v in zip(FILTER_ARGS, key))
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs).arguments
+            key = cache_key(**bound)
+
+            data = current()
+
+            def compute():
+                if data.warm_store is not None:
+                    stored = data.warm_store.get(fn.__name__, key)
+                    if stored is not None:
+                        return stored
+                return fn(*args, **kwargs)
+
+            return RESULT_CACHE.get_or_compute((fn.__name__, data.version) + key, compute)
+
+        wrapper.uncached = fn
+        wrapper.cache_key = cache_key
+        wrapper.filter_args = filter_args
+        CACHED_BUILDERS[fn.__name__] = wrapper
+        return wrapper
+    return decorator
+
+
+def invalidate_caches():
+    """Drop every cached context and result (call after the data changes)."""
+    clear_filter_contexts()
+    RESULT_CACHE.clear()
+
+
+def cache_stats() -> dict:
+    data = current()
+    return {
+        "data_version": data.version,
+        "warm_store": data.warm_store.path if data.warm_store is not None else None,
+        "results": RESULT_CACHE.stats(),
+        "contexts": CONTEXTS.stats(),
+    }
 
 # ==============
 # MAP HELPERS
 # ==============
 
 def classify_state_status(month_val, year_val, region_val, dest_val, park_type_val):
-    df = filter_parks(month_val, year_val, region_val, dest_val, park_type_val)
-    if df.empty:
-        return {s: "Normal" for s in state_codes}
-
-    grouped = df.groupby("State", as_index=False)["Recreation Visits"].sum()
-    q_off = grouped["Recreation Visits"].quantile(0.33)
-    q_hot = grouped["Recreation Visits"].quantile(0.66)
-
-    status = {}
-    for _, row in grouped.iterrows():
-        v = row["Recreation Visits"]
-        if v >= q_hot:
-            seg = "Hotspot"
-        elif v <= q_off:
-            seg = "Off-Season"
-        else:
-            seg = "Normal"
-        status[row["State"]] = seg
-
-    for s in state_codes:
-        status.setdefault(s, "Normal")
-
-    return status
+    codes = current().state_map.status(month_val, year_val, region_val, dest_val, park_type_val)
+    return dict(zip(state_codes, STATUS_LABELS[codes]))
 
 
 def build_base_map_df(month_val, year_val, region_val, dest_val, park_type_val):
-    status_map = classify_state_status(month_val, year_val, region_val, dest_val, park_type_val)
+    codes = current().state_map.status(month_val, year_val, region_val, dest_val, park_type_val)
+    top_parks = current().state_map.top_parks(month_val, year_val, region_val, dest_val, park_type_val)
     df = pd.DataFrame(
         {
             "state": state_codes,
             "state_name": [STATE_NAME_MAP[s] for s in state_codes],
-            "lift": [status_map[s] for s in state_codes],
+            "lift": STATUS_LABELS[codes],
         }
     )
     df["lift"] = pd.Categorical(
         df["lift"], categories=CATEGORY_ORDER["lift"], ordered=True
     )
-
-    df_month = filter_parks(month_val, year_val, region_val, dest_val, park_type_val)
-    if df_month.empty:
-        df["hover_parks"] = "No park data"
-        return df
-
-    grouped = df_month.groupby(["State", "Park"], as_index=False)["Recreation Visits"].sum()
-    top_by_state = (
-        grouped.sort_values("Recreation Visits", ascending=False)
-        .groupby("State")["Park"]
-        .apply(list)
-        .to_dict()
-    )
-
-    hover = []
-    for _, row in df.iterrows():
-        parks = top_by_state.get(row["state"], [])
-        if not parks:
-            hover.append("No park data")
-        else:
-            hover.append(", ".join(parks[:5]))
-    df["hover_parks"] = hover
+    df["hover_parks"] = [", ".join(parks) if parks else "No park data" for parks in top_parks]
     return df
 
 
@@ -276,30 +513,66 @@ def _common_layout(fig):
     fig.update_yaxes(showgrid=False, zeroline=False, showline=False)
     return fig
 
+# ===============
+# FIGURE SHELLS
+# ===============
 
-def build_map(df):
-    fig = px.choropleth(
-        df,
-        locations="state",
-        locationmode="USA-states",
-        color="lift",
-        custom_data=["lift", "state_name", "hover_parks"],
-        color_discrete_map=COLOR_MAP,
-        category_orders=CATEGORY_ORDER,
-        scope="usa",
-        hover_name="state_name",
-        hover_data={
-            "state": False,
-            "state_name": False,
-            "lift": True,
-            "hover_parks": False,
-        },
-        labels={"lift": "Status"},
-    )
+# Every chart is a static shell (layout, trace styling, hover templates;
+# built once) plus a short list of per-trace data updates computed from the
+# filters. Callbacks send only the updates, as a Dash Patch; full figures
+# are assembled for the initial page layouts.
+
+def figure_from(shell, traces):
+    """Full figure: a copy of `shell` with the per-trace updates applied."""
+    fig = go.Figure(shell)
+    for i, props in enumerate(traces):
+        fig.data[i].update(props)
+    return fig
+
+
+def patch_from(traces):
+    """Dash Patch replacing just the data arrays of an existing figure."""
+    patch = Patch()
+    for i, props in enumerate(traces):
+        for prop, value in props.items():
+            patch["data"][i][prop] = value
+    return patch
+
+
+def _floats(values):
+    return [float(v) for v in values]
+
+
+@cache
+def map_shell():
+    # One trace per status, in legend order, so a status with no states
+    # still has a trace to patch.
+    fig = go.Figure()
+    for status in CATEGORY_ORDER["lift"]:
+        color = COLOR_MAP[status]
+        fig.add_trace(
+            go.Choropleth(
+                locations=[],
+                z=[],
+                customdata=[],
+                locationmode="USA-states",
+                colorscale=[[0.0, color], [1.0, color]],
+                showscale=False,
+                showlegend=True,
+                name=status,
+                legendgroup=status,
+                hovertemplate=(
+                    "<b>%{customdata[1]}</b>"
+                    "<br>Status: %{customdata[0]}"
+                    "<br>Top parks: %{customdata[2]}<extra></extra>"
+                ),
+            )
+        )
     fig.update_layout(
         paper_bgcolor="rgba(0,0,0,0)",
         plot_bgcolor="rgba(0,0,0,0)",
         geo=dict(
+            scope="usa",
             bgcolor="rgba(0,0,0,0)",
             showlakes=False,
             showland=True,
@@ -321,28 +594,79 @@ def build_map(df):
             font_color="#ffffff",
         ),
     )
-    fig.update_traces(
-        hovertemplate=(
-            "<b>%{customdata[1]}</b>"
-            "<br>Status: %{customdata[0]}"
-            "<br>Top parks: %{customdata[2]}<extra></extra>"
+    return fig
+
+
+def map_traces_from_df(df):
+    traces = []
+    for status in CATEGORY_ORDER["lift"]:
+        rows = df[df["lift"] == status]
+        traces.append(
+            {
+                "locations": rows["state"].tolist(),
+                "z": [1] * len(rows),
+                "customdata": rows[["lift", "state_name", "hover_parks"]].astype(str).values.tolist(),
+            }
         )
+    return traces
+
+
+def build_map(df):
+    return figure_from(map_shell(), map_traces_from_df(df))
+
+
+@cached_result()
+def map_traces(month_val, year_val, region_val, dest_val, park_type_val):
+    return map_traces_from_df(
+        build_base_map_df(month_val, year_val, region_val, dest_val, park_type_val)
     )
-    return fig
+
+
+def build_us_map(month_val, year_val, region_val, dest_val, park_type_val):
+    return figure_from(map_shell(), map_traces(month_val, year_val, region_val, dest_val, park_type_val))
 
 # =====================
 # ANALYTICS FIGURES
 # =====================
 
-def build_heatmap_real(month_val, year_val, region_val, dest_val, park_type_val):
+HEAT_REGIONS = ["East Coast", "Mountain", "South", "West"]
+SEASONS = ["Spring", "Summer", "Fall", "Winter"]
+
+
+@cache
+def heatmap_shell():
+    pivot = pd.DataFrame(
+        0.0,
+        index=pd.Index(HEAT_REGIONS, name="RegionGroup"),
+        columns=pd.Index(SEASONS, name="Season"),
+    )
+    fig = px.imshow(
+        pivot,
+        color_continuous_scale="Blues",
+        aspect="auto",
+        labels=dict(color="Visits"),
+        text_auto=False,
+    )
+    fig = _common_layout(fig)
+    fig.update_layout(
+        coloraxis_colorbar=dict(
+            title="Visits",
+        )
+    )
+    fig.update_xaxes(title="", type="category")
+    fig.update_yaxes(title="", type="category")
+    return fig
+
+
+@cached_result(ignore=("month_val",))
+def heatmap_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
     """
     Region–Season heatmap for ALL months in the selected year.
     """
-    df = filter_parks(None, year_val, region_val, dest_val, park_type_val)
+    ctx = ctx or filter_context(month_val, year_val, region_val, dest_val, park_type_val)
+    df = _sum_by(ctx.year_parks, ["RegionGroup", "Month"])
     if df.empty:
-        order_regions = ["East Coast", "Mountain", "South", "West"]
-        seasons = ["Spring", "Summer", "Fall", "Winter"]
-        pivot = pd.DataFrame(0, index=order_regions, columns=seasons)
+        pivot = pd.DataFrame(0, index=HEAT_REGIONS, columns=SEASONS)
     else:
         def month_to_season(m):
             if m in [3, 4, 5]:
@@ -353,46 +677,30 @@ def build_heatmap_real(month_val, year_val, region_val, dest_val, park_type_val)
                 return "Fall"
             return "Winter"
 
+        # Totals come per (region, month); fold months into seasons
         df["Season"] = df["Month"].apply(month_to_season)
         agg = df.groupby(["RegionGroup", "Season"], as_index=False)["Recreation Visits"].sum()
         agg = agg[agg["RegionGroup"] != "Other"]
 
-        order_regions = ["East Coast", "Mountain", "South", "West"]
-        seasons = ["Spring", "Summer", "Fall", "Winter"]
-
         pivot = (
             agg.pivot(index="RegionGroup", columns="Season", values="Recreation Visits")
-            .reindex(index=order_regions, columns=seasons)
+            .reindex(index=HEAT_REGIONS, columns=SEASONS)
             .fillna(0.0)
         )
 
-    fig = px.imshow(
-        pivot,
-        color_continuous_scale="Blues",
-        aspect="auto",
-        labels=dict(color="Visits"),
-        text_auto=False,
-    )
-    fig = _common_layout(fig)
-    fig.update_layout(
-        coloraxis_colorbar=dict(
-            title="Visits",
-        )
-    )
-    fig.update_xaxes(title="", type="category")
-    fig.update_yaxes(title="", type="category")
-    return fig
+    return [{"z": pivot.to_numpy(dtype=float).tolist()}]
 
 
-def build_dashboard_sparkline(year_val, region_val, dest_val, park_type_val):
-    df = filter_parks(None, year_val, region_val, dest_val, park_type_val)
-    if df.empty:
-        visits = np.zeros(12)
-    else:
-        agg = df.groupby("Month", as_index=False)["Recreation Visits"].sum().set_index("Month")
-        visits = [agg["Recreation Visits"].get(m, 0.0) for m in range(1, 13)]
+def build_heatmap_real(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    return figure_from(
+        heatmap_shell(),
+        heatmap_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=ctx),
+    )
+
 
-    dfl = pd.DataFrame({"MonthName": ALL_MONTHS, "Visits": visits})
+@cache
+def sparkline_shell():
+    dfl = pd.DataFrame({"MonthName": ALL_MONTHS, "Visits": np.zeros(12)})
     fig = px.line(dfl, x="MonthName", y="Visits", markers=True)
     fig = _common_layout(fig)
     fig.update_traces(
@@ -407,23 +715,28 @@ def build_dashboard_sparkline(year_val, region_val, dest_val, park_type_val):
     return fig
 
 
-def build_yearly_trend_overall(month_val, year_val, region_val, dest_val, park_type_val):
-    """
-    Yearly visitors trend for the selected MONTH across years.
-    """
-    df = filter_parks(month_val, None, region_val, dest_val, park_type_val)
-    if df.empty:
-        agg = pd.DataFrame({"Year": [], "Recreation Visits": []})
+@cached_result()
+def sparkline_traces(year_val, region_val, dest_val, park_type_val, ctx=None):
+    ctx = ctx or filter_context(None, year_val, region_val, dest_val, park_type_val)
+    agg = _sum_by(ctx.year_parks, "Month")
+    if agg.empty:
+        visits = np.zeros(12)
     else:
-        agg = (
-            df.groupby("Year", as_index=False)["Recreation Visits"]
-            .sum()
-            .sort_values("Year")
-        )
-        if year_val is not None and len(agg):
-            agg = agg[agg["Year"] <= int(year_val)]
+        agg = agg.set_index("Month")
+        visits = [agg["Recreation Visits"].get(m, 0.0) for m in range(1, 13)]
+    return [{"y": _floats(visits)}]
+
+
+def build_dashboard_sparkline(year_val, region_val, dest_val, park_type_val, ctx=None):
+    return figure_from(
+        sparkline_shell(),
+        sparkline_traces(year_val, region_val, dest_val, park_type_val, ctx=ctx),
+    )
 
-    fig = px.line(agg, x="Year", y="Recreation Visits")
+
+@cache
+def trend_shell():
+    fig = px.line(pd.DataFrame({"Year": [], "Recreation Visits": []}), x="Year", y="Recreation Visits")
     fig = _common_layout(fig)
     fig.update_traces(
         mode="lines",
@@ -435,20 +748,33 @@ def build_yearly_trend_overall(month_val, year_val, region_val, dest_val, park_t
     return fig
 
 
-def build_top5_parks(month_val, year_val, region_val, dest_val, park_type_val):
-    df = filter_parks(month_val, year_val, region_val, dest_val, park_type_val)
-    if df.empty:
-        parks = pd.DataFrame({"Park": ["—"], "Recreation Visits": [0.0]})
+@cached_result()
+def trend_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    """
+    Yearly visitors trend for the selected MONTH across years.
+    """
+    ctx = ctx or filter_context(month_val, year_val, region_val, dest_val, park_type_val)
+    agg = _sum_by(ctx.month_by_year, "Year")
+    if agg.empty:
+        agg = pd.DataFrame({"Year": [], "Recreation Visits": []})
     else:
-        agg = (
-            df.groupby("Park", as_index=False)["Recreation Visits"]
-            .sum()
-            .sort_values("Recreation Visits", ascending=False)
-            .head(5)
-        )
-        parks = agg
+        agg = agg.sort_values("Year")
+        if year_val is not None and len(agg):
+            agg = agg[agg["Year"] <= int(year_val)]
+
+    return [{"x": agg["Year"].tolist(), "y": _floats(agg["Recreation Visits"])}]
+
+
+def build_yearly_trend_overall(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    return figure_from(
+        trend_shell(),
+        trend_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=ctx),
+    )
 
-    parks["ParkShort"] = parks["Park"].str.slice(0, 22)
+
+@cache
+def top5_shell():
+    parks = pd.DataFrame({"ParkShort": [], "Park": [], "Recreation Visits": []})
     fig = px.pie(
         parks,
         names="ParkShort",
@@ -473,35 +799,47 @@ def build_top5_parks(month_val, year_val, region_val, dest_val, park_type_val):
     return fig
 
 
-def build_top_states(month_val, year_val, region_val, dest_val, park_type_val):
-    """
-    Top park per year – AREA chart.
-    Uses selected MONTH so month dropdown also affects this.
-    """
-    df = filter_parks(month_val, None, region_val, dest_val, park_type_val)
-    if df.empty:
-        yearly = pd.DataFrame(
-            {"Year": [0], "Recreation Visits": [0.0], "TopPark": ["—"]}
-        )
+@cached_result()
+def top5_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    ctx = ctx or filter_context(month_val, year_val, region_val, dest_val, park_type_val)
+    agg = _sum_by(ctx.month_parks, "Park")
+    if agg.empty:
+        parks = pd.DataFrame({"Park": ["—"], "Recreation Visits": [0.0]})
     else:
-        yearly_park = df.groupby(["Year", "Park"], as_index=False)["Recreation Visits"].sum()
-        yearly = (
-            yearly_park.sort_values("Recreation Visits", ascending=False)
-            .groupby("Year", as_index=False)
-            .first()
-            .sort_values("Year")
+        agg = (
+            agg.sort_values("Recreation Visits", ascending=False)
+            .head(5)
         )
-        yearly = yearly.rename(columns={"Park": "TopPark"})
+        parks = agg
+
+    visits = _floats(parks["Recreation Visits"])
+    return [
+        {
+            "labels": parks["Park"].str.slice(0, 22).tolist(),
+            "values": visits,
+            "customdata": [[p, v] for p, v in zip(parks["Park"], visits)],
+        }
+    ]
+
+
+def build_top5_parks(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    return figure_from(
+        top5_shell(),
+        top5_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=ctx),
+    )
 
+
+@cache
+def top_states_shell():
     fig = go.Figure()
     fig.add_trace(
         go.Scatter(
-            x=yearly["Year"],
-            y=yearly["Recreation Visits"],
+            x=[],
+            y=[],
             mode="lines",
             fill="tozeroy",
             line=dict(color=BUBBLE, width=2),
-            customdata=yearly["TopPark"],
+            customdata=[],
             hovertemplate=(
                 "<b>%{x}</b><br>Top park: %{customdata}"
                 "<br>Visits: %{y:,.0f}<extra></extra>"
@@ -515,24 +853,46 @@ def build_top_states(month_val, year_val, region_val, dest_val, park_type_val):
     return fig
 
 
-def build_active_parks_per_year(month_val, year_val, region_val, dest_val, park_type_val):
+@cached_result(ignore=("year_val",))
+def top_states_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
     """
-    Number of active parks per year for the selected MONTH.
+    Top park per year – AREA chart.
+    Uses selected MONTH so month dropdown also affects this.
     """
-    df = filter_parks(month_val, None, region_val, dest_val, park_type_val)
-    if df.empty:
-        agg = pd.DataFrame({"Year": [], "ActiveParks": []})
+    ctx = ctx or filter_context(month_val, year_val, region_val, dest_val, park_type_val)
+    yearly_park = ctx.month_by_year
+    if yearly_park.empty:
+        yearly = pd.DataFrame(
+            {"Year": [0], "Recreation Visits": [0.0], "TopPark": ["—"]}
+        )
     else:
-        agg = (
-            df.groupby(["Year"])["Park"]
-            .nunique()
-            .reset_index(name="ActiveParks")
+        yearly = (
+            yearly_park.sort_values("Recreation Visits", ascending=False)
+            .groupby("Year", as_index=False)
+            .first()
             .sort_values("Year")
         )
-        if year_val is not None and len(agg):
-            agg = agg[agg["Year"] <= int(year_val)]
+        yearly = yearly.rename(columns={"Park": "TopPark"})
+
+    return [
+        {
+            "x": yearly["Year"].tolist(),
+            "y": _floats(yearly["Recreation Visits"]),
+            "customdata": yearly["TopPark"].tolist(),
+        }
+    ]
+
+
+def build_top_states(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    return figure_from(
+        top_states_shell(),
+        top_states_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=ctx),
+    )
 
-    fig = px.line(agg, x="Year", y="ActiveParks")
+
+@cache
+def active_parks_shell():
+    fig = px.line(pd.DataFrame({"Year": [], "ActiveParks": []}), x="Year", y="ActiveParks")
     fig = _common_layout(fig)
     fig.update_traces(
         mode="lines",
@@ -544,40 +904,53 @@ def build_active_parks_per_year(month_val, year_val, region_val, dest_val, park_
     return fig
 
 
-def build_avg_spend_per_state(month_val, year_val, region_val, dest_val, park_type_val):
-    df = filter_parks(month_val, year_val, region_val, dest_val, park_type_val)
-    if df.empty:
-        states = pd.DataFrame({"State": ["—"], "Recreation Visits": [0.0]})
+@cached_result()
+def active_parks_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    """
+    Number of active parks per year for the selected MONTH.
+    """
+    ctx = ctx or filter_context(month_val, year_val, region_val, dest_val, park_type_val)
+    agg = ctx.month_by_year
+    if agg.empty:
+        agg = pd.DataFrame({"Year": [], "ActiveParks": []})
     else:
-        states = df.groupby("State", as_index=False)["Recreation Visits"].sum()
+        agg = (
+            agg.groupby(["Year"])["Park"]
+            .nunique()
+            .reset_index(name="ActiveParks")
+            .sort_values("Year")
+        )
+        if year_val is not None and len(agg):
+            agg = agg[agg["Year"] <= int(year_val)]
 
-    if states["Recreation Visits"].max() > 0:
-        visits = states["Recreation Visits"]
-        norm = (visits - visits.min()) / (visits.max() - visits.min() + 1e-9)
-        states["AvgSpend"] = 80 + norm * 120.0  # $80–$200
-    else:
-        states["AvgSpend"] = 0.0
+    return [{"x": agg["Year"].tolist(), "y": agg["ActiveParks"].tolist()}]
+
+
+def build_active_parks_per_year(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    return figure_from(
+        active_parks_shell(),
+        active_parks_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=ctx),
+    )
 
-    states["StateName"] = states["State"].map(STATE_NAME_MAP).fillna(states["State"])
-    states = states.sort_values("AvgSpend", ascending=False).head(10)
 
+@cache
+def avg_spend_shell():
+    states = pd.DataFrame({"AvgSpend": [], "StateName": []})
     fig = px.bar(
         states,
         x="AvgSpend",
         y="StateName",
         orientation="h",
-        text="AvgSpend",
     )
     fig = _common_layout(fig)
     fig.update_traces(
-        texttemplate="$%{text:.0f}",
+        texttemplate="$%{x:.0f}",  # bar label = its length, so no text array
         textposition="outside",
         marker=dict(line=dict(width=0)),
         hovertemplate=(
             "<b>%{y}</b><br>Avg spend: $%{x:.0f}"
             "<br>Visits index: %{customdata}<extra></extra>"
         ),
-        customdata=states["Recreation Visits"],
     )
     fig.update_layout(
         showlegend=False,
@@ -590,6 +963,39 @@ def build_avg_spend_per_state(month_val, year_val, region_val, dest_val, park_ty
     fig.update_yaxes(title="", showgrid=False)
     return fig
 
+
+@cached_result()
+def avg_spend_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    ctx = ctx or filter_context(month_val, year_val, region_val, dest_val, park_type_val)
+    states = _sum_by(ctx.month_parks, "State")
+    if states.empty:
+        states = pd.DataFrame({"State": ["—"], "Recreation Visits": [0.0]})
+
+    if states["Recreation Visits"].max() > 0:
+        visits = states["Recreation Visits"]
+        norm = (visits - visits.min()) / (visits.max() - visits.min() + 1e-9)
+        states["AvgSpend"] = 80 + norm * 120.0  # $80–$200
+    else:
+        states["AvgSpend"] = 0.0
+
+    states["StateName"] = states["State"].map(STATE_NAME_MAP).fillna(states["State"])
+    states = states.sort_values("AvgSpend", ascending=False).head(10)
+
+    return [
+        {
+            "x": _floats(states["AvgSpend"]),
+            "y": states["StateName"].tolist(),
+            "customdata": _floats(states["Recreation Visits"]),
+        }
+    ]
+
+
+def build_avg_spend_per_state(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
+    return figure_from(
+        avg_spend_shell(),
+        avg_spend_traces(month_val, year_val, region_val, dest_val, park_type_val, ctx=ctx),
+    )
+
 # ===========
 # KPIs
 # ===========
@@ -604,31 +1010,31 @@ def fmt_millions(val: float) -> str:
     return f"{val:.0f}"
 
 
-def compute_kpis(month_val, year_val, region_val, dest_val, park_type_val):
+@cached_result()
+def compute_kpis(month_val, year_val, region_val, dest_val, park_type_val, ctx=None):
     month_int = int(month_val)
     year_int = int(year_val)
+    ctx = ctx or filter_context(month_val, year_val, region_val, dest_val, park_type_val)
 
-    df_month = filter_parks(month_int, year_int, region_val, dest_val, park_type_val)
-    if df_month.empty:
+    park_month = _sum_by(ctx.month_parks, "Park")
+    if park_month.empty:
         top_park_month = "—"
         total_month = 0.0
         avg = 0.0
     else:
         g = (
-            df_month.groupby("Park")["Recreation Visits"]
-            .sum()
+            park_month.set_index("Park")["Recreation Visits"]
             .sort_values(ascending=False)
         )
         top_park_month = g.index[0]
         total_month = float(g.sum())
         avg = total_month / max(g.size, 1)
 
-    df_all = filter_parks(None, None, region_val, dest_val, park_type_val)
-    if df_all.empty:
+    yearly = ctx.yearly
+    if yearly.empty:
         peak_year = year_int
         yoy_pct = 0.0
     else:
-        yearly = df_all.groupby("Year", as_index=False)["Recreation Visits"].sum()
         peak_row = yearly.sort_values("Recreation Visits", ascending=False).iloc[0]
         peak_year = int(peak_row["Year"])
 
@@ -639,22 +1045,22 @@ def compute_kpis(month_val, year_val, region_val, dest_val, park_type_val):
         else:
             yoy_pct = (curr.iloc[0] - prev.iloc[0]) / prev.iloc[0] * 100.0
 
-    df_year = filter_parks(None, year_int, region_val, dest_val, park_type_val)
-    if df_year.empty:
+    park_year = ctx.year_parks
+    if park_year.empty:
         top_park_year = "—"
         total_year = 0.0
         top_state_year = "—"
     else:
         g_year = (
-            df_year.groupby("Park")["Recreation Visits"]
+            park_year.groupby("Park")["Recreation Visits"]
             .sum()
             .sort_values(ascending=False)
         )
         top_park_year = g_year.index[0]
-        total_year = float(df_year["Recreation Visits"].sum())
+        total_year = float(g_year.sum())
 
         state_year = (
-            df_year.groupby("State")["Recreation Visits"]
+            park_year.groupby("State")["Recreation Visits"]
             .sum()
             .sort_values(ascending=False)
         )
@@ -681,26 +1087,105 @@ def compute_kpis(month_val, year_val, region_val, dest_val, park_type_val):
 # ==================
 
 DEFAULT_MONTH = 7
-DEFAULT_YEAR = LATEST_YEAR
-
-df_map_init = build_base_map_df(DEFAULT_MONTH, DEFAULT_YEAR, "All", "State", "All")
-init_map = build_map(df_map_init)
-init_heat = build_heatmap_real(DEFAULT_MONTH, DEFAULT_YEAR, "All", "State", "All")
-init_trend = build_yearly_trend_overall(DEFAULT_MONTH, DEFAULT_YEAR, "All", "State", "All")
-init_top5 = build_top5_parks(DEFAULT_MONTH, DEFAULT_YEAR, "All", "State", "All")
-init_top_states = build_top_states(DEFAULT_MONTH, DEFAULT_YEAR, "All", "State", "All")
-init_yearly = build_active_parks_per_year(DEFAULT_MONTH, DEFAULT_YEAR, "All", "State", "All")
-init_ptype = build_avg_spend_per_state(DEFAULT_MONTH, DEFAULT_YEAR, "All", "State", "All")
-kpi0 = compute_kpis(DEFAULT_MONTH, DEFAULT_YEAR, "All", "State", "All")
+
+
+def default_year():
+    return current().latest_year
+
+
+def initial_figures() -> dict:
+    """
+    Full figures + KPIs for the default filters, rendered once per bundle
+    (reload_data renders them before the new bundle goes live).
+    """
+    data = current()
+    if data.initial is None:
+        m, y = DEFAULT_MONTH, data.latest_year
+        data.initial = {
+            "map": build_us_map(m, y, "All", "State", "All"),
+            "sparkline": build_dashboard_sparkline(y, "All", "State", "All"),
+            "heat": build_heatmap_real(m, y, "All", "State", "All"),
+            "trend": build_yearly_trend_overall(m, y, "All", "State", "All"),
+            "top5": build_top5_parks(m, y, "All", "State", "All"),
+            "top_states": build_top_states(m, y, "All", "State", "All"),
+            "yearly": build_active_parks_per_year(m, y, "All", "State", "All"),
+            "ptype": build_avg_spend_per_state(m, y, "All", "State", "All"),
+            "kpis": compute_kpis(m, y, "All", "State", "All"),
+        }
+    return data.initial
+
+
+initial_figures()
+
+# ==============
+# DATA RELOAD
+# ==============
+
+# Seconds between checks for new source data; 0 disables the refresher.
+RELOAD_SECONDS = float(os.getenv("PARKS_RELOAD_SECONDS", "0"))
+_RELOAD_LOCK = threading.Lock()
+
+
+def reload_data(force: bool = False) -> bool:
+    """
+    Swap in a new DataBundle if the source data changed since DATA was
+    loaded (or always, with force). The frame, indexes and initial figures
+    are all built before the swap; callbacks already running finish on the
+    bundle they pinned. Returns True when the data was replaced.
+    """
+    global DATA
+    with _RELOAD_LOCK:
+        data = load_bundle(None if force else DATA.version, DATA.parks_df)
+        if data is None:
+            return False
+        with using(data):
+            initial_figures()
+        DATA = data
+        invalidate_caches()
+    print(f"Reloaded parks data: {data.version} ({len(data.years)} years)")
+    return True
+
+
+def _refresh_loop(interval: float):
+    while True:
+        try:
+            reload_data()
+        except Exception as e:
+            print("WARNING: Could not reload parks data, keeping the current data.")
+            print("Reason:", repr(e))
+        time.sleep(interval)
+
+
+def start_refresher(interval: float = RELOAD_SECONDS):
+    """
+    Poll for new data every `interval` seconds on a daemon thread (no-op
+    when interval is 0). Call once per serving process, after any fork.
+    """
+    if interval <= 0:
+        return None
+    thread = threading.Thread(
+        target=_refresh_loop, args=(interval,), name="parks-data-refresher", daemon=True
+    )
+    thread.start()
+    return thread
 
 # ============
 # CALLBACKS
 # ============
 
+def _context_from_store(data):
+    """Resolve the filter-context Store value (the key) to its context."""
+    if not data:
+        raise PreventUpdate
+    return filter_context(*data)
+
+
 def register_callbacks(app):
-    # MAP
+    # FILTER CONTEXT – resolves the dropdowns to a normalized key; the
+    # context's aggregates are computed lazily, so views already in
+    # RESULT_CACHE do no aggregation at all
     @app.callback(
-        Output("us-map", "figure"),
+        Output("filter-context", "data"),
         [
             Input("f-month", "value"),
             Input("f-year", "value"),
@@ -709,38 +1194,41 @@ def register_callbacks(app):
             Input("f-park-type", "value"),
         ],
     )
-    def update_map(month_val, year_val, region_val, dest_val, park_type_val):
-        dfm = build_base_map_df(month_val, year_val, region_val, dest_val, park_type_val)
-        return build_map(dfm)
+    @pin_data
+    def update_filter_context(month_val, year_val, region_val, dest_val, park_type_val):
+        ctx = filter_context(month_val, year_val, region_val, dest_val, park_type_val)
+        return list(ctx.key)
+
+    # MAP – only locations / customdata per status trace are sent
+    @app.callback(
+        Output("us-map", "figure"),
+        Input("filter-context", "data"),
+    )
+    @pin_data
+    def update_map(data):
+        return patch_from(map_traces(*_context_from_store(data).key))
 
     @app.callback(
         Output("dashboard-sparkline", "figure"),
-        [
-            Input("f-year", "value"),
-            Input("f-region", "value"),
-            Input("f-dest", "value"),
-            Input("f-park-type", "value"),
-        ],
+        Input("filter-context", "data"),
     )
-    def update_dashboard_sparkline_cb(year_val, region_val, dest_val, park_type_val):
-        return build_dashboard_sparkline(year_val, region_val, dest_val, park_type_val)
+    @pin_data
+    def update_dashboard_sparkline_cb(data):
+        ctx = _context_from_store(data)
+        return patch_from(sparkline_traces(*ctx.key[1:], ctx=ctx))
 
     # STORYLINE
     @app.callback(
         Output("storyline-block", "children"),
-        [
-            Input("f-month", "value"),
-            Input("f-year", "value"),
-            Input("f-region", "value"),
-            Input("f-dest", "value"),
-            Input("f-park-type", "value"),
-        ],
+        Input("filter-context", "data"),
     )
-    def update_storyline(month_val, year_val, region_val, dest_val, park_type_val):
-        k = compute_kpis(month_val, year_val, region_val, dest_val, park_type_val)
-        month_name = ALL_MONTHS[int(month_val) - 1]
+    @pin_data
+    def update_storyline(data):
+        ctx = _context_from_store(data)
+        k = ctx.kpis
+        month_name = ALL_MONTHS[ctx.month_val - 1]
         bullets = [
-            f"In {month_name} {year_val}, {fmt_millions(k['total_month'])} "
+            f"In {month_name} {ctx.year_val}, {fmt_millions(k['total_month'])} "
             f"visitors are recorded under the current view.",
             f"Top park this month is {k['top_park_month']} and the yearly leader is {k['top_park_year']}.",
             f"Visitor volume is {k['yoy_pct']:+.1f}% vs previous year, with peak year at {k['peak_year']}.",
@@ -757,22 +1245,22 @@ def register_callbacks(app):
             Output("yearly-analytics", "figure"),
             Output("park-type-analytics", "figure"),
         ],
-        [
-            Input("f-month", "value"),
-            Input("f-year", "value"),
-            Input("f-region", "value"),
-            Input("f-dest", "value"),
-            Input("f-park-type", "value"),
-        ],
+        Input("filter-context", "data"),
     )
-    def update_analytics_charts(month_val, year_val, region_val, dest_val, park_type_val):
-        heat_out = build_heatmap_real(month_val, year_val, region_val, dest_val, park_type_val)
-        trend_out = build_yearly_trend_overall(month_val, year_val, region_val, dest_val, park_type_val)
-        top5_out = build_top5_parks(month_val, year_val, region_val, dest_val, park_type_val)
-        states_out = build_top_states(month_val, year_val, region_val, dest_val, park_type_val)
-        yearly_out = build_active_parks_per_year(month_val, year_val, region_val, dest_val, park_type_val)
-        ptype_out = build_avg_spend_per_state(month_val, year_val, region_val, dest_val, park_type_val)
-        return heat_out, trend_out, top5_out, states_out, yearly_out, ptype_out
+    @pin_data
+    def update_analytics_charts(data):
+        ctx = _context_from_store(data)
+        return tuple(
+            patch_from(traces(*ctx.key, ctx=ctx))
+            for traces in (
+                heatmap_traces,
+                trend_traces,
+                top5_traces,
+                top_states_traces,
+                active_parks_traces,
+                avg_spend_traces,
+            )
+        )
 
     # KPIs – mini cards
     @app.callback(
@@ -787,16 +1275,11 @@ def register_callbacks(app):
             Output("kpi-total-year", "children"),
             Output("kpi-top-state-year", "children"),
         ],
-        [
-            Input("f-month", "value"),
-            Input("f-year", "value"),
-            Input("f-region", "value"),
-            Input("f-dest", "value"),
-            Input("f-park-type", "value"),
-        ],
+        Input("filter-context", "data"),
     )
-    def update_kpis(month_val, year_val, region_val, dest_val, park_type_val):
-        k = compute_kpis(month_val, year_val, region_val, dest_val, park_type_val)
+    @pin_data
+    def update_kpis(data):
+        k = _context_from_store(data).kpis
         yoy_text = f"{k['yoy_pct']:+.1f}%"
         yoy_style = {"color": "#4ade80" if k["yoy_positive"] else "#f97373"}
         return (
@@ -823,5 +1306,6 @@ def register_callbacks(app):
         Input("btn-reset-filters", "n_clicks"),
         prevent_initial_call=True,
     )
+    @pin_data
     def reset_filters(n_clicks):
-        return DEFAULT_MONTH, DEFAULT_YEAR, "All", "State", "All"
+        return DEFAULT_MONTH, default_year(), "All", "State", "All"
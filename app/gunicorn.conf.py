@@ -0,0 +1,51 @@
+# gunicorn.conf.py
+#
+# Multi-worker deployment (run from the app/ folder):
+#   gunicorn app:server
+#   WEB_CONCURRENCY=8 gunicorn app:server
+#
+# The master loads parks_df once and materializes it as memory-mapped
+# columns (see src/shared_frame.py), then imports the app and forks the
+# workers from it (preload_app), so libraries, indexes and figure shells are
+# shared copy-on-write and a worker starts in a fork. The column data is
+# file-backed, so it stays shared even in workers started later.
+# PARKS_PRELOAD=0 makes each worker import the app itself; workers then
+# still attach the memory-mapped columns rather than loading the data.
+#
+# With PARKS_RELOAD_SECONDS=N every worker checks for new source data every
+# N seconds and swaps it in without a restart (see core.reload_data); the
+# first worker to notice materializes the new shared frame for the rest.
+
+import os
+
+os.environ.setdefault("PARKS_SHARED", "1")
+
+bind = os.getenv("BIND", "0.0.0.0:8050")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+timeout = 120
+preload_app = os.getenv("PARKS_PRELOAD", "1") != "0"
+
+
+def on_starting(server):
+    from src import shared_frame
+    from src.loader import materialize_shared
+
+    if shared_frame.SHARED_ENABLED:
+        key = materialize_shared()
+        server.log.info("Shared parks data ready: %s", key)
+
+
+def post_worker_init(worker):
+    from core import start_refresher
+    from src.db import prewarm
+
+    # open the worker's DB pool now rather than on its first requests
+    # (pooled connections are reset at fork, see src/db.py)
+    if os.getenv("DB_HOST"):
+        try:
+            worker.log.info("DB pool: %d connections opened", prewarm())
+        except Exception as e:
+            worker.log.warning("Could not pre-open DB connections: %r", e)
+
+    # threads do not survive the fork, so each worker starts its own
+    start_refresher()
@@ -3,21 +3,13 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 
-from core import (
-    DEFAULT_MONTH,
-    DEFAULT_YEAR,
-    init_heat,
-    init_trend,
-    init_top5,
-    init_top_states,
-    init_yearly,
-    init_ptype,
-)
+from core import initial_figures
 
 from pages.dashboard import filter_dropdowns_card
 
 
 def analytics_layout():
+    figs = initial_figures()
     return html.Div(
         [
             html.Div(
@@ -63,7 +55,7 @@ def analytics_layout():
                             html.Div("Region–Season Heat", className="chart-title"),
                             dcc.Graph(
                                 id="heatmap-analytics",
-                                figure=init_heat,
+                                figure=figs["heat"],
                                 style={"height": "100%"},
                                 config={"displayModeBar": False},
                             ),
@@ -77,7 +69,7 @@ def analytics_layout():
                             html.Div("Yearly Visitors Trend", className="chart-title"),
                             dcc.Graph(
                                 id="trend-analytics",
-                                figure=init_trend,
+                                figure=figs["trend"],
                                 style={"height": "100%"},
                                 config={"displayModeBar": False},
                             ),
@@ -91,7 +83,7 @@ def analytics_layout():
                             html.Div("Top 5 Parks (Month)", className="chart-title"),
                             dcc.Graph(
                                 id="top5-parks-analytics",
-                                figure=init_top5,
+                                figure=figs["top5"],
                                 style={"height": "100%"},
                                 config={"displayModeBar": False},
                             ),
@@ -105,7 +97,7 @@ def analytics_layout():
                             html.Div("Top Park per Year (Area)", className="chart-title"),
                             dcc.Graph(
                                 id="top-states-analytics",
-                                figure=init_top_states,
+                                figure=figs["top_states"],
                                 style={"height": "100%"},
                                 config={"displayModeBar": False},
                             ),
@@ -119,7 +111,7 @@ def analytics_layout():
                             html.Div("Active Parks per Year", className="chart-title"),
                             dcc.Graph(
                                 id="yearly-analytics",
-                                figure=init_yearly,
+                                figure=figs["yearly"],
                                 style={"height": "100%"},
                                 config={"displayModeBar": False},
                             ),
@@ -136,7 +128,7 @@ def analytics_layout():
                             ),
                             dcc.Graph(
                                 id="park-type-analytics",
-                                figure=init_ptype,
+                                figure=figs["ptype"],
                                 style={"height": "100%"},
                                 config={"displayModeBar": False},
                             ),
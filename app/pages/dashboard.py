@@ -1,13 +1,15 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 
-from core import YEARS, DEFAULT_MONTH, DEFAULT_YEAR, parks_df, init_map
+from core import DEFAULT_MONTH, current, initial_figures
 
 
 # -----------------------------
 # filter dropdowns card
 # -----------------------------
 def filter_dropdowns_card():
+    # options / defaults from the live data, so a reload shows on the next page load
+    data = current()
     return dbc.Card(
         [
             html.Div("Filters", className="filters-title"),
@@ -42,8 +44,8 @@ def filter_dropdowns_card():
                             dcc.Dropdown(
                                 id="f-year",
                                 className="dash-dropdown",
-                                options=[{"label": str(y), "value": int(y)} for y in YEARS],
-                                value=DEFAULT_YEAR,
+                                options=[{"label": str(y), "value": int(y)} for y in data.years],
+                                value=data.latest_year,
                                 clearable=False,
                             ),
                         ]
@@ -89,9 +91,7 @@ def filter_dropdowns_card():
                                     [{"label": "All", "value": "All"}]
                                     + [
                                         {"label": t, "value": t}
-                                        for t in sorted(
-                                            parks_df["Park Type"].dropna().unique()
-                                        )
+                                        for t in data.park_types
                                     ]
                                 ),
                                 value="All",
@@ -102,6 +102,8 @@ def filter_dropdowns_card():
                 ],
                 className="filters-row",
             ),
+            # key of the server-side filter context (see core.filter_context)
+            dcc.Store(id="filter-context"),
         ],
         className="soft-card filters-card",
     )
@@ -137,54 +139,57 @@ def extra_kpi_card(title, idv):
 # -----------------------------
 # KPI panel
 # -----------------------------
-kpi_panel = dbc.Card(
-    [
-        html.Div("Key Signals", className="kpi-title"),
-        html.Div(
-            [
-                kpi_card("Top Park (Month)", "kpi-top-park-month"),
-                kpi_card("Avg Visits / Park", "kpi-avg-park"),
-                kpi_card("Total Visitors (Month)", "kpi-total-month"),
-                kpi_card("Peak Year", "kpi-peak-year"),
-                kpi_card("YoY Growth vs Prev Year", "kpi-yoy"),
-                kpi_card("Top Park (Year)", "kpi-top-park-year"),
-                extra_kpi_card("Total Visitors (Year)", "kpi-total-year"),
-                extra_kpi_card("Most Visited State (Year)", "kpi-top-state-year"),
-            ],
-            className="kpi-row",
-        ),
-        html.Div(
-            [
-                html.Div(
-                    "Monthly Pattern (Selected Year)",
-                    className="kpi-title",
-                    style={"marginTop": "10px"},
-                ),
-                dcc.Graph(
-                    id="dashboard-sparkline",
-                    style={"height": "14vh"},
-                    config={"displayModeBar": False},
-                ),
-            ],
-            style={"marginTop": "4px"},
-        ),
-    ],
-    className="soft-card kpi-panel",
-    style={"height": "100%"},
-)
+def kpi_panel():
+    return dbc.Card(
+        [
+            html.Div("Key Signals", className="kpi-title"),
+            html.Div(
+                [
+                    kpi_card("Top Park (Month)", "kpi-top-park-month"),
+                    kpi_card("Avg Visits / Park", "kpi-avg-park"),
+                    kpi_card("Total Visitors (Month)", "kpi-total-month"),
+                    kpi_card("Peak Year", "kpi-peak-year"),
+                    kpi_card("YoY Growth vs Prev Year", "kpi-yoy"),
+                    kpi_card("Top Park (Year)", "kpi-top-park-year"),
+                    extra_kpi_card("Total Visitors (Year)", "kpi-total-year"),
+                    extra_kpi_card("Most Visited State (Year)", "kpi-top-state-year"),
+                ],
+                className="kpi-row",
+            ),
+            html.Div(
+                [
+                    html.Div(
+                        "Monthly Pattern (Selected Year)",
+                        className="kpi-title",
+                        style={"marginTop": "10px"},
+                    ),
+                    dcc.Graph(
+                        id="dashboard-sparkline",
+                        figure=initial_figures()["sparkline"],
+                        style={"height": "14vh"},
+                        config={"displayModeBar": False},
+                    ),
+                ],
+                style={"marginTop": "4px"},
+            ),
+        ],
+        className="soft-card kpi-panel",
+        style={"height": "100%"},
+    )
 
 # -----------------------------
 # Map + Storyline cards
 # -----------------------------
-map_card = dbc.Card(
-    dcc.Graph(
-        id="us-map",
-        figure=init_map,
-        style={"height": "100%", "backgroundColor": "transparent"},
-        config={"displayModeBar": False},
-    ),
-    className="soft-card map-card",
-)
+def map_card():
+    return dbc.Card(
+        dcc.Graph(
+            id="us-map",
+            figure=initial_figures()["map"],
+            style={"height": "100%", "backgroundColor": "transparent"},
+            config={"displayModeBar": False},
+        ),
+        className="soft-card map-card",
+    )
 
 storyline_card = dbc.Card(
     [
@@ -244,10 +249,10 @@ def dashboard_layout():
             # Main content row
             html.Div(
                 [
-                    html.Div(kpi_panel),
+                    html.Div(kpi_panel()),
                     html.Div(
                         [
-                            map_card,
+                            map_card(),
                             storyline_card,
                         ],
                         className="map-side-wrapper",
@@ -0,0 +1,105 @@
+# cache.py
+#
+# Bounded in-process LRU cache used for filter contexts, figures and KPIs.
+# Entries are evicted by count and by approximate byte size; hit / miss /
+# eviction counters are kept so the app can report them.
+
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def approx_size(value) -> int:
+    """Rough in-memory footprint of a cached value, in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if hasattr(value, "to_plotly_json"):
+        value = value.to_plotly_json()
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 0, sizeof=approx_size):
+        """
+        max_entries / max_bytes bound the cache (max_bytes=0 -> no byte
+        limit). `sizeof` measures a value once, when it is stored.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof if max_bytes else (lambda value: 0)
+
+        self._data = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        """Store `value`; returns the value already cached under `key` if any."""
+        size = self.sizeof(value)
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+                return item[0]
+            if self.max_bytes and size > self.max_bytes:
+                return value
+
+            self._data[key] = (value, size)
+            self.bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes and self.bytes > self.max_bytes)
+            ):
+                _, (_, old_size) = self._data.popitem(last=False)
+                self.bytes -= old_size
+                self.evictions += 1
+            return value
+
+    def get_or_compute(self, key, compute):
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
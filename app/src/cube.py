@@ -0,0 +1,196 @@
+# cube.py
+#
+# Dense [park, year, month] cube of visit totals.
+#
+# Built once from parks_df; every chart builder / KPI reads rollups from it,
+# so interactive latency depends on the number of parks, years and months,
+# not on the number of raw rows.
+#
+# A "park" here is a distinct (Park, State, Park Type) combination, so
+# park-level dimensions (State, RegionGroup, Park Type, destination class)
+# are plain arrays along the first axis.
+
+import numpy as np
+import pandas as pd
+
+from src.selection import is_national_park
+
+VALUE_COL = "Recreation Visits"
+PARK_DIMS = ("Park", "State", "RegionGroup")
+TIME_DIMS = ("Year", "Month")
+
+
+class VisitCube:
+    """
+    visits[p, y, m] -> summed visits
+    rows[p, y, m]   -> number of source rows (so "has data" matches pandas
+                       groupby semantics even when visits are 0)
+
+    totals(keys, ...) is the rollup API: filter the park axis with dimension
+    masks, slice year/month, sum over the remaining axes and return the
+    same frame as filtered_df.groupby(keys, as_index=False)[VALUE_COL].sum().
+    """
+
+    def __init__(self, df: pd.DataFrame, regions: dict):
+        self.regions = regions
+
+        park_cols = ["Park", "State", "Park Type", "RegionGroup"]
+        park_idx = df.groupby(park_cols, sort=False, dropna=False).ngroup().to_numpy()
+        parks = df[park_cols].drop_duplicates().reset_index(drop=True)
+
+        year_idx, years = pd.factorize(df["Year"], sort=True)
+        month_idx, months = pd.factorize(df["Month"], sort=True)
+        self.years = np.asarray(years)
+        self.months = np.asarray(months)
+        self._year_pos = {y: i for i, y in enumerate(self.years.tolist())}
+        self._month_pos = {m: i for i, m in enumerate(self.months.tolist())}
+
+        shape = (len(parks), len(self.years), len(self.months))
+        self.visits = np.zeros(shape, dtype=np.float64)
+        self.rows = np.zeros(shape, dtype=np.int32)
+        cell = (park_idx, year_idx, month_idx)
+        np.add.at(self.visits, cell, df[VALUE_COL].to_numpy(dtype=float))
+        np.add.at(self.rows, cell, 1)
+
+        # park-level dimension arrays: codes into sorted labels
+        self._park_codes = {}
+        for dim in PARK_DIMS:
+            codes, labels = pd.factorize(parks[dim], sort=True)
+            self._park_codes[dim] = (codes, np.asarray(labels))
+        self.park_state = parks["State"].to_numpy(dtype=object)
+        self.park_type = parks["Park Type"].to_numpy(dtype=object)
+        self.park_is_np = is_national_park(parks["Park Type"].astype(object))
+
+    @property
+    def n_parks(self) -> int:
+        return self.visits.shape[0]
+
+    def park_codes(self, dim):
+        """(codes per cube park, sorted labels) for a park-level dimension."""
+        return self._park_codes[dim]
+
+    def time_index(self, month_val, year_val):
+        """(year, month) cube positions, or None when either is not in the cube."""
+        y = self._year_pos.get(int(year_val))
+        m = self._month_pos.get(int(month_val))
+        return None if y is None or m is None else (y, m)
+
+    # -------------------------
+    # dimension masks
+    # -------------------------
+
+    def park_mask(self, region_val=None, dest_val=None, park_type_val=None) -> np.ndarray:
+        mask = np.ones(self.n_parks, dtype=bool)
+        if region_val and region_val != "All":
+            allowed = list(set(self.regions.get(region_val, [])))
+            mask &= np.isin(self.park_state, allowed)
+        if dest_val == "National Park":
+            mask &= self.park_is_np
+        elif dest_val == "City":
+            mask &= ~self.park_is_np
+        if park_type_val and park_type_val != "All":
+            mask &= self.park_type == park_type_val
+        return mask
+
+    def _axis_slice(self, lookup, value):
+        if value is None:
+            return slice(None)
+        pos = lookup.get(int(value))
+        return slice(0, 0) if pos is None else slice(pos, pos + 1)
+
+    # -------------------------
+    # rollup
+    # -------------------------
+
+    def rollup(
+        self,
+        axes,
+        month_val=None,
+        year_val=None,
+        park_mask=None,
+    ):
+        """
+        Sum visits/rows over the cube after masking parks and slicing
+        year/month; `axes` are the cube axes (0=park, 1=year, 2=month) to
+        keep. Returns (visits, rows, park_index) where park_index maps the
+        kept park axis back to cube parks.
+        """
+        park_index = np.arange(self.n_parks) if park_mask is None else np.flatnonzero(park_mask)
+        ys = self._axis_slice(self._year_pos, year_val)
+        ms = self._axis_slice(self._month_pos, month_val)
+
+        ps = slice(None) if len(park_index) == self.n_parks else park_index
+        visits = self.visits[ps, ys, ms]
+        rows = self.rows[ps, ys, ms]
+        drop = tuple(ax for ax in (0, 1, 2) if ax not in axes)
+        if drop:
+            visits = visits.sum(axis=drop)
+            rows = rows.sum(axis=drop)
+        return visits, rows, park_index
+
+    def totals(
+        self,
+        keys,
+        month_val=None,
+        year_val=None,
+        region_val=None,
+        dest_val=None,
+        park_type_val=None,
+    ) -> pd.DataFrame:
+        keys = list(keys)
+        park_keys = [k for k in keys if k in PARK_DIMS]
+        time_keys = [k for k in TIME_DIMS if k in keys]
+
+        mask = self.park_mask(region_val, dest_val, park_type_val)
+        axes = (0,) + tuple(1 + TIME_DIMS.index(k) for k in time_keys)
+        visits, rows, park_index = self.rollup(axes, month_val, year_val, mask)
+
+        # Collapse the park axis into the distinct park-level key combinations
+        # (sorted lexicographically, like a groupby), then sum with bincount.
+        if park_keys:
+            stacked = np.stack(
+                [self._park_codes[k][0][park_index] for k in park_keys], axis=1
+            )
+            groups, flat = np.unique(stacked, axis=0, return_inverse=True)
+            flat = flat.ravel()
+        else:
+            groups = np.zeros((1, 0), dtype=np.intp)
+            flat = np.zeros(len(park_index), dtype=np.intp)
+        n_groups = len(groups)
+        inner = int(np.prod(visits.shape[1:]))
+        cells = (flat[:, None] * inner + np.arange(inner)).ravel()
+        out_v = np.bincount(cells, weights=visits.ravel(), minlength=n_groups * inner)
+        out_r = np.bincount(cells, weights=rows.ravel(), minlength=n_groups * inner)
+
+        # Put the collapsed park axis where the first park key sits in `keys`
+        axis_names = ["_park"] + time_keys
+        wanted = [k for k in keys if k not in park_keys]
+        wanted.insert(keys.index(park_keys[0]) if park_keys else 0, "_park")
+        order = [axis_names.index(k) for k in wanted]
+        shape = [n_groups] + list(visits.shape[1:])
+        out_v = out_v.reshape(shape).transpose(order)
+        out_r = out_r.reshape(shape).transpose(order)
+
+        present = np.flatnonzero(out_r.ravel())
+        frame = {}
+        for k, idx in zip(wanted, np.unravel_index(present, out_r.shape)):
+            if k == "_park":
+                for j, pk in enumerate(park_keys):
+                    frame[pk] = self._park_codes[pk][1][groups[idx, j]]
+            else:
+                frame[k] = self._labels(k, year_val, month_val)[idx]
+        frame[VALUE_COL] = out_v.ravel()[present]
+        frame = pd.DataFrame(frame, columns=keys + [VALUE_COL])
+
+        # Park keys split by a time key (e.g. [Park, Year, State]) need a re-sort
+        first = keys.index(park_keys[0]) if park_keys else 0
+        if park_keys and keys[first:first + len(park_keys)] != park_keys:
+            frame = frame.sort_values(keys, kind="stable", ignore_index=True)
+        return frame
+
+    def _labels(self, key, year_val, month_val) -> np.ndarray:
+        if key == "Year":
+            return self.years if year_val is None else np.array([int(year_val)])
+        if key == "Month":
+            return self.months if month_val is None else np.array([int(month_val)])
+        return self._park_codes[key][1]
@@ -1,18 +1,189 @@
 # db.py
+#
+# One pooled SQLAlchemy engine per process and database URL, shared by the
+# app (src.loader, src.snapshot) and the ETL scripts.
+#
+# Pool and timeout settings come from the environment (.env):
+#   DB_POOL_SIZE / DB_MAX_OVERFLOW    connections kept open / extra under load
+#   DB_POOL_TIMEOUT                   seconds to wait for a free connection
+#   DB_POOL_RECYCLE                   reconnect connections older than this
+#   DB_CONNECT_TIMEOUT                seconds to wait for the server on connect
+#   DB_STATEMENT_TIMEOUT_MS           server-side statement_timeout (0 = none)
+#
+# Engines are reset in a forked child (gunicorn workers) so a worker never
+# reuses a socket opened by its parent. Time spent waiting in checkout,
+# including opening a new connection, is recorded; see pool_stats().
+
 import os
+import threading
+import time
+from collections import deque
+
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
 
 # load .env file
 load_dotenv()
 
-def get_engine():
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# url -> engine, for this process
+_ENGINES = {}
+_LOCK = threading.Lock()
+
+
+def database_url() -> str:
     db_user = os.getenv("DB_USER")
     db_password = os.getenv("DB_PASSWORD")
     db_host = os.getenv("DB_HOST")      # RDS endpoint
     db_port = os.getenv("DB_PORT", "5432")
     db_name = os.getenv("DB_NAME")      # your DB name (tourism_project)
+    return f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+# =========================================================
+# CHECKOUT METRICS
+# =========================================================
+
+class CheckoutStats:
+    """Checkout wait times (seconds); percentiles over the last `window`."""
+
+    def __init__(self, window: int = 1024):
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._recent.append(seconds)
+            self.checkouts += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            checkouts, connects, total, longest = self.checkouts, self.connects, self.total, self.max
+
+        def pct(p):
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1e3 if recent else 0.0
+
+        return {
+            "checkouts": checkouts,
+            "connects": connects,
+            "mean_ms": total / checkouts * 1e3 if checkouts else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": longest * 1e3,
+        }
+
 
-    db_url = f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-    engine = create_engine(db_url)
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def _create_connection(self):
+        self.checkout_stats.record_connect()
+        return super()._create_connection()
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.checkout_stats.record(time.perf_counter() - t0)
+
+
+# =========================================================
+# ENGINES
+# =========================================================
+
+def get_engine(url: str = None, statement_timeout_ms: int = STATEMENT_TIMEOUT_MS):
+    """
+    Shared pooled engine for url (default: DB_* settings). Created on first
+    use; later calls in the same process return the same engine.
+    Long-running jobs (ETL loads, view refreshes) pass statement_timeout_ms=0.
+    """
+    url = url or database_url()
+    key = (url, statement_timeout_ms)
+    engine = _ENGINES.get(key)
+    if engine is not None:
+        return engine
+
+    with _LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            connect_args = {"connect_timeout": CONNECT_TIMEOUT}
+            if statement_timeout_ms:
+                connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+            engine = create_engine(
+                url,
+                poolclass=TimedQueuePool,
+                pool_size=POOL_SIZE,
+                max_overflow=MAX_OVERFLOW,
+                pool_timeout=POOL_TIMEOUT,
+                pool_recycle=POOL_RECYCLE,
+                pool_pre_ping=True,
+                connect_args=connect_args,
+            )
+            _ENGINES[key] = engine
     return engine
+
+
+def prewarm(engine=None, connections: int = POOL_SIZE) -> int:
+    """
+    Open `connections` pooled connections now (e.g. at worker start), so
+    the first requests do not pay for connection setup. Returns how many
+    were opened.
+    """
+    engine = engine or get_engine()
+    conns = []
+    try:
+        for _ in range(connections):
+            conns.append(engine.connect())
+    finally:
+        for conn in conns:
+            conn.close()  # back to the pool, still open
+    return len(conns)
+
+
+def pool_stats() -> list:
+    """Pool occupancy + checkout latency of each engine (password masked)."""
+    out = []
+    for (_, statement_timeout_ms), engine in list(_ENGINES.items()):
+        pool = engine.pool
+        out.append({
+            "url": engine.url.render_as_string(hide_password=True),
+            "statement_timeout_ms": statement_timeout_ms,
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            **pool.checkout_stats.stats(),
+        })
+    return out
+
+
+def _reset_after_fork():
+    # The child inherits the parent's pooled sockets; drop them without
+    # closing (that would close them for the parent too) and start fresh.
+    for engine in _ENGINES.values():
+        engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
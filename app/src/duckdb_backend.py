@@ -0,0 +1,103 @@
+# duckdb_backend.py
+#
+# Embedded DuckDB backend (PARKS_BACKEND=duckdb, see core.py) for
+# deployments without RDS: the SQL of src/sql_backend.py runs vectorized
+# in-process over the local data, with no server and without a pandas copy
+# of every row.
+#
+# connect_local() loads the local Parquet dataset (or the CSV) into an
+# in-memory DuckDB database, cleaned the way src.loader.clean_parks cleans
+# parks_df, as the same two relations the PostgreSQL backend reads:
+#   park_visits            one row per park / year / month
+#   mv_state_month_visits  state x year x month totals
+# DuckDB keeps them columnar and compressed, so the copy is small next to
+# parks_df.
+#
+# duckdb is imported on first use, so it is only needed for this backend.
+
+import os
+import re
+
+from src.loader import LOCAL_CSV, LOCAL_DATASET
+from src.sql_backend import STATE_MONTH_VIEW, SqlBackend
+
+TABLE = "park_visits"
+
+LOAD_SQL = f"""
+CREATE OR REPLACE TABLE {TABLE} AS
+SELECT
+    TRIM(CAST("Park" AS VARCHAR))         AS park,
+    CAST("Park Type" AS VARCHAR)          AS park_type,
+    TRIM(CAST("State" AS VARCHAR))        AS state,
+    CAST("Year" AS INTEGER)               AS year,
+    CAST("Month" AS INTEGER)              AS month,
+    CAST("Recreation Visits" AS DOUBLE)   AS recreation_visits
+FROM {{source}}
+WHERE "Park" IS NOT NULL AND "Year" IS NOT NULL AND "Month" IS NOT NULL
+  AND "Recreation Visits" IS NOT NULL
+ORDER BY year, state, month
+"""
+
+STATE_MONTH_SQL = f"""
+CREATE OR REPLACE TABLE {STATE_MONTH_VIEW} AS
+SELECT state, year, month, SUM(recreation_visits) AS visits
+FROM {TABLE}
+GROUP BY state, year, month
+"""
+
+
+def _quote(path: str) -> str:
+    return "'" + path.replace("'", "''") + "'"
+
+
+def connect_local(dataset: str = LOCAL_DATASET, csv: str = LOCAL_CSV):
+    """In-memory DuckDB connection holding the local data (see module notes)."""
+    import duckdb
+
+    if os.path.isdir(dataset):
+        pattern = os.path.join(dataset, "**", "*.parquet")
+        source = f"read_parquet({_quote(pattern)}, hive_partitioning = true)"
+    else:
+        source = f"read_csv({_quote(csv)}, header = true)"
+
+    con = duckdb.connect()
+    con.execute(LOAD_SQL.format(source=source))
+    con.execute(STATE_MONTH_SQL)
+    return con
+
+
+class DuckDbBackend(SqlBackend):
+    """SqlBackend whose `engine` is a DuckDB connection (see connect_local)."""
+
+    def __init__(self, con, regions: dict, state_codes, version: str, forecasts=None):
+        super().__init__(con, regions, state_codes, version, forecasts, table=TABLE)
+
+    def _text_collation(self) -> str:
+        return ""  # DuckDB already compares strings byte by byte
+
+    def _view_is_fresh(self) -> bool:
+        return True  # connect_local builds the view table from the loaded rows
+
+    def _query(self, sql: str, params: dict):
+        """Run SQL written with :name binds; list values expand to IN lists."""
+        args = {}
+
+        def bind(match):
+            name = match.group(1)
+            value = params[name]
+            if isinstance(value, list):
+                if not value:
+                    return "(NULL)"  # matches nothing, like an empty IN
+                names = [f"{name}_{i}" for i in range(len(value))]
+                args.update(zip(names, value))
+                return "(" + ", ".join(f"${n}" for n in names) + ")"
+            args[name] = value
+            return f"${name}"
+
+        sql = re.sub(r"(?<![:\w]):(\w+)", bind, sql)
+        # a cursor per query: DuckDB connections are not shared across threads
+        cur = self.engine.cursor()
+        try:
+            return cur.execute(sql, args).fetchall()
+        finally:
+            cur.close()
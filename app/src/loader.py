@@ -0,0 +1,479 @@
+# loader.py
+#
+# Builds the cleaned parks DataFrame used by core.py:
+#   RDS table (or local Parquet dataset / CSV fallback) -> append future
+#   forecasts -> clean.
+# The result is cached as a Parquet snapshot (see src/snapshot.py).
+#
+# Refreshes from RDS are delta pulls. A poll only runs PROBE_SQL (row count
+# + latest month, no hashing), which is also the RDS part of the snapshot
+# key. When it moves, parks_df's watermark (its latest historical month +
+# the count and hash sum of the source rows before it) decides: with the
+# same number of rows before the watermark month, only rows from that
+# month on are fetched and merged in; otherwise the whole table is pulled.
+# The server-side hash is additive, so after a delta pull only the fetched
+# range is hashed to move the watermark and the table fingerprint
+# (source_fingerprint) forward. Edits in place that keep the count and the
+# latest month are not seen by the probe; a process starting from a
+# snapshot compares its source_fingerprint with one full hash of the table,
+# once, and rebuilds on a mismatch.
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from sqlalchemy import text
+
+from src.db import get_engine
+from src import shared_frame, snapshot
+
+APP_DIR = snapshot.APP_DIR
+
+TABLE_NAME = "parks_visits"
+LOCAL_CSV = os.path.join(APP_DIR, "all_parks_recreation_visits.csv")
+# Hive-partitioned copy of data/cleaned/parks_dataset (etl/merge_and_clean.py)
+LOCAL_DATASET = os.getenv("PARKS_DATASET", os.path.join(APP_DIR, "parks_dataset"))
+LOCAL_COLUMNS = [
+    "Park", "Unit Code", "Park Type", "Region", "State",
+    "Year", "Month", "Recreation Visits",
+]
+FORECAST_PATH = os.path.join(APP_DIR, "monthly_forecasts.csv")
+# Rows per fetch from the server-side cursor
+FETCH_CHUNK = int(os.getenv("PARKS_FETCH_CHUNK", "50000"))
+
+
+# =========================================================
+# SOURCE  (RDS with local Parquet dataset / CSV fallback)
+# =========================================================
+
+def local_fingerprint() -> str:
+    if os.path.isdir(LOCAL_DATASET):
+        return "dataset:" + snapshot.dir_fingerprint(LOCAL_DATASET)
+    return snapshot.file_fingerprint(LOCAL_CSV)
+
+
+def _read_local() -> pd.DataFrame:
+    """The local Parquet dataset when there is one, else the CSV."""
+    if os.path.isdir(LOCAL_DATASET):
+        try:
+            dataset = ds.dataset(LOCAL_DATASET, format="parquet", partitioning="hive")
+            return dataset.to_table(columns=LOCAL_COLUMNS).to_pandas()
+        except Exception as e:
+            print("WARNING: Could not read local Parquet dataset, using local CSV instead.")
+            print("Reason:", repr(e))
+    return pd.read_csv(LOCAL_CSV)
+
+
+def _connect_source():
+    """
+    Return (engine, fingerprint). engine is None when RDS is unreachable and
+    local data is used instead. The RDS fingerprint is the cheap PROBE_SQL
+    high-water mark, not a hash of the rows.
+    """
+    try:
+        engine = get_engine()
+        with engine.connect() as conn:
+            rows, latest = conn.execute(text(PROBE_SQL)).one()
+        return engine, f"{TABLE_NAME}:{rows}:{latest}"
+    except Exception as e:
+        print("WARNING: Could not connect to RDS, using local data instead.")
+        print("Reason:", repr(e))
+        return None, local_fingerprint()
+
+
+def _read_sql_chunks(engine, sql: str, params=None) -> pd.DataFrame:
+    """Result of sql streamed through a server-side cursor, FETCH_CHUNK rows at a time."""
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True)
+        chunks = pd.read_sql(text(sql), conn, params=params or {}, chunksize=FETCH_CHUNK)
+        return pd.concat(chunks, ignore_index=True)
+
+
+def _read_source(engine):
+    """Return (raw rows, engine they came from or None for local data)."""
+    if engine is not None:
+        try:
+            return _read_sql_chunks(engine, f"SELECT * FROM {TABLE_NAME}"), engine
+        except Exception as e:
+            print("WARNING: Could not read from RDS, using local data instead.")
+            print("Reason:", repr(e))
+    return _read_local(), None
+
+
+def _snapshot_key(source) -> str:
+    return snapshot.snapshot_key(source[1], snapshot.file_fingerprint(FORECAST_PATH))
+
+
+def current_snapshot_key() -> str:
+    return _snapshot_key(_connect_source())
+
+
+# =========================================================
+# DELTA PULL
+# =========================================================
+
+BEFORE_MARK = '("Year", "Month") < (:year, :month)'
+SINCE_MARK = '("Year", "Month") >= (:since_year, :since_month)'
+DELTA_SQL = f'SELECT * FROM {TABLE_NAME} WHERE ("Year", "Month") >= (:year, :month)'
+COUNT_BEFORE_SQL = f"SELECT COUNT(*) FROM {TABLE_NAME} WHERE {BEFORE_MARK}"
+# Row count + latest YYYYMM; the ORDER BY / LIMIT is answered from an index
+PROBE_SQL = (
+    f"SELECT (SELECT COUNT(*) FROM {TABLE_NAME}), "
+    f'(SELECT "Year" * 100 + "Month" FROM {TABLE_NAME} ORDER BY "Year" DESC, "Month" DESC LIMIT 1)'
+)
+
+
+def _historical(parks_df: pd.DataFrame) -> pd.DataFrame:
+    if "IsForecast" not in parks_df.columns:
+        return parks_df
+    return parks_df[~parks_df["IsForecast"].to_numpy(bool)]
+
+
+def _periods(df: pd.DataFrame) -> np.ndarray:
+    return df["Year"].to_numpy(np.int32) * 100 + df["Month"].to_numpy(np.int32)
+
+
+def _counts(fingerprint: str):
+    """(rows, hash sum) of a snapshot.db_fingerprint string."""
+    _, rows, total = fingerprint.rsplit(":", 2)
+    return int(rows), int(total)
+
+
+def _stamp(engine, parks_df: pd.DataFrame, base=None):
+    """
+    Store the watermark [year, month, rows before it, their hash sum] and
+    the table's source_fingerprint in parks_df.attrs when the rows came
+    from RDS. base is the previous watermark after a delta pull: only rows
+    from its month on are hashed and added to its counts. Otherwise the
+    whole table is hashed (a full pull reads all of it anyway).
+    """
+    hist = _historical(parks_df)
+    if engine is None or hist.empty:
+        return
+    year, month = divmod(int(_periods(hist).max()), 100)
+    params = {"year": year, "month": month}
+    rows, total, where = 0, 0, ""
+    if base:
+        since_year, since_month, rows, total = base
+        params.update(since_year=since_year, since_month=since_month)
+        where = SINCE_MARK
+    try:
+        scope, before = snapshot.db_fingerprints(engine, TABLE_NAME, [BEFORE_MARK], params, where)
+    except Exception as e:
+        print("WARNING: Could not fingerprint RDS rows, the next refresh pulls the whole table.")
+        print("Reason:", repr(e))
+        return
+    (scope_rows, scope_total), (before_rows, before_total) = _counts(scope), _counts(before)
+    parks_df.attrs["watermark"] = [year, month, rows + before_rows, total + before_total]
+    parks_df.attrs["source_fingerprint"] = f"{TABLE_NAME}:{rows + scope_rows}:{total + scope_total}"
+
+
+def _snapshot_current(engine, parks_df: pd.DataFrame) -> bool:
+    """
+    Whether a snapshot read at process start still matches the RDS rows:
+    its source_fingerprint against one full hash of the table (the probe
+    key cannot see edits that keep the count and the latest month).
+    """
+    if engine is None:
+        return True
+    stamped = parks_df.attrs.get("source_fingerprint")
+    if stamped is None:
+        return False
+    try:
+        return snapshot.db_fingerprint(engine, TABLE_NAME) == stamped
+    except Exception as e:
+        print("WARNING: Could not fingerprint RDS rows, using the snapshot as is.")
+        print("Reason:", repr(e))
+        return True
+
+
+def _delta_parks_df(engine, previous: pd.DataFrame):
+    """
+    previous with the source rows from its watermark month on fetched again
+    and merged in (then cleaned like a full pull), or None when a full pull
+    is needed: no watermark, or rows before it were added or deleted.
+    """
+    mark = previous.attrs.get("watermark")
+    if not mark or len(mark) != 4:
+        return None
+    year, month, before_rows, _ = mark
+    params = {"year": year, "month": month}
+    with engine.connect() as conn:
+        if conn.execute(text(COUNT_BEFORE_SQL), params).scalar() != before_rows:
+            return None
+
+    delta = _read_sql_chunks(engine, DELTA_SQL, params)
+    hist = _historical(previous)
+    kept = hist.loc[
+        _periods(hist) < year * 100 + month,
+        [c for c in APP_COLUMNS if c in hist.columns and c != "IsForecast"],
+    ]
+    print(f"Delta pull: {len(delta):,} rows from {year}-{month:02d} on, {len(kept):,} rows kept")
+    merged = pd.concat([kept, delta], ignore_index=True, sort=False)
+    return compact_parks(clean_parks(append_forecasts(merged)))
+
+
+# =========================================================
+# FORECAST MERGE
+# =========================================================
+
+def read_forecasts(hist_latest):
+    """
+    Rows of monthly_forecasts.csv for years after hist_latest (the last
+    historical year), marked IsForecast; None when there is no forecast file.
+    """
+    if not os.path.exists(FORECAST_PATH):
+        return None
+
+    fc_df = pd.read_csv(FORECAST_PATH)
+
+    # Expected columns (from your screenshots):
+    # Park, Best_Model, Forecast_Month, Predicted_Visits,
+    # Unit Code, Park Type, Region, State, Year, Month, _source_file
+
+    # If Forecast_Month exists, convert to Year / Month
+    if "Forecast_Month" in fc_df.columns:
+        fc_df["Forecast_Month"] = pd.to_datetime(
+            fc_df["Forecast_Month"],
+            dayfirst=True,        # because it's like 01-01-2025
+            errors="coerce",
+        )
+        fc_df["Year"] = fc_df["Forecast_Month"].dt.year
+        fc_df["Month"] = fc_df["Forecast_Month"].dt.month
+
+    # Match visit column name
+    if "Predicted_Visits" in fc_df.columns:
+        fc_df = fc_df.rename(columns={"Predicted_Visits": "Recreation Visits"})
+
+    # Ensure required columns exist
+    required_cols = ["Park", "State", "Year", "Month", "Recreation Visits", "Park Type"]
+    for col in required_cols:
+        if col not in fc_df.columns:
+            fc_df[col] = np.nan
+
+    # Keep only years AFTER the last historical year
+    fc_df = fc_df[pd.to_numeric(fc_df["Year"], errors="coerce") > hist_latest]
+
+    # Mark as forecast
+    fc_df["IsForecast"] = True
+    return fc_df
+
+
+def append_forecasts(parks_df: pd.DataFrame) -> pd.DataFrame:
+    # Mark all rows loaded so far as historical (not forecast)
+    parks_df["IsForecast"] = False
+
+    # Load monthly_forecasts.csv and append FUTURE years only
+    fc_df = read_forecasts(pd.to_numeric(parks_df["Year"], errors="coerce").max())
+    if fc_df is None:
+        return parks_df
+
+    # Align columns where possible and append
+    common_cols = list(set(parks_df.columns).intersection(fc_df.columns))
+    return pd.concat(
+        [parks_df, fc_df[common_cols]],
+        ignore_index=True,
+        sort=False,
+    )
+
+
+def forecast_rows(hist_latest):
+    """
+    Cleaned forecast rows after hist_latest in the compact schema, for
+    backends that read the historical rows elsewhere (src/sql_backend.py);
+    None when there are none.
+    """
+    fc_df = read_forecasts(hist_latest)
+    if fc_df is None:
+        return None
+    fc_df = clean_parks(fc_df)
+    if fc_df.empty:
+        return None
+    return compact_parks(fc_df)
+
+
+# =========================================================
+# CLEANING
+# =========================================================
+
+def clean_parks(parks_df: pd.DataFrame) -> pd.DataFrame:
+    parks_df = parks_df.dropna(
+        subset=["State", "Park", "Month", "Year", "Recreation Visits"]
+    )
+
+    parks_df["State"] = parks_df["State"].astype(str).str.strip()
+    parks_df["Park"] = parks_df["Park"].astype(str).str.strip()
+    parks_df["Month"] = parks_df["Month"].astype(int)
+    parks_df["Year"] = parks_df["Year"].astype(int)
+    parks_df["Recreation Visits"] = parks_df["Recreation Visits"].astype(float)
+
+    if "Park Type" not in parks_df.columns:
+        parks_df["Park Type"] = "Unknown"
+
+    return parks_df
+
+
+# =========================================================
+# COMPACT SCHEMA
+# =========================================================
+
+# Columns the app reads (core.py derives RegionGroup from State). IsForecast
+# is kept so the CSV download still tells forecasts from actuals.
+APP_COLUMNS = ["Park", "Park Type", "State", "Year", "Month", "Recreation Visits", "IsForecast"]
+CATEGORY_COLS = ["Park", "Park Type", "State"]
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compact_parks(parks_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Project to APP_COLUMNS with compact dtypes: categoricals for the string
+    dimensions, int16 Year, int8 Month, and uint32 visits when every value
+    is a whole number that fits (float64 otherwise, so forecasts with
+    fractions keep their precision). Every Dash worker holds a copy.
+    """
+    before = frame_bytes(parks_df)
+    parks_df = parks_df[[c for c in APP_COLUMNS if c in parks_df.columns]].copy()
+
+    for col in CATEGORY_COLS:
+        parks_df[col] = parks_df[col].astype("category")
+    parks_df["Year"] = parks_df["Year"].astype(np.int16)
+    parks_df["Month"] = parks_df["Month"].astype(np.int8)
+
+    visits = parks_df["Recreation Visits"].to_numpy()
+    if (
+        len(visits)
+        and visits.min() >= 0
+        and visits.max() <= np.iinfo(np.uint32).max
+        and np.array_equal(visits, np.floor(visits))
+    ):
+        parks_df["Recreation Visits"] = visits.astype(np.uint32)
+
+    after = frame_bytes(parks_df)
+    print(f"parks_df: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB ({len(parks_df):,} rows, compact dtypes)")
+    return parks_df
+
+
+# =========================================================
+# ENTRY POINT
+# =========================================================
+
+def _load_parks_df(rebuild: bool = False, previous=None, source=None) -> pd.DataFrame:
+    """
+    parks_df for source (_connect_source()'s result, looked up when not
+    given), from the snapshot, a delta pull on previous or a full pull.
+    """
+    source = source or _connect_source()
+    engine = source[0]
+    key = _snapshot_key(source)
+
+    parks_df = None
+    if snapshot.SNAPSHOT_ENABLED and not rebuild:
+        parks_df = snapshot.read_snapshot(key)
+        # at process start the snapshot may predate edits the probe misses
+        if parks_df is not None and previous is None and not _snapshot_current(engine, parks_df):
+            print("Snapshot no longer matches the RDS rows, reloading the whole table.")
+            parks_df = None
+
+    if parks_df is None:
+        origin, base = engine, None
+        if engine is not None and previous is not None and not rebuild:
+            try:
+                parks_df = _delta_parks_df(engine, previous)
+            except Exception as e:
+                print("WARNING: Could not pull changed rows from RDS, reloading the whole table.")
+                print("Reason:", repr(e))
+            if parks_df is not None:
+                base = previous.attrs["watermark"]
+        if parks_df is None:
+            raw, origin = _read_source(engine)
+            parks_df = compact_parks(clean_parks(append_forecasts(raw)))
+        _stamp(origin, parks_df, base)
+        if snapshot.SNAPSHOT_ENABLED or rebuild:
+            snapshot.write_snapshot(parks_df, key)
+
+    parks_df.attrs["data_version"] = key
+    return parks_df
+
+
+def materialize_shared(rebuild: bool = False, want_key=None, previous=None, source=None) -> str:
+    """
+    Load parks_df and write it as the shared memory-mapped frame workers
+    attach to (see src/shared_frame.py). Returns its key. Skipped when the
+    frame is already at want_key, e.g. because another worker materialized
+    it first. previous and source are passed on for a delta pull (see
+    _load_parks_df).
+    """
+    with shared_frame.build_lock():
+        key = shared_frame.current_key()
+        if key is not None and key == want_key:
+            return key
+        parks_df = _load_parks_df(rebuild, previous, source)
+        key = parks_df.attrs["data_version"]
+        shared_frame.write_shared(parks_df, key)
+        shared_frame.prune(key)
+    return key
+
+
+def load_parks_df(rebuild: bool = False) -> pd.DataFrame:
+    """
+    Cleaned parks + future forecasts in the compact schema (see
+    compact_parks). Served from the Parquet snapshot when its key matches
+    the current source data; otherwise rebuilt from the source and written
+    back as the new snapshot.
+
+    With PARKS_SHARED=1 the frame is instead attached read-only from the
+    shared memory-mapped copy (materialized first if there is none or it was
+    built from older source data), so gunicorn workers share one copy of
+    the data.
+
+    The snapshot key is stored in parks_df.attrs["data_version"] so result
+    caches can tell datasets apart.
+    """
+    source = None
+    if shared_frame.SHARED_ENABLED and not rebuild:
+        try:
+            source = _connect_source()
+            want = _snapshot_key(source)
+            key = shared_frame.current_key()
+            if key != want:
+                key = materialize_shared(want_key=want, source=source)
+            parks_df = shared_frame.attach_shared(key)
+            if parks_df is not None:
+                return parks_df
+        except Exception as e:
+            print("WARNING: Could not attach shared parks data, loading a private copy.")
+            print("Reason:", repr(e))
+
+    return _load_parks_df(rebuild, source=source)
+
+
+def refresh_parks_df(loaded_version=None, previous=None):
+    """
+    parks_df for the current source data, or None when its snapshot key is
+    still loaded_version (one PROBE_SQL query, no hashing). Used by
+    core.reload_data to pick up new data without a restart; in shared mode
+    the new frame is materialized once and attached by every worker.
+
+    previous (the loaded parks_df) turns an RDS refresh into a delta pull:
+    only rows from its watermark month on are fetched and merged into it.
+    """
+    source = _connect_source()
+    key = _snapshot_key(source)
+    if key == loaded_version:
+        return None
+
+    if shared_frame.SHARED_ENABLED:
+        try:
+            key = materialize_shared(want_key=key, previous=previous, source=source)
+            parks_df = shared_frame.attach_shared(key)
+            if parks_df is not None:
+                return parks_df
+        except Exception as e:
+            print("WARNING: Could not attach shared parks data, loading a private copy.")
+            print("Reason:", repr(e))
+
+    return _load_parks_df(previous=previous, source=source)
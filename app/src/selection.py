@@ -0,0 +1,126 @@
+# selection.py
+#
+# Copy-free filtering over the parks frame.
+#
+# Every filterable value gets a packed bitmap (np.packbits, 1 bit per row)
+# built once when the frame is loaded. A request ANDs the bitmaps it needs
+# and gets back row positions, so only the selected rows are ever
+# materialized (filter_parks, the CSV download). The rollups behind the
+# charts come from src/cube.py.
+
+import numpy as np
+import pandas as pd
+
+
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    arr = np.asarray(arr)
+    arr.flags.writeable = False
+    return arr
+
+
+def is_national_park(park_type: pd.Series) -> np.ndarray:
+    """Destination class: True for "National Park"-like park types."""
+    return park_type.str.contains("National Park", case=False, na=False).to_numpy(dtype=bool)
+
+
+class FilterEngine:
+    """
+    Bitmap indexes over a static parks DataFrame.
+
+    positions(...) -> sorted int row positions matching the filters
+    """
+
+    def __init__(self, df: pd.DataFrame, regions: dict):
+        self.n_rows = len(df)
+        self.regions = regions
+        self._n_bytes = (self.n_rows + 7) // 8
+
+        # filter dimension -> {value: packed bitmap}
+        self._bitmaps = {
+            "year": self._index_column(df["Year"]),
+            "month": self._index_column(df["Month"]),
+            "state": self._index_column(df["State"]),
+            "park_type": self._index_column(df["Park Type"]),
+            "region_group": self._index_column(df["RegionGroup"]),
+        }
+
+        # Region filter follows REGIONS membership (a state may sit in more
+        # than one region), so it is the union of the member state bitmaps.
+        states = self._bitmaps["state"]
+        self._bitmaps["region"] = {}
+        for region, members in regions.items():
+            bm = self._empty()
+            for s in set(members):
+                if s in states:
+                    bm |= states[s]
+            self._bitmaps["region"][region] = _readonly(bm)
+
+        # National Park vs City is classified once per distinct park type
+        dest = np.zeros(self.n_rows, dtype=bool)
+        for park_type, bm in self._bitmaps["park_type"].items():
+            if is_national_park(pd.Series([park_type]))[0]:
+                dest |= self._unpack(bm)
+        self._bitmaps["dest"] = {
+            "National Park": _readonly(np.packbits(dest)),
+            "City": _readonly(np.packbits(~dest)),
+        }
+
+    # -------------------------
+    # bitmaps
+    # -------------------------
+
+    def _empty(self) -> np.ndarray:
+        return np.zeros(self._n_bytes, dtype=np.uint8)
+
+    def _unpack(self, bitmap: np.ndarray) -> np.ndarray:
+        return np.unpackbits(bitmap, count=self.n_rows).astype(bool)
+
+    def _index_column(self, col: pd.Series) -> dict:
+        codes, labels = pd.factorize(col, sort=True)
+        return {
+            label: _readonly(np.packbits(codes == i))
+            for i, label in enumerate(labels.tolist())
+        }
+
+    def bitmap(self, dim, value) -> np.ndarray:
+        """Packed bitmap for one filter value (all zeros when unseen)."""
+        bm = self._bitmaps[dim].get(value)
+        return bm if bm is not None else self._empty()
+
+    def bitmaps_for(
+        self,
+        month_val=None,
+        year_val=None,
+        region_val=None,
+        dest_val=None,
+        park_type_val=None,
+    ):
+        bitmaps = []
+        if year_val is not None:
+            bitmaps.append(self.bitmap("year", int(year_val)))
+        if month_val is not None:
+            bitmaps.append(self.bitmap("month", int(month_val)))
+        if region_val and region_val != "All":
+            bitmaps.append(self.bitmap("region", region_val))
+        if dest_val in ("National Park", "City"):
+            bitmaps.append(self.bitmap("dest", dest_val))
+        if park_type_val and park_type_val != "All":
+            bitmaps.append(self.bitmap("park_type", park_type_val))
+        return bitmaps
+
+    def positions(
+        self,
+        month_val=None,
+        year_val=None,
+        region_val=None,
+        dest_val=None,
+        park_type_val=None,
+    ) -> np.ndarray:
+        bitmaps = self.bitmaps_for(month_val, year_val, region_val, dest_val, park_type_val)
+        if not bitmaps:
+            return np.arange(self.n_rows)
+
+        sel = bitmaps[0].copy()
+        for bm in bitmaps[1:]:
+            np.bitwise_and(sel, bm, out=sel)
+        return np.flatnonzero(np.unpackbits(sel, count=self.n_rows))
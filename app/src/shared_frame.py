@@ -0,0 +1,128 @@
+# shared_frame.py
+#
+# parks_df as a directory of memory-mapped .npy columns, for running the app
+# under several gunicorn workers (see gunicorn.conf.py).
+#
+# One process materializes the frame: numeric columns as-is, categoricals as
+# their integer codes plus a categories list in meta.json. Every worker then
+# attaches read-only NumPy views of the same files, so the column data sits
+# once in the OS page cache instead of once per worker, and a worker start
+# is a few file opens rather than a DB pull + cleaning.
+#
+#   snapshots/shared_v1_<key>/meta.json, Park.npy, Year.npy, ...
+#   snapshots/shared_current          <- key of the latest materialized frame
+
+import json
+import os
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from src import snapshot
+
+# Bump when the on-disk layout changes so old directories go stale
+SHARED_VERSION = 1
+SHARED_ENABLED = os.getenv("PARKS_SHARED", "0") == "1"
+
+_PREFIX = "shared_v"
+POINTER = os.path.join(snapshot.SNAPSHOT_DIR, "shared_current")
+LOCK = os.path.join(snapshot.SNAPSHOT_DIR, "shared.lock")
+
+
+def shared_path(key: str) -> str:
+    return os.path.join(snapshot.SNAPSHOT_DIR, f"{_PREFIX}{SHARED_VERSION}_{key}")
+
+
+def _column_file(path: str, i: int) -> str:
+    # by position: column names may not be valid file names
+    return os.path.join(path, f"col{i}.npy")
+
+
+def write_shared(df: pd.DataFrame, key: str) -> str:
+    """Materialize df under shared_path(key) (atomic) and point POINTER at it."""
+    path = shared_path(key)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = []
+    for i, (name, col) in enumerate(df.items()):
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            np.save(_column_file(tmp, i), col.cat.codes.to_numpy())
+            columns.append({"name": name, "categories": col.cat.categories.tolist()})
+        else:
+            np.save(_column_file(tmp, i), col.to_numpy())
+            columns.append({"name": name})
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"columns": columns, "attrs": df.attrs}, f)
+
+    if os.path.exists(path):
+        shutil.rmtree(tmp)
+    else:
+        os.replace(tmp, path)
+    _write_pointer(key)
+    return path
+
+
+def attach_shared(key: str):
+    """
+    DataFrame of read-only memory-mapped views for key, or None when it has
+    not been materialized.
+    """
+    path = shared_path(key)
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    data = {}
+    for i, col in enumerate(meta["columns"]):
+        values = np.load(_column_file(path, i), mmap_mode="r")
+        if "categories" in col:
+            values = pd.Categorical.from_codes(values, col["categories"], validate=False)
+        data[col["name"]] = values
+    df = pd.DataFrame(data, copy=False)
+    df.attrs.update(meta["attrs"])
+    return df
+
+
+def current_key():
+    """Key of the last materialized frame, or None."""
+    try:
+        with open(POINTER) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_pointer(key: str):
+    tmp = f"{POINTER}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(key)
+    os.replace(tmp, POINTER)
+
+
+def prune(keep_key: str):
+    """Remove materialized frames other than keep_key."""
+    keep = shared_path(keep_key)
+    for name in os.listdir(snapshot.SNAPSHOT_DIR):
+        path = os.path.join(snapshot.SNAPSHOT_DIR, name)
+        if name.startswith(_PREFIX) and os.path.isdir(path) and path != keep and not name.endswith(".tmp"):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def build_lock():
+    """Exclusive lock so only one process materializes at a time."""
+    import fcntl
+
+    os.makedirs(snapshot.SNAPSHOT_DIR, exist_ok=True)
+    with open(LOCK, "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
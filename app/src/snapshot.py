@@ -0,0 +1,170 @@
+# snapshot.py
+#
+# Versioned Parquet snapshot of the cleaned parks dataset.
+#
+# The snapshot is written after cleaning + forecast merge and is keyed by a
+# hash of the source data, so workers can skip the DB pull / CSV parse and
+# string cleaning when nothing has changed.
+#
+# Rebuild from the command line (run from the app/ folder):
+#   python -m src.snapshot            # rebuild if stale or missing
+#   python -m src.snapshot --force    # always rebuild
+#   python -m src.snapshot --status   # show key + snapshot path only
+
+import argparse
+import glob
+import hashlib
+import os
+
+import pandas as pd
+from sqlalchemy import text
+
+# Bump when the cleaning logic or stored schema changes so old files go stale
+SNAPSHOT_VERSION = 2
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_DIR = os.getenv("PARKS_SNAPSHOT_DIR", os.path.join(APP_DIR, "snapshots"))
+SNAPSHOT_ENABLED = os.getenv("PARKS_SNAPSHOT", "1") != "0"
+
+_PREFIX = "parks_v"
+
+
+def file_fingerprint(path: str) -> str:
+    """sha256 of a file's bytes ("missing" when the file does not exist)."""
+    if not os.path.exists(path):
+        return "missing"
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def dir_fingerprint(path: str) -> str:
+    """sha256 over the relative path and bytes of every file under a directory."""
+    if not os.path.isdir(path):
+        return "missing"
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            h.update(os.path.relpath(full, path).encode())
+            h.update(file_fingerprint(full).encode())
+    return h.hexdigest()
+
+
+def db_fingerprint(engine, table: str, where: str = "", params=None) -> str:
+    """
+    Content fingerprint of a table (or of the rows matching `where`)
+    computed server-side, so only two numbers travel over the wire instead
+    of the whole table.
+    """
+    sql = text(
+        f"SELECT COUNT(*) AS n, COALESCE(SUM(hashtext(t::text)::bigint), 0) AS h "
+        f"FROM {table} t" + (f" WHERE {where}" if where else "")
+    )
+    with engine.connect() as conn:
+        n, h = conn.execute(sql, params or {}).one()
+    return f"{table}:{n}:{h}"
+
+
+def db_fingerprints(engine, table: str, wheres=(), params=None, where: str = "") -> list:
+    """
+    [db_fingerprint of the table (or of the rows matching `where`)] + one
+    per condition in wheres (the rows among those matching it), all from a
+    single pass. Fingerprints are additive: count and hash sum of a union
+    of disjoint row sets are the sums of theirs.
+    """
+    sums = ["COUNT(*)", "COALESCE(SUM(h), 0)"]
+    for cond in wheres:
+        sums += [f"COUNT(*) FILTER (WHERE {cond})", f"COALESCE(SUM(h) FILTER (WHERE {cond}), 0)"]
+    sql = text(
+        f"SELECT {', '.join(sums)} "
+        f"FROM (SELECT t.*, hashtext(t::text)::bigint AS h FROM {table} t"
+        + (f" WHERE {where}" if where else "") + ") s"
+    )
+    with engine.connect() as conn:
+        row = conn.execute(sql, params or {}).one()
+    return [f"{table}:{row[i]}:{row[i + 1]}" for i in range(0, len(row), 2)]
+
+
+def snapshot_key(*fingerprints: str) -> str:
+    h = hashlib.sha256(f"v{SNAPSHOT_VERSION}".encode())
+    for fp in fingerprints:
+        h.update(b"\0")
+        h.update(fp.encode())
+    return h.hexdigest()[:16]
+
+
+def snapshot_path(key: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{_PREFIX}{SNAPSHOT_VERSION}_{key}.parquet")
+
+
+def read_snapshot(key: str):
+    """Return the snapshot DataFrame for `key`, or None if missing/unreadable."""
+    path = snapshot_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print("WARNING: Could not read parks snapshot, rebuilding.")
+        print("Reason:", repr(e))
+        return None
+
+
+def write_snapshot(df: pd.DataFrame, key: str):
+    """
+    Atomically write `df` as the snapshot for `key` and drop older snapshots.
+    Returns the written path, or None when writing failed (the app keeps
+    running from the in-memory frame).
+    """
+    path = snapshot_path(key)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except Exception as e:
+        print("WARNING: Could not write parks snapshot.")
+        print("Reason:", repr(e))
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return None
+
+    for old in glob.glob(os.path.join(SNAPSHOT_DIR, f"{_PREFIX}*.parquet")):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return path
+
+
+def main(argv=None):
+    from src.loader import current_snapshot_key, load_parks_df
+
+    parser = argparse.ArgumentParser(description="Rebuild the parks data snapshot.")
+    parser.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    parser.add_argument("--status", action="store_true", help="only report key and path")
+    args = parser.parse_args(argv)
+
+    key = current_snapshot_key()
+    path = snapshot_path(key)
+    fresh = os.path.exists(path)
+    print(f"snapshot key: {key}")
+    print(f"snapshot path: {path} ({'up to date' if fresh else 'stale or missing'})")
+    if args.status:
+        return
+
+    if fresh and not args.force:
+        print("Nothing to do.")
+        return
+
+    df = load_parks_df(rebuild=True)
+    print(f"Wrote snapshot with {len(df):,} rows.")
+
+
+if __name__ == "__main__":
+    main()
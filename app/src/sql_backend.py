@@ -0,0 +1,333 @@
+# sql_backend.py
+#
+# Pushdown query backend (PARKS_BACKEND=sql, see core.py): the dashboard
+# rollups are answered by the database instead of an in-memory cube, so
+# the app never pulls park_visits into memory.
+#
+# SqlBackend has the same rollup API the builders use in memory mode:
+#   totals(keys, ...)        like VisitCube.totals
+#   status / top_parks(...)  like StateMap
+#   rows(...)                like filter_parks (only for the CSV download)
+# The five dashboard filters compile to one parameterized WHERE clause and
+# each call is a single GROUP BY returning just the aggregated rows:
+#   - state / region / year / month rollups without a destination or park
+#     type filter read mv_state_month_visits (etl/analytics_views.sql),
+#   - everything else reads park_visits; the state + year + month
+#     predicates are covered by ix_state_year_month.
+# The view is refreshed after a load by etl/refresh_views.py. Both scripts
+# stamp the one-row park_visits_refresh marker (load_seq / views_seq), which
+# is the data version, so a poll reads one row instead of the table. A
+# backend whose views are behind the last load (views_seq != load_seq)
+# reads park_visits for everything.
+#
+# Future forecast rows are not in the database. They are kept in a small
+# in-memory VisitCube (the overlay) and merged into each result; forecast
+# years come after every database year, so one (year, month) is answered by
+# exactly one side.
+
+import os
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from src import snapshot
+from src.cube import VisitCube
+from src.selection import FilterEngine, is_national_park
+from src.state_map import StateMap, column_quantiles, QUANTILES, NORMAL, OFF_SEASON, HOTSPOT
+
+VALUE_COL = "Recreation Visits"
+BASE_TABLE = os.getenv("PARKS_SQL_TABLE", "park_visits")
+STATE_MONTH_VIEW = "mv_state_month_visits"
+# PARKS_SQL_VIEWS=0 reads park_visits only, e.g. while the views are stale
+USE_VIEWS = os.getenv("PARKS_SQL_VIEWS", "1") != "0"
+
+# app column -> park_visits column (RegionGroup is derived from state)
+COLUMNS = {
+    "Park": "park",
+    "Park Type": "park_type",
+    "State": "state",
+    "Year": "year",
+    "Month": "month",
+    VALUE_COL: "recreation_visits",
+}
+TEXT_KEYS = ("Park", "State", "RegionGroup")
+STATE_LEVEL_KEYS = {"State", "RegionGroup", "Year", "Month"}
+
+
+# Written by etl/load_park_visits.py and etl/refresh_views.py
+MARKER_TABLE = "park_visits_refresh"
+
+
+def refresh_marker(engine):
+    """(load_seq, views_seq) from MARKER_TABLE, or None without one (older ETL)."""
+    try:
+        with engine.connect() as conn:
+            return tuple(conn.execute(text(f"SELECT load_seq, views_seq FROM {MARKER_TABLE}")).one())
+    except Exception:
+        return None
+
+
+def data_version(engine, *fingerprints, table=BASE_TABLE) -> str:
+    """
+    Snapshot-style key of the loads and view refreshes recorded in
+    MARKER_TABLE (+ other inputs, e.g. forecasts). Without the marker the
+    table contents are fingerprinted instead, a full scan per call.
+    """
+    marker = refresh_marker(engine)
+    if marker is None:
+        source = snapshot.db_fingerprint(engine, table)
+    else:
+        source = f"{table}:load{marker[0]}:views{marker[1]}"
+    return snapshot.snapshot_key(source, *fingerprints)
+
+
+class SqlBackend:
+    def __init__(self, engine, regions: dict, state_codes, version: str, forecasts=None, table=BASE_TABLE):
+        """
+        forecasts(hist_latest) returns the rows the database does not hold
+        (future forecasts) in the app's compact schema with RegionGroup, or
+        None.
+        """
+        self.engine = engine
+        self.regions = regions
+        self.state_codes = list(state_codes)
+        self.version = version
+        self.table = table
+        self._collate = self._text_collation()
+        self.use_views = USE_VIEWS and self._view_is_fresh()
+
+        self._db_years = {
+            int(y) for (y,) in self._query(f"SELECT DISTINCT year FROM {table} WHERE state IS NOT NULL", {})
+        }
+        park_types = {
+            t for (t,) in self._query(f"SELECT DISTINCT park_type FROM {table} WHERE state IS NOT NULL", {})
+            if t is not None
+        }
+
+        self.overlay = None
+        self._overlay_df = None
+        ((hist_latest,),) = self._query(f"SELECT MAX(year) FROM {table}", {})
+        overlay = forecasts(hist_latest) if forecasts is not None else None
+        if overlay is not None and len(overlay):
+            self._overlay_df = overlay
+            self._overlay_filters = FilterEngine(overlay, regions)
+            self.overlay = VisitCube(overlay, regions)
+            self._overlay_map = StateMap(self.overlay, state_codes)
+
+        self._overlay_years = set()
+        if self.overlay is not None:
+            self._overlay_years = {int(y) for y in self.overlay.years}
+            park_types |= set(overlay["Park Type"].dropna().astype(str))
+
+        self.years = sorted(self._db_years | self._overlay_years)
+        self.park_types = sorted(park_types)
+        # one entry per park type; core.context_key reads the destination
+        # class a park type implies
+        self.park_type = np.array(self.park_types, dtype=object)
+        self.park_is_np = is_national_park(pd.Series(self.park_type, dtype=object))
+
+    # -------------------------
+    # SQL building
+    # -------------------------
+
+    def _region_group_sql(self, params) -> str:
+        """CASE expression for core.map_region_group (first listed region wins)."""
+        whens = []
+        for i, (name, states) in enumerate(self.regions.items()):
+            params[f"rg{i}"] = list(states)
+            params[f"rg{i}_name"] = name
+            whens.append(f"WHEN state IN :rg{i} THEN :rg{i}_name")
+        return f"CASE {' '.join(whens)} ELSE 'Other' END"
+
+    def _where(self, params, month_val=None, year_val=None, region_val=None, dest_val=None, park_type_val=None) -> str:
+        # core.clean_parks drops rows without a state
+        clauses = ["state IS NOT NULL"]
+        if year_val is not None:
+            clauses.append("year = :year")
+            params["year"] = int(year_val)
+        if month_val is not None:
+            clauses.append("month = :month")
+            params["month"] = int(month_val)
+        if region_val and region_val != "All":
+            clauses.append("state IN :region_states")
+            params["region_states"] = sorted(set(self.regions.get(region_val, [])))
+        # src.selection.is_national_park
+        if dest_val == "National Park":
+            clauses.append("LOWER(park_type) LIKE '%national park%'")
+        elif dest_val == "City":
+            clauses.append("COALESCE(LOWER(park_type), '') NOT LIKE '%national park%'")
+        if park_type_val and park_type_val != "All":
+            clauses.append("park_type = :park_type")
+            params["park_type"] = park_type_val
+        return " AND ".join(clauses)
+
+    def _text_collation(self) -> str:
+        # byte-order sorting, so text keys come back in the same order as
+        # a pandas groupby
+        return ' COLLATE "C"' if self.engine.dialect.name == "postgresql" else ""
+
+    def _query(self, sql: str, params: dict):
+        stmt = text(sql)
+        expanding = [k for k, v in params.items() if isinstance(v, list)]
+        if expanding:
+            stmt = stmt.bindparams(*(bindparam(k, expanding=True) for k in expanding))
+        with self.engine.connect() as conn:
+            return conn.execute(stmt, params).fetchall()
+
+    def _view_is_fresh(self) -> bool:
+        """Whether the views include the last load, per MARKER_TABLE."""
+        marker = refresh_marker(self.engine)
+        if marker is None:
+            print(f"WARNING: No {MARKER_TABLE} marker, reading {self.table} only.")
+            print("Reason: run etl/refresh_views.py to record a view refresh.")
+            return False
+        load_seq, views_seq = marker
+        if views_seq != load_seq:
+            print(
+                f"WARNING: {STATE_MONTH_VIEW} is behind the last load of {self.table}, "
+                f"reading {self.table} only until etl/refresh_views.py runs."
+            )
+        return views_seq == load_seq
+
+    def _source(self, keys, dest_val, park_type_val):
+        """(relation, visits column) that can answer this rollup."""
+        park_filtered = dest_val in ("National Park", "City") or (park_type_val and park_type_val != "All")
+        if self.use_views and not park_filtered and set(keys) <= STATE_LEVEL_KEYS:
+            return STATE_MONTH_VIEW, "visits"
+        return self.table, "recreation_visits"
+
+    def _in_db(self, year_val) -> bool:
+        return year_val is None or int(year_val) in self._db_years
+
+    # -------------------------
+    # rollups
+    # -------------------------
+
+    def _db_totals(self, keys, month_val, year_val, region_val, dest_val, park_type_val) -> pd.DataFrame:
+        params = {}
+        source, value = self._source(keys, dest_val, park_type_val)
+        exprs = [
+            self._region_group_sql(params) if k == "RegionGroup" else COLUMNS[k]
+            for k in keys
+        ]
+        where = self._where(params, month_val, year_val, region_val, dest_val, park_type_val)
+        sql = (
+            f"SELECT {''.join(f'{e} AS k{i}, ' for i, e in enumerate(exprs))}"
+            f"CAST(SUM({value}) AS DOUBLE PRECISION) AS v FROM {source} WHERE {where}"
+        )
+        if keys:
+            positions = ", ".join(str(i) for i in range(1, len(keys) + 1))
+            order = ", ".join(
+                f"k{i}{self._collate}" if k in TEXT_KEYS else f"k{i}" for i, k in enumerate(keys)
+            )
+            sql = f"SELECT * FROM ({sql} GROUP BY {positions}) grouped ORDER BY {order}"
+        rows = self._query(sql, params)
+        frame = pd.DataFrame(rows, columns=list(keys) + [VALUE_COL])
+        if not keys:
+            frame = frame.dropna()
+        return frame.astype({k: np.int64 for k in keys if k in ("Year", "Month")})
+
+    def totals(
+        self,
+        keys,
+        month_val=None,
+        year_val=None,
+        region_val=None,
+        dest_val=None,
+        park_type_val=None,
+    ) -> pd.DataFrame:
+        """Same frame as VisitCube.totals, summed by the database."""
+        keys = list(keys)
+        filters = (month_val, year_val, region_val, dest_val, park_type_val)
+        frames = []
+        if self._in_db(year_val):
+            frames.append(self._db_totals(keys, *filters))
+        if self.overlay is not None and (year_val is None or int(year_val) in self._overlay_years):
+            frames.append(self.overlay.totals(keys, *filters))
+
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return pd.DataFrame({k: [] for k in keys + [VALUE_COL]})
+        if len(frames) == 1:
+            return frames[0]
+        merged = pd.concat(frames, ignore_index=True)
+        return merged.groupby(keys, as_index=False, sort=True)[VALUE_COL].sum()
+
+    # -------------------------
+    # choropleth (StateMap API)
+    # -------------------------
+
+    def status(self, month_val, year_val, region_val=None, dest_val=None, park_type_val=None) -> np.ndarray:
+        """Status code per state_codes entry for one (year, month)."""
+        if int(year_val) in self._overlay_years:
+            return self._overlay_map.status(month_val, year_val, region_val, dest_val, park_type_val)
+
+        out = np.full(len(self.state_codes), NORMAL, dtype=np.int8)
+        if not self._in_db(year_val):
+            return out
+        by_state = self._db_totals(["State"], month_val, year_val, region_val, dest_val, park_type_val)
+        if by_state.empty:
+            return out
+
+        values = by_state[VALUE_COL].to_numpy(dtype=float)
+        q_off, q_hot = column_quantiles(values[:, None], QUANTILES)[:, 0]
+        codes = np.full(len(values), NORMAL, dtype=np.int8)
+        codes[values <= q_off] = OFF_SEASON
+        codes[values >= q_hot] = HOTSPOT
+
+        pos = dict(zip(by_state["State"], codes))
+        return np.array([pos.get(s, NORMAL) for s in self.state_codes], dtype=np.int8)
+
+    def top_parks(self, month_val, year_val, region_val=None, dest_val=None, park_type_val=None, n=5):
+        """Top-n park names per state_codes entry, by visits (descending)."""
+        if int(year_val) in self._overlay_years:
+            return self._overlay_map.top_parks(month_val, year_val, region_val, dest_val, park_type_val, n)
+        if not self._in_db(year_val):
+            return [[] for _ in self.state_codes]
+
+        params = {"n": int(n)}
+        where = self._where(params, month_val, year_val, region_val, dest_val, park_type_val)
+        rows = self._query(
+            f"SELECT state, park FROM ("
+            f" SELECT state, park, ROW_NUMBER() OVER ("
+            f"  PARTITION BY state ORDER BY SUM(recreation_visits) DESC, park{self._collate}"
+            f" ) AS rank"
+            f" FROM {self.table} WHERE {where} GROUP BY state, park"
+            f") ranked WHERE rank <= :n ORDER BY state, rank",
+            params,
+        )
+        top = {}
+        for state, park in rows:
+            top.setdefault(state, []).append(park)
+        return [top.get(s, []) for s in self.state_codes]
+
+    # -------------------------
+    # raw rows
+    # -------------------------
+
+    def rows(
+        self,
+        month_val=None,
+        year_val=None,
+        region_val=None,
+        dest_val=None,
+        park_type_val=None,
+    ) -> pd.DataFrame:
+        """Filtered rows with the app's column names (like core.filter_parks)."""
+        filters = (month_val, year_val, region_val, dest_val, park_type_val)
+        params = {}
+        cols = ", ".join(COLUMNS.values())
+        region_group = self._region_group_sql(params)
+        where = self._where(params, *filters)
+        rows = self._query(
+            f"SELECT {cols}, {region_group} FROM {self.table} WHERE {where} "
+            f"ORDER BY year, month, state{self._collate}, park{self._collate}",
+            params,
+        )
+        frame = pd.DataFrame(rows, columns=list(COLUMNS) + ["RegionGroup"])
+        frame.insert(len(COLUMNS), "IsForecast", False)
+        if self.overlay is not None:
+            extra = self._overlay_df.take(self._overlay_filters.positions(*filters))
+            frame = pd.concat([frame, extra[frame.columns]], ignore_index=True)
+        return frame
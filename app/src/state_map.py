@@ -0,0 +1,178 @@
+# state_map.py
+#
+# Vectorized data for the US choropleth: per-state Hotspot / Normal /
+# Off-Season status and the top parks shown on hover.
+#
+# Status follows the dashboard rule: among states with data under the
+# current filters, visits >= 66th percentile -> Hotspot, <= 33rd percentile
+# -> Off-Season, otherwise (and for states without data) Normal. Quantiles
+# use linear interpolation, like pandas Series.quantile.
+#
+# For each (region, destination, park type) the status of every state in
+# every (year, month) is computed in one pass into an int8 [year, month,
+# state] table, so a map request is an array lookup.
+
+import threading
+
+import numpy as np
+
+from src.cube import VisitCube
+
+STATUS_LABELS = np.array(["Off-Season", "Normal", "Hotspot"], dtype=object)
+OFF_SEASON, NORMAL, HOTSPOT = 0, 1, 2
+QUANTILES = (0.33, 0.66)
+
+
+def column_quantiles(values: np.ndarray, qs) -> np.ndarray:
+    """
+    Linear-interpolation quantiles along axis 0, ignoring NaN; all-NaN
+    columns give NaN. Same arithmetic as np.nanquantile (and so pandas),
+    but vectorized over every column at once instead of per column.
+    """
+    ordered = np.sort(values, axis=0)  # NaN sorts last
+    n = np.count_nonzero(~np.isnan(values), axis=0)
+    out = np.full((len(qs),) + values.shape[1:], np.nan)
+    has = n > 0
+    for i, q in enumerate(qs):
+        virtual = (n - 1) * q
+        lo = np.floor(virtual)
+        gamma = virtual - lo
+        lo = np.clip(lo.astype(np.intp), 0, np.maximum(n - 1, 0))
+        hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+        a = np.take_along_axis(ordered, lo[None], axis=0)[0]
+        b = np.take_along_axis(ordered, hi[None], axis=0)[0]
+        diff = b - a
+        lerp = np.where(gamma >= 0.5, b - diff * (1 - gamma), a + diff * gamma)
+        out[i][has] = lerp[has]
+    return out
+
+
+class StateMap:
+    def __init__(self, cube: VisitCube, state_codes):
+        self.cube = cube
+        self.state_codes = list(state_codes)
+
+        state_idx, states = cube.park_codes("State")
+        park_idx, parks = cube.park_codes("Park")
+        self._park_state = state_idx
+        self._n_states = len(states)
+        self._parks = parks
+
+        # map output order (state_codes) -> position in the cube's state labels
+        pos = {s: i for i, s in enumerate(states.tolist())}
+        self._out_idx = np.array([pos.get(s, -1) for s in self.state_codes])
+
+        # Distinct (State, Park) pairs, sorted by state then park; each gets a
+        # slot within its state so per-state rankings fit in one matrix.
+        pairs, pair_idx = np.unique(
+            np.stack([state_idx, park_idx], axis=1), axis=0, return_inverse=True
+        )
+        self._pair_idx = pair_idx.ravel()
+        self._pair_state = pairs[:, 0]
+        self._pair_park = pairs[:, 1]
+        first = np.searchsorted(self._pair_state, np.arange(self._n_states))
+        self._pair_slot = np.arange(len(pairs)) - first[self._pair_state]
+        self._n_slots = int(self._pair_slot.max()) + 1 if len(pairs) else 0
+        self._slot_park = np.full((self._n_states, self._n_slots), -1)
+        self._slot_park[self._pair_state, self._pair_slot] = self._pair_park
+
+        self._tables = {}
+        self._lock = threading.Lock()
+        for region_val in ["All"] + list(cube.regions):
+            for dest_val in ("State", "National Park", "City"):
+                self.status_table(region_val, dest_val, "All")
+
+    # -------------------------
+    # status
+    # -------------------------
+
+    @staticmethod
+    def _table_key(region_val, dest_val, park_type_val):
+        return (
+            region_val or "All",
+            dest_val if dest_val in ("National Park", "City") else "State",
+            park_type_val or "All",
+        )
+
+    def _state_totals(self, mask):
+        """(visits, rows) summed per state -> arrays [state, year, month]."""
+        visits = self.cube.visits[mask]
+        rows = self.cube.rows[mask]
+        inner = visits.shape[1] * visits.shape[2]
+        cells = (self._park_state[mask][:, None] * inner + np.arange(inner)).ravel()
+        size = self._n_states * inner
+        shape = (self._n_states,) + visits.shape[1:]
+        totals = np.bincount(cells, weights=visits.ravel(), minlength=size).reshape(shape)
+        counts = np.bincount(cells, weights=rows.ravel(), minlength=size).reshape(shape)
+        return totals, counts
+
+    def status_table(self, region_val=None, dest_val=None, park_type_val=None) -> np.ndarray:
+        """int8 [year, month, state] status codes (state axis in state_codes order)."""
+        key = self._table_key(region_val, dest_val, park_type_val)
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+
+        totals, counts = self._state_totals(self.cube.park_mask(*key))
+        values = np.where(counts > 0, totals, np.nan)
+        q_off, q_hot = column_quantiles(values, QUANTILES)
+
+        # NaN (no data) compares False everywhere and lands on NORMAL
+        status = np.full(values.shape, NORMAL, dtype=np.int8)
+        status[values <= q_off] = OFF_SEASON
+        status[values >= q_hot] = HOTSPOT
+
+        table = np.full(status.shape[1:] + (len(self.state_codes),), NORMAL, dtype=np.int8)
+        known = self._out_idx >= 0
+        table[:, :, known] = status[self._out_idx[known]].transpose(1, 2, 0)
+        table.flags.writeable = False
+        with self._lock:
+            return self._tables.setdefault(key, table)
+
+    def status(self, month_val, year_val, region_val=None, dest_val=None, park_type_val=None) -> np.ndarray:
+        """Status code per state_codes entry for one (year, month)."""
+        ym = self.cube.time_index(month_val, year_val)
+        if ym is None:
+            return np.full(len(self.state_codes), NORMAL, dtype=np.int8)
+        return self.status_table(region_val, dest_val, park_type_val)[ym]
+
+    # -------------------------
+    # hover
+    # -------------------------
+
+    def top_parks(self, month_val, year_val, region_val=None, dest_val=None, park_type_val=None, n=5):
+        """Top-n park names per state_codes entry, by visits (descending)."""
+        empty = [[] for _ in self.state_codes]
+        ym = self.cube.time_index(month_val, year_val)
+        if ym is None or not self._n_slots:
+            return empty
+
+        mask = self.cube.park_mask(*self._table_key(region_val, dest_val, park_type_val))
+        n_pairs = len(self._pair_state)
+        y, m = ym
+        totals = np.bincount(
+            self._pair_idx[mask], weights=self.cube.visits[mask, y, m], minlength=n_pairs
+        )
+        counts = np.bincount(
+            self._pair_idx[mask], weights=self.cube.rows[mask, y, m], minlength=n_pairs
+        )
+
+        # [state, slot] matrix of pair totals; -inf where a pair has no rows
+        ranked = np.full((self._n_states, self._n_slots), -np.inf)
+        present = counts > 0
+        ranked[self._pair_state[present], self._pair_slot[present]] = totals[present]
+
+        # Rank within each state by visits, ties by park name (slots follow
+        # name order), and keep the first n.
+        slots = np.broadcast_to(np.arange(self._n_slots), ranked.shape)
+        top = np.lexsort((slots, -ranked), axis=1)[:, :n]
+        top_vals = np.take_along_axis(ranked, top, axis=1)
+
+        out = []
+        for i in self._out_idx:
+            if i < 0:
+                out.append([])
+                continue
+            keep = np.isfinite(top_vals[i])
+            out.append(self._parks[self._slot_park[i, top[i, keep]]].tolist())
+        return out
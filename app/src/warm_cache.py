@@ -0,0 +1,227 @@
+# warm_cache.py
+#
+# Precomputed dashboard results for the whole filter space.
+#
+# The dashboard filters are finite (12 months x YEARS x 5 regions x 3
+# destination options x park types), so every chart's trace updates and the
+# KPI dict (see core.cached_result) can be computed ahead of time. Results
+# are stored as zlib-compressed JSON in a SQLite file next to the Parquet
+# snapshots, one file per data version.
+# core.py reads from it on a RESULT_CACHE miss and falls back to live
+# computation when a key is missing.
+#
+# Build from the command line (run from the app/ folder):
+#   python -m src.warm_cache                       # full cross product
+#   python -m src.warm_cache --years 2024 2025     # subset (adds to the store)
+#   python -m src.warm_cache --workers 8 --force   # start from an empty store
+#   python -m src.warm_cache --status
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+from plotly.io.json import to_json_plotly
+
+from src import snapshot
+
+# Bump when a builder's output format changes so old stores go stale
+STORE_VERSION = 3
+WARM_ENABLED = os.getenv("PARKS_WARM_STORE", "1") != "0"
+
+BATCH_SIZE = 200
+DESTS = ["State", "City", "National Park"]
+
+_PREFIX = "warm_v"
+
+
+def store_path(data_version: str) -> str:
+    return os.path.join(snapshot.SNAPSHOT_DIR, f"{_PREFIX}{STORE_VERSION}_{data_version}.sqlite")
+
+
+def key_text(key) -> str:
+    return json.dumps(list(key))
+
+
+def encode(value) -> bytes:
+    """Chart trace updates / KPI dict -> compressed JSON."""
+    return zlib.compress(to_json_plotly(value).encode("utf-8"))
+
+
+def decode(blob: bytes):
+    """Stored value as plain JSON."""
+    return json.loads(zlib.decompress(blob))
+
+
+class ResultStore:
+    """SQLite table of (builder, normalized filter key) -> encoded result."""
+
+    def __init__(self, path: str, readonly: bool = True):
+        self.path = path
+        if readonly:
+            self._conn = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " builder TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+                " PRIMARY KEY (builder, key)) WITHOUT ROWID"
+            )
+            self._conn.commit()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, data_version: str):
+        """Read-only store for this data version, or None when there is none."""
+        path = store_path(data_version)
+        if not WARM_ENABLED or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except Exception as e:
+            print("WARNING: Could not open warm cache store, computing live.")
+            print("Reason:", repr(e))
+            return None
+
+    def get(self, builder: str, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE builder = ? AND key = ?",
+                (builder, key_text(key)),
+            ).fetchone()
+        return None if row is None else decode(row[0])
+
+    def keys(self) -> set:
+        with self._lock:
+            return set(self._conn.execute("SELECT builder, key FROM results"))
+
+    def put_many(self, rows):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (builder, key, value) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+# =========================================================
+# BUILD
+# =========================================================
+
+def _filter_space(core, months=None, years=None):
+    """Cross product of the dashboard dropdown values (see pages/dashboard.py)."""
+    data = core.current()
+    return product(
+        months or range(1, 13),
+        years or [int(y) for y in data.years],
+        ["All"] + list(core.REGIONS),
+        DESTS,
+        ["All"] + list(data.park_types),
+    )
+
+
+def plan_tasks(core, months=None, years=None, done=frozenset()):
+    """
+    One (builder, kwargs) task per distinct cache key. Builders key only on
+    the filters they use, so e.g. the heatmap is rendered once per year
+    rather than once per month.
+    """
+    tasks, seen = [], set(done)
+    for combo in _filter_space(core, months, years):
+        values = dict(zip(core.FILTER_ARGS, combo))
+        for name, fn in core.CACHED_BUILDERS.items():
+            kwargs = {a: values[a] for a in fn.filter_args}
+            item = (name, key_text(fn.cache_key(**kwargs)))
+            if item not in seen:
+                seen.add(item)
+                tasks.append((name, kwargs))
+    return tasks
+
+
+def _render_batch(data_version, batch):
+    import core
+
+    if core.DATA.version != data_version:
+        raise RuntimeError(f"worker loaded data {core.DATA.version}, expected {data_version}")
+
+    rows = []
+    for name, kwargs in batch:
+        fn = core.CACHED_BUILDERS[name]
+        rows.append((name, key_text(fn.cache_key(**kwargs)), encode(fn.uncached(**kwargs))))
+    return rows
+
+
+def build_store(core, workers=None, months=None, years=None, force=False):
+    path = store_path(core.DATA.version)
+    partial = path + ".partial"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if force and os.path.exists(partial):
+        os.remove(partial)
+    if not force and os.path.exists(path) and not os.path.exists(partial):
+        os.replace(path, partial)  # extend the existing store
+
+    store = ResultStore(partial, readonly=False)
+    tasks = plan_tasks(core, months, years, done=store.keys())
+    print(f"{len(tasks):,} results to render ({workers or os.cpu_count()} workers)")
+
+    batches = [tasks[i:i + BATCH_SIZE] for i in range(0, len(tasks), BATCH_SIZE)]
+    t0 = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_batch, core.DATA.version, b) for b in batches]
+        for fut in as_completed(futures):
+            rows = fut.result()
+            store.put_many(rows)
+            done += len(rows)
+            elapsed = time.perf_counter() - t0
+            print(f"  {done:,}/{len(tasks):,} rendered ({done / elapsed:,.0f}/s)")
+    store.close()
+
+    os.replace(partial, path)
+    for old in glob.glob(os.path.join(snapshot.SNAPSHOT_DIR, f"{_PREFIX}*.sqlite")):
+        if old != path:
+            os.remove(old)
+    return path, len(tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute dashboard results for every filter combination.")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--months", type=int, nargs="+", help="only these months")
+    parser.add_argument("--years", type=int, nargs="+", help="only these years")
+    parser.add_argument("--force", action="store_true", help="discard existing results first")
+    parser.add_argument("--status", action="store_true", help="only report the store path and size")
+    args = parser.parse_args(argv)
+
+    import core
+
+    path = store_path(core.DATA.version)
+    print(f"data version: {core.DATA.version}")
+    if args.status:
+        if os.path.exists(path):
+            store = ResultStore(path)
+            print(f"store: {path} ({len(store.keys()):,} results, {os.path.getsize(path) / 1e6:.1f} MB)")
+            store.close()
+        else:
+            print(f"store: {path} (missing)")
+        return
+
+    t0 = time.perf_counter()
+    path, n = build_store(core, args.workers, args.months, args.years, args.force)
+    print(f"Wrote {n:,} results to {path} in {time.perf_counter() - t0:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
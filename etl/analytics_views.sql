@@ -80,7 +80,9 @@ ON public.mv_park_yoy (unit_code, year);
 
 -- -------------------------------------------
 
--- REFRESH COMMANDS (run manually after loading new data)
+-- REFRESH COMMANDS (run after loading new data; etl/refresh_views.py runs
+-- them and records the refresh in public.park_visits_refresh, without which
+-- the app's SQL backend reads park_visits instead of these views)
 -- REFRESH MATERIALIZED VIEW CONCURRENTLY public.mv_state_month_visits;
 -- REFRESH MATERIALIZED VIEW CONCURRENTLY public.mv_region_month_visits;
 -- REFRESH MATERIALIZED VIEW CONCURRENTLY public.mv_park_yearly_totals;
@@ -1,9 +1,31 @@
+# load_park_visits.py
+#
+# Streams the cleaned dataset into public.park_visits:
+#   read CHUNK_SIZE rows -> clean -> COPY FROM STDIN into a temp staging
+#   table -> upsert into park_visits -> commit (staging empties on commit)
+# Rows come from the Parquet dataset written by merge_and_clean.py, or from
+# a cleaned CSV with --csv (the default when there is no dataset).
+#
+# Run against any PostgreSQL (PG_* settings from .env), e.g. a local one:
+#   PG_HOST=localhost PG_DB=tourism_test python etl/load_park_visits.py
+#   python etl/load_park_visits.py --years 2024 2025   # reload some years
+#   python etl/load_park_visits.py --csv other.csv --chunk-size 10000
+
+import argparse
+import io
 import os
 import sys
+import time
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from dotenv import load_dotenv
 
+from parks_dataset import DATASET_DIR, iter_dataset
+from refresh_views import MARKER_DDL, STAMP_LOAD_SQL
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from src.db import get_engine  # noqa: E402  (shared pooled engine factory)
+
 print(">>> Script started")
 
 load_dotenv()
@@ -30,7 +52,8 @@ CHUNK_SIZE = 50_000
 
 def make_engine():
     url = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    return create_engine(url, future=True)
+    # bulk merges can outlast the app's statement timeout
+    return get_engine(url, statement_timeout_ms=0)
 
 
 def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
@@ -38,10 +61,105 @@ def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def main():
-    print(">>> step 1: validating CSV path")
-    if not os.path.exists(CSV_PATH):
-        print(f" CSV not found at {CSV_PATH}")
+COPY_COLS = [
+    "park", "unit_code", "park_type", "region", "state",
+    "year", "month", "recreation_visits",
+]
+
+# Column-only copy of the target (no id default, no indexes); rows are
+# removed at every commit, i.e. after each chunk has been merged.
+STAGING_DDL = f"""
+CREATE TEMP TABLE IF NOT EXISTS park_visits_staging
+ON COMMIT DELETE ROWS
+AS SELECT {", ".join(COPY_COLS)} FROM {SCHEMA}.{TABLE} WITH NO DATA;
+"""
+
+COPY_SQL = f"COPY park_visits_staging ({', '.join(COPY_COLS)}) FROM STDIN WITH (FORMAT csv)"
+
+MERGE_SQL = f"""
+INSERT INTO {SCHEMA}.{TABLE} ({", ".join(COPY_COLS)})
+SELECT {", ".join(COPY_COLS)}
+FROM park_visits_staging
+ON CONFLICT (unit_code, year, month) DO UPDATE
+SET park              = EXCLUDED.park,
+    park_type         = EXCLUDED.park_type,
+    region            = EXCLUDED.region,
+    state             = EXCLUDED.state,
+    recreation_visits = EXCLUDED.recreation_visits;
+"""
+
+
+def copy_chunk(cursor, df: pd.DataFrame):
+    """COPY one cleaned chunk into the staging table from an in-memory CSV."""
+    buf = io.StringIO()
+    df[COPY_COLS].astype({"year": "int64", "month": "int64"}).to_csv(
+        buf, index=False, header=False
+    )
+    buf.seek(0)
+    cursor.copy_expert(COPY_SQL, buf)
+
+
+def read_chunks(csv_path=None, chunk_size=CHUNK_SIZE, years=None):
+    """Raw rows in chunks: from csv_path when given, else the Parquet dataset."""
+    if csv_path is None:
+        return iter_dataset(DATASET_DIR, batch_size=chunk_size, years=years)
+    chunks = pd.read_csv(csv_path, chunksize=chunk_size, dtype=str)
+    if years is None:
+        return chunks
+    years = {str(y) for y in years}
+    return (c[c["Year"].str.strip().isin(years)] for c in chunks)
+
+
+def load_chunks(engine, chunks):
+    """
+    Upsert chunks into park_visits, one transaction per chunk. Chunks are
+    merged in order, so for a (unit_code, year, month) repeated across
+    chunks the last row wins, as with a whole-file
+    drop_duplicates(keep="last"). Returns (rows, seconds).
+    """
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(STAGING_DDL)
+        raw.commit()
+
+        total = 0
+        t0 = time.perf_counter()
+        for i, chunk in enumerate(chunks):
+            t_chunk = time.perf_counter()
+            df = clean_frame(chunk)
+            copy_chunk(cur, df)
+            cur.execute(MERGE_SQL)
+            # same transaction as the merge, so the app's data version
+            # (park_visits_refresh) moves with every committed change
+            cur.execute(STAMP_LOAD_SQL)
+            raw.commit()
+
+            total += len(df)
+            dt = time.perf_counter() - t_chunk
+            print(f">>> chunk {i + 1}: {len(df):,} rows in {dt:.2f}s ({len(df) / max(dt, 1e-9):,.0f} rows/s)")
+        return total, time.perf_counter() - t0
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the cleaned park visits into PostgreSQL.")
+    parser.add_argument("--csv", nargs="?", const=CSV_PATH, default=None,
+                        help=f"load a cleaned CSV instead of {DATASET_DIR} (default CSV: {CSV_PATH})")
+    parser.add_argument("--years", type=int, nargs="+", help="only these years")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per COPY + merge")
+    args = parser.parse_args(argv)
+
+    print(">>> step 1: validating source path")
+    if args.csv is None and not DATASET_DIR.exists():
+        args.csv = CSV_PATH
+    source = args.csv or DATASET_DIR
+    if not os.path.exists(source):
+        print(f" Source not found at {source}")
         sys.exit(1)
 
     print(">>> step 2: creating DB engine")
@@ -50,36 +168,13 @@ def main():
     print(">>> step 3: creating table/indexes if not exist")
     with engine.begin() as conn:
         conn.execute(text(DDL))
+        conn.execute(text(MARKER_DDL))
 
-    print(">>> step 4: reading CSV")
-    raw = pd.read_csv(CSV_PATH)
-
-    print(">>> step 5: cleaning frame")
-    df = clean_frame(raw)
-    print(f">>> cleaned rows: {len(df):,}")
+    print(f">>> step 4: streaming {source} into {SCHEMA}.{TABLE} ({args.chunk_size:,} rows per chunk)")
+    rows, seconds = load_chunks(engine, read_chunks(args.csv, args.chunk_size, args.years))
 
-    print(f">>> step 6: upserting into public.park_visits")
-    with engine.begin() as conn:
-        # TEMP staging table (lives in session)
-        conn.execute(text("CREATE TEMP TABLE park_visits_staging (LIKE public.park_visits INCLUDING ALL);"))
-
-        # bulk insert to TEMP
-        df.to_sql(name="park_visits_staging", con=conn, schema=None, if_exists="append", index=False)
-
-        # merge (UPSERT) from TEMP → target
-        conn.execute(text("""
-            INSERT INTO public.park_visits (park, unit_code, park_type, region, state, year, month, recreation_visits)
-            SELECT park, unit_code, park_type, region, state, year, month, recreation_visits
-            FROM park_visits_staging
-            ON CONFLICT (unit_code, year, month) DO UPDATE
-            SET park              = EXCLUDED.park,
-                park_type         = EXCLUDED.park_type,
-                region            = EXCLUDED.region,
-                state             = EXCLUDED.state,
-                recreation_visits = EXCLUDED.recreation_visits;
-        """))
-
-    print(">>> done upserting")
+    print(f">>> done upserting: {rows:,} rows in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+    print(">>> run etl/refresh_views.py so the app reads the materialized views again")
 
 # ---------- DDL (table & indexes) ----------
 DDL = """
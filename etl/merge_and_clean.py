@@ -1,68 +1,301 @@
-import pandas as pd
+# merge_and_clean.py
+#
+# Merges the per-park NPS exports in data/raw/ into one cleaned dataset:
+# data/cleaned/parks_dataset/ (Parquet, partitioned by Year; see
+# parks_dataset.py) and, with --csv, all_parks_recreation_visits.csv.
+# Files are parsed in parallel (one process per core by default) with the
+# C parser; the delimiter and header line of each file are detected from a
+# small sample of its first lines.
+#
+# Runs are incremental: each raw file's cleaned rows are kept as a part
+# under data/cleaned/.merge_cache/, and a manifest (path, size, mtime,
+# sha256) records what they were built from. Only added or edited files are
+# parsed; removed files drop out, and the outputs are re-assembled from parts.
+#
+#   python etl/merge_and_clean.py
+#   python etl/merge_and_clean.py --workers 4
+#   python etl/merge_and_clean.py --full       # re-parse everything
+#   python etl/merge_and_clean.py --csv        # also export the CSV
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import pandas as pd
+
+from parks_dataset import DATASET_DIR, write_dataset
+
 RAW_DIR = Path("data/raw")
 OUT_DIR = Path("data/cleaned")
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 OUT_FILE = OUT_DIR / "all_parks_recreation_visits.csv"
 
+# Per-file cleaned parts (Parquet, named by MANIFEST_VERSION and the raw
+# file's sha256) and the manifest of raw files they were built from
+CACHE_DIR = OUT_DIR / ".merge_cache"
+PARTS_DIR = CACHE_DIR / "parts"
+MANIFEST = CACHE_DIR / "manifest.json"
+# Bump when the cleaning logic changes so cached parts are rebuilt
+MANIFEST_VERSION = 1
+
 REQUIRED = ["Park","Unit Code","Park Type","Region","State","Year","Month","Recreation Visits"]
+TEXT_COLS = ["Park","Unit Code","Park Type","Region","State"]
+NUM_COLS = ["Year","Month","Recreation Visits"]
+
+DELIMITERS = ["\t", ",", ";", "|"]
+SAMPLE_BYTES = 8192
+
+
+# =========================================================
+# PER-FILE PARSING  (runs in the worker processes)
+# =========================================================
+
+def sniff_layout(fp):
+    """
+    (delimiter, header line number, header field count) from the first
+    SAMPLE_BYTES of fp.
+    Some exports start with a title or blank line before the header, so the
+    header is the first line naming both Park and Recreation Visits; without
+    one, the first line is taken as the header.
+    """
+    with open(fp, encoding="utf-8", errors="replace", newline="") as f:
+        lines = f.read(SAMPLE_BYTES).splitlines()
+
+    header = next(
+        (i for i, line in enumerate(lines) if "Park" in line and "Recreation Visits" in line),
+        0,
+    )
+    line = lines[header] if lines else ""
+    sep = max(DELIMITERS, key=line.count)
+    return sep, header, len(line.split(sep))
+
+
+def to_number(col: pd.Series) -> pd.Series:
+    """Numeric column; the parser leaves it as text when a file has junk rows."""
+    if pd.api.types.is_numeric_dtype(col):
+        return col
+    # Clean numbers like 1,23,456 -> 123456
+    return pd.to_numeric(col.astype(str).str.replace(r"[^0-9]", "", regex=True), errors="coerce")
 
-csvs = sorted(RAW_DIR.glob("*.csv"))
-print(f"Found {len(csvs)} CSV files to merge...")
 
-frames = []
-for fp in csvs:
+def read_raw(fp):
+    """(DataFrame or None, message, seconds) for one raw export."""
+    t0 = time.perf_counter()
     try:
-        # Be forgiving about weird rows & commas in numbers
+        sep, header, n_cols = sniff_layout(fp)
+        if n_cols < len(REQUIRED):
+            return None, "Missing required columns", time.perf_counter() - t0
+
+        # Columns are taken by position, whatever the header calls them;
+        # trailing empty columns are ignored.
         df = pd.read_csv(
             fp,
-            dtype=str,
-            engine="python",
+            sep=sep,
+            header=None,
+            skiprows=header + 1,
+            names=REQUIRED,
+            usecols=range(len(REQUIRED)),
+            dtype={c: str for c in TEXT_COLS},
+            thousands="," if sep != "," else None,
+            engine="c",
             on_bad_lines="skip",
-            sep=None
         )
 
-        # If headers are missing or wrong, try to coerce
-        cols = [c.strip() for c in df.columns.tolist()]
-        if len(cols) >= 8:
-            df = df.iloc[:, :8]
-            df.columns = REQUIRED
-        elif set(REQUIRED).issubset(set(cols)):
-            df = df[REQUIRED]
-        else:
-            print(f"  Skipping {fp}: Missing required columns")
-            continue
-
-        # Clean numbers like 1,23,456 → 123456
-        df["Recreation Visits"] = (
-            df["Recreation Visits"].astype(str)
-            .str.replace(r"[^0-9]", "", regex=True)
-        )
-
-        # Coerce Year/Month to int; drop bad rows
-        df["Year"] = pd.to_numeric(df["Year"], errors="coerce")
-        df["Month"] = pd.to_numeric(df["Month"], errors="coerce")
-        df["Recreation Visits"] = pd.to_numeric(df["Recreation Visits"], errors="coerce")
-        df = df.dropna(subset=["Year","Month","Recreation Visits"])
+        # Coerce Year/Month/Visits to numbers; drop bad rows
+        for c in NUM_COLS:
+            df[c] = to_number(df[c])
+        df = df.dropna(subset=NUM_COLS)
         df["Year"] = df["Year"].astype(int)
         df["Month"] = df["Month"].astype(int)
+        df["Recreation Visits"] = df["Recreation Visits"].astype(float)
 
         # Trim text columns
-        for c in ["Park","Unit Code","Park Type","Region","State"]:
+        for c in TEXT_COLS:
             df[c] = df[c].astype(str).str.strip()
 
-        frames.append(df)
-
+        return df, None, time.perf_counter() - t0
     except Exception as e:
-        print(f"  Error reading {fp}: {e}")
+        return None, f"Error reading: {e}", time.perf_counter() - t0
+
+
+# =========================================================
+# MANIFEST  (incremental runs)
+# =========================================================
+
+def load_manifest():
+    """
+    ({file name: entry}, [outputs built from those entries]) from the last
+    run; empty when missing or stale.
+    """
+    try:
+        with open(MANIFEST) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}, []
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}, []
+    return manifest.get("files", {}), manifest.get("outputs", [])
+
+
+def save_manifest(files: dict, outputs):
+    tmp = MANIFEST.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(
+            {"version": MANIFEST_VERSION, "files": files, "outputs": sorted(outputs)},
+            f, indent=1, sort_keys=True,
+        )
+    os.replace(tmp, MANIFEST)
+
+
+def file_sha256(fp) -> str:
+    h = hashlib.sha256()
+    with open(fp, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def part_path(sha: str) -> Path:
+    # The version in the name keeps parts from older cleaning logic from being
+    # picked up again; prune_parts deletes them
+    return PARTS_DIR / f"v{MANIFEST_VERSION}-{sha}.parquet"
+
+
+def scan(csvs, files: dict):
+    """
+    Manifest entries for csvs plus the files that need parsing. A file whose
+    size and mtime match its entry is not re-read; otherwise it is hashed,
+    and only content without a cleaned part (new or edited) is parsed.
+    """
+    entries, todo = {}, []
+    for fp in csvs:
+        st = fp.stat()
+        old = files.get(fp.name)
+        if (
+            old
+            and old["size"] == st.st_size
+            and old["mtime_ns"] == st.st_mtime_ns
+            and part_path(old["sha256"]).exists()
+        ):
+            entries[fp.name] = old
+            continue
+
+        sha = file_sha256(fp)
+        entries[fp.name] = {
+            "path": str(fp), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha,
+        }
+        if not part_path(sha).exists():
+            todo.append(fp)
+    return entries, todo
+
+
+# =========================================================
+# MERGE
+# =========================================================
+
+def clean_file(fp, part):
+    """Parse fp and write its cleaned rows to part; (rows or None, message, seconds)."""
+    df, error, seconds = read_raw(fp)
+    if df is None:
+        return None, error, seconds
+    tmp = part.with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, part)
+    return len(df), None, seconds
+
+
+def clean_files(todo, entries, workers=None):
+    """
+    Parse todo (in parallel when workers > 1) into cleaned parts. Files that
+    can't be used are dropped from entries. Returns seconds spent parsing.
+    """
+    parts = [part_path(entries[fp.name]["sha256"]) for fp in todo]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(clean_file, todo, parts, chunksize=4))
+    else:
+        results = [clean_file(fp, part) for fp, part in zip(todo, parts)]
+
+    for fp, (rows, error, seconds) in zip(todo, results):
+        if rows is None:
+            print(f"  Skipping {fp}: {error}")
+            del entries[fp.name]
+            continue
+        print(f"  {fp.name}: {rows:,} rows in {seconds * 1000:.0f} ms")
+    return sum(r[2] for r in results)
+
+
+def prune_parts(entries: dict):
+    """Delete cleaned parts no file in entries refers to any more."""
+    keep = {part_path(e["sha256"]) for e in entries.values()}
+    for part in PARTS_DIR.glob("*.parquet"):
+        if part not in keep:
+            part.unlink()
+
+
+def assemble(entries: dict) -> pd.DataFrame:
+    """Concatenate the cleaned parts in file-name order."""
+    frames = [pd.read_parquet(part_path(entries[name]["sha256"])) for name in sorted(entries)]
+    merged = pd.concat(frames, ignore_index=True)
+    # Basic sanity
+    return merged[(merged["Month"] >= 1) & (merged["Month"] <= 12)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge and clean the raw NPS visit exports.")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-parse every file")
+    parser.add_argument("--csv", action="store_true", help=f"also export {OUT_FILE}")
+    args = parser.parse_args(argv)
+
+    PARTS_DIR.mkdir(parents=True, exist_ok=True)
+    csvs = sorted(RAW_DIR.glob("*.csv"))
+    files, built = ({}, []) if args.full else load_manifest()
+    if args.full:
+        for part in PARTS_DIR.glob("*.parquet"):
+            part.unlink()
+
+    t0 = time.perf_counter()
+    entries, todo = scan(csvs, files)
+    removed = sorted(set(files) - set(entries))
+    print(
+        f"Found {len(csvs)} CSV files: {len(todo)} to parse, "
+        f"{len(csvs) - len(todo)} unchanged, {len(removed)} removed"
+    )
+    for name in removed:
+        print(f"  Dropping {name}")
+
+    parse_seconds = clean_files(todo, entries, args.workers)
+    if not entries:
+        raise SystemExit("No valid CSVs were processed!")
+
+    outputs = [DATASET_DIR] + ([OUT_FILE] if args.csv else [])
+    built_from = {name: e["sha256"] for name, e in entries.items()}
+    if built_from != {name: e["sha256"] for name, e in files.items()} or not all(
+        str(out) in built and out.exists() for out in outputs
+    ):
+        merged = assemble(entries)
+        write_dataset(merged, DATASET_DIR)
+        if args.csv:
+            merged.to_csv(OUT_FILE, index=False)
+        built = [str(out) for out in outputs]
+        print(f" Wrote {', '.join(built)} with {len(merged):,} rows from {len(entries)} usable files.")
+    else:
+        print(f" {', '.join(map(str, outputs))} up to date.")
+    save_manifest(entries, built)
+    prune_parts(entries)
+    elapsed = time.perf_counter() - t0
 
-if not frames:
-    raise SystemExit("No valid CSVs were processed!")
+    size_mb = sum(fp.stat().st_size for fp in todo) / 1e6
+    print(
+        f" Parsed {size_mb:.1f} MB in {parse_seconds:.2f}s across "
+        f"{args.workers or os.cpu_count()} workers; run took {elapsed:.2f}s"
+    )
 
-merged = pd.concat(frames, ignore_index=True)
-# Basic sanity
-merged = merged[(merged["Month"] >= 1) & (merged["Month"] <= 12)]
 
-merged.to_csv(OUT_FILE, index=False)
-print(f" Wrote {OUT_FILE} with {len(merged):,} rows from {len(frames)} usable files.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# parks_dataset.py
+#
+# The cleaned visits as a Hive-partitioned Parquet dataset:
+#   data/cleaned/parks_dataset/Year=1979/part-0.parquet, ...
+# String columns are dictionary-encoded in the files and read back as
+# categoricals; numerics are typed, so readers skip CSV parsing and string
+# cleanup.
+#
+# Rows in each Year partition are sorted by State and Park Type and split
+# into small row groups, so read_dataset() filters prune whole partitions
+# by Year and row groups by their State / Park Type statistics.
+
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+DATASET_DIR = Path("data/cleaned/parks_dataset")
+
+TEXT_COLS = ["Park", "Unit Code", "Park Type", "Region", "State"]
+SCHEMA = pa.schema(
+    # plain string in the Arrow schema: row-group pruning only uses the
+    # statistics of non-dictionary columns
+    [(c, pa.string()) for c in TEXT_COLS]
+    + [
+        ("Year", pa.int16()),
+        ("Month", pa.int8()),
+        ("Recreation Visits", pa.float64()),
+    ]
+)
+PARTITIONING = ds.partitioning(pa.schema([("Year", pa.int16())]), flavor="hive")
+ROW_GROUP_ROWS = 256
+
+
+def write_dataset(df: pd.DataFrame, path=DATASET_DIR):
+    """Replace the dataset at path with df (cleaned merge_and_clean output)."""
+    path = Path(path)
+    df = df.sort_values(["Year", "State", "Park Type"], kind="stable")
+    table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    ds.write_dataset(
+        table,
+        tmp,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template="part-{i}.parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(
+            compression="zstd", use_dictionary=TEXT_COLS
+        ),
+        min_rows_per_group=ROW_GROUP_ROWS,
+        max_rows_per_group=ROW_GROUP_ROWS,
+    )
+
+    old = path.with_name(path.name + ".old")
+    if path.exists():
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def dataset_filter(years=None, states=None, park_types=None):
+    """pyarrow filter expression for the given values (None = no filter)."""
+    conditions = []
+    if years is not None:
+        conditions.append(ds.field("Year").isin([int(y) for y in years]))
+    if states is not None:
+        conditions.append(ds.field("State").isin(list(states)))
+    if park_types is not None:
+        conditions.append(ds.field("Park Type").isin(list(park_types)))
+
+    expr = None
+    for cond in conditions:
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def open_dataset(path=DATASET_DIR) -> ds.Dataset:
+    return ds.dataset(path, format="parquet", partitioning=PARTITIONING)
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Text columns dictionary-encoded so they become categoricals."""
+    for c in TEXT_COLS:
+        i = table.schema.get_field_index(c)
+        if i >= 0:
+            table = table.set_column(i, c, table[c].dictionary_encode())
+    return table.to_pandas()
+
+
+def read_dataset(path=DATASET_DIR, years=None, states=None, park_types=None, columns=None) -> pd.DataFrame:
+    """
+    Rows matching every given filter, e.g.
+        read_dataset(years=[2023, 2024], states=["UT"], park_types=["National Park"])
+    Columns default to SCHEMA order; text columns come back as categoricals.
+    """
+    table = open_dataset(path).to_table(
+        columns=columns or SCHEMA.names, filter=dataset_filter(years, states, park_types)
+    )
+    return _to_pandas(table)
+
+
+def iter_dataset(path=DATASET_DIR, batch_size=50_000, years=None, states=None, park_types=None):
+    """
+    Matching rows as DataFrames of about batch_size rows (scans yield one
+    row group at a time, so those are gathered up to batch_size).
+    """
+    batches = open_dataset(path).to_batches(
+        columns=SCHEMA.names,
+        filter=dataset_filter(years, states, park_types),
+        batch_size=batch_size,
+    )
+    pending, rows = [], 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= batch_size:
+            yield _to_pandas(pa.Table.from_batches(pending))
+            pending, rows = [], 0
+    if rows:
+        yield _to_pandas(pa.Table.from_batches(pending))
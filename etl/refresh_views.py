@@ -1,5 +1,10 @@
+import os
+import sys
+
 from sqlalchemy import text
-from src.db import get_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+from src.db import get_engine  # noqa: E402
 
 VIEWS = [
     "mv_state_month_visits",
@@ -8,12 +13,34 @@ VIEWS = [
     "mv_park_yoy",
 ]
 
+# One-row marker the app's SQL backend (app/src/sql_backend.py) reads as its
+# data version: every park_visits load bumps load_seq, and a refresh records
+# the load_seq its views include, so views_seq = load_seq means fresh.
+MARKER_DDL = """
+CREATE TABLE IF NOT EXISTS public.park_visits_refresh (
+    id                  BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    load_seq            BIGINT NOT NULL DEFAULT 0,
+    loaded_at           TIMESTAMPTZ,
+    views_seq           BIGINT,
+    views_refreshed_at  TIMESTAMPTZ
+);
+INSERT INTO public.park_visits_refresh (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
+"""
+STAMP_LOAD_SQL = "UPDATE public.park_visits_refresh SET load_seq = load_seq + 1, loaded_at = now();"
+STAMP_VIEWS_SQL = "UPDATE public.park_visits_refresh SET views_seq = :seq, views_refreshed_at = now();"
+
 def main():
-    engine = get_engine()
+    # REFRESH ... CONCURRENTLY on the big views can outlast the app's statement timeout
+    engine = get_engine(statement_timeout_ms=0)
     with engine.begin() as conn:
+        conn.execute(text(MARKER_DDL))
+        # read before refreshing: the views include at least this load (a
+        # load committing meanwhile leaves them marked stale, not fresh)
+        seq = conn.execute(text("SELECT load_seq FROM public.park_visits_refresh")).scalar()
         for v in VIEWS:
             conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY public.{v};"))
             print(f"Refreshed: public.{v}")
+        conn.execute(text(STAMP_VIEWS_SQL), {"seq": seq})
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,352 @@
+# backtest.py
+#
+# Rolling-origin evaluation of the forecasting models, instead of the
+# notebook's single 12-month holdout. Cutoff i ends training OFFSET_i =
+# horizon + i * step months before each park's last month, and the model
+# forecasts the following `horizon` months:
+#
+#   |------------- train -------------|-- horizon --|      cutoff 0 (latest)
+#   |--------- train ---------|-- horizon --|              cutoff 1 ...
+#
+# Every (model, cutoff) runs in a process pool:
+#   ETS, SARIMA, Prophet              per park, in chunks of CHUNK parks
+#                                     (forecast.py's fits and time limits)
+#   SNaive, SMean, HW-add, HW-mul     all parks in one task (baselines.py)
+#   Global-GBM, Global-Linear         one fit per cutoff (global_model.py)
+# Forecasts are cached per model and cutoff under CACHE_DIR, keyed by a
+# fingerprint of the training data, so a rerun only fits what is new.
+# Failed fits and timeouts are not cached; a rerun tries them again.
+#
+# Metrics are the definitions of forecast.calculate_metrics, computed as
+# array operations over a [models x cutoffs x parks x horizon] block. The
+# leaderboard ranks models by their mean RMSE rank per (park, cutoff),
+# over the cells every model forecast; it is printed and written to --out,
+# with the best model per park next to it. Fit_Seconds is the mean time of
+# the per-park fits run this time (blank for cached and panel models).
+#
+# Run from the repo root:
+#   python models/backtest.py
+#   python models/backtest.py --cutoffs 8 --step 3 --models SARIMA ETS HW-add Global-GBM
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import baselines
+import forecast
+import global_model
+
+CACHE_DIR = Path("data/cleaned/.backtest_cache")
+OUT_FILE = Path("data/cleaned/backtest_leaderboard.csv")
+PER_PARK_FILE = Path("data/cleaned/backtest_per_park.csv")
+# Bump when a model or the cache layout changes so cached forecasts go stale
+CACHE_VERSION = 1
+
+CUTOFFS = 4
+STEP = 6
+CHUNK = 8
+# fewest training months a park needs at a cutoff (two seasons, for the
+# Holt-Winters start and global_model.MAX_LAG)
+MIN_TRAIN = 2 * baselines.SEASON
+
+PANEL_MODELS = {**{m: "baselines" for m in baselines.METHODS},
+                **{name: kind for kind, name in global_model.MODEL_NAMES.items()}}
+METRICS = ["RMSE", "MAE", "MAPE", "SMAPE", "R2"]
+
+
+# =========================================================
+# METRICS  (forecast.calculate_metrics, vectorized)
+# =========================================================
+
+def panel_metrics(actual: np.ndarray, predicted: np.ndarray) -> dict:
+    """
+    {metric: array} over the last (horizon) axis of [..., horizon] blocks,
+    as forecast.calculate_metrics computes them for one series. Cells with
+    no forecast are NaN.
+    """
+    actual = np.where(actual == 0, 1e-8, actual)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        err = predicted - actual
+        ss_res = (err ** 2).sum(-1)
+        ss_tot = ((actual - actual.mean(-1, keepdims=True)) ** 2).sum(-1)
+        out = {
+            "RMSE": np.sqrt((err ** 2).mean(-1)),
+            "MAE": np.abs(err).mean(-1),
+            "MAPE": np.abs(err / actual).mean(-1) * 100,
+            "SMAPE": 100 * (np.abs(err) / ((np.abs(predicted) + np.abs(actual)) / 2)).mean(-1),
+            "R2": np.where(ss_tot == 0, np.where(ss_res == 0, 1.0, 0.0), 1 - ss_res / ss_tot),
+        }
+    forecast_made = np.isfinite(predicted).all(-1)
+    # calculate_metrics replaces invalid values with 0
+    return {k: np.where(forecast_made, np.where(np.isfinite(v), v, 0.0), np.nan) for k, v in out.items()}
+
+
+def smape_by_step(actual, predicted) -> np.ndarray:
+    """sMAPE per horizon step, averaged over every axis but the first (models) and last."""
+    actual = np.where(actual == 0, 1e-8, actual)
+    with np.errstate(invalid="ignore"):
+        step = 100 * np.abs(predicted - actual) / ((np.abs(predicted) + np.abs(actual)) / 2)
+    return np.nanmean(step.reshape(len(step), -1, step.shape[-1]), axis=1)
+
+
+# =========================================================
+# CACHE
+# =========================================================
+
+def train_fingerprint(*arrays) -> str:
+    h = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for a in arrays:
+        h.update(np.ascontiguousarray(a).tobytes())
+    return h.hexdigest()
+
+
+def cache_path(model: str, offset: int, horizon: int) -> Path:
+    return CACHE_DIR / f"{model}_h{horizon}_o{offset}.json"
+
+
+def load_cache(model, offset, horizon) -> dict:
+    """{park: {"fingerprint", "forecast"}} of an earlier run; empty when missing."""
+    try:
+        with open(cache_path(model, offset, horizon)) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get("parks", {}) if cache.get("version") == CACHE_VERSION else {}
+
+
+def save_cache(model, offset, horizon, parks: dict):
+    path = cache_path(model, offset, horizon)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"version": CACHE_VERSION, "parks": parks}, f)
+    os.replace(tmp, path)
+
+
+# =========================================================
+# TASKS  (run in the worker processes)
+# =========================================================
+
+def park_task(model, chunk, horizon, timeout):
+    """
+    {park: (forecast list or None, seconds)} for chunk [(park, y, dates)]:
+    one model fitted per park on its training months.
+    """
+    out = {}
+    for park, y, dates in chunk:
+        try:
+            fc, _, seconds, _ = forecast.timed_fit(model, y, dates, horizon, timeout)
+            out[park] = ([float(v) for v in fc] if np.isfinite(fc).all() else None, seconds)
+        except Exception:
+            out[park] = (None, 0.0)
+    return out
+
+
+def panel_task(models, Y, lengths, first_month, horizon):
+    """{model: [rows x horizon]} for panel models, every row trained up to lengths."""
+    out = {}
+    methods = [m for m in models if PANEL_MODELS[m] == "baselines"]
+    if methods:
+        out.update(baselines.forecast_all(Y, lengths, horizon, methods))
+    for name in models:
+        kind = PANEL_MODELS[name]
+        if kind != "baselines":
+            Z = np.log1p(np.clip(Y, 0, None))
+            fitted = global_model.fit(Z, lengths, first_month, kind)
+            out[name] = global_model.predict(fitted, Z, lengths, first_month, horizon)
+    return out
+
+
+# =========================================================
+# BACKTEST
+# =========================================================
+
+def run_backtest(series: dict, models, offsets, horizon, workers=None, timeout=None, use_cache=True):
+    """
+    (parks, actual [cutoffs x parks x horizon], predicted [models x cutoffs
+    x parks x horizon], fit seconds {model: [seconds]}); NaN where a park has
+    too little history at a cutoff or a fit failed.
+    """
+    parks = list(series)
+    Y, lengths = baselines.stack([series[p][0] for p in parks])
+    first_month = np.array([series[p][1][0].month for p in parks]) - 1
+    actual = np.full((len(offsets), len(parks), horizon), np.nan)
+    predicted = np.full((len(models), len(offsets), len(parks), horizon), np.nan)
+    seconds = {m: [] for m in models}
+
+    jobs = []  # (model index, cutoff index, rows, fingerprints, task, args)
+    caches = {}
+    for c, offset in enumerate(offsets):
+        train = lengths - offset
+        rows = np.flatnonzero(train >= MIN_TRAIN)
+        actual[c, rows] = Y[rows[:, None], train[rows, None] + np.arange(horizon)]
+        fps = {i: train_fingerprint(Y[i, :train[i]]) for i in rows}
+        panel_fp = train_fingerprint(*(Y[i, :train[i]] for i in rows), first_month[rows])
+
+        panel_todo = []
+        for m, model in enumerate(models):
+            cache = caches[model, offset] = load_cache(model, offset, horizon) if use_cache else {}
+            want = panel_fp if model in PANEL_MODELS else None
+            todo = []
+            for i in rows:
+                entry = cache.get(parks[i])
+                if entry and entry["fingerprint"] == (want or fps[i]) and entry["forecast"] is not None:
+                    predicted[m, c, i] = entry["forecast"]
+                else:
+                    todo.append(i)
+            if not todo:
+                continue
+            if model in PANEL_MODELS:
+                panel_todo.append(m)
+                continue
+            for k in range(0, len(todo), CHUNK):
+                part = todo[k:k + CHUNK]
+                chunk = [(parks[i], Y[i, :train[i]], series[parks[i]][1][:train[i]]) for i in part]
+                jobs.append(([m], c, part, [fps[i] for i in part], park_task, (model, chunk, horizon, timeout)))
+        if panel_todo:
+            # panel models see only the parks that qualify at this cutoff
+            jobs.append((
+                panel_todo, c, list(rows), [panel_fp] * len(rows), panel_task,
+                ([models[m] for m in panel_todo], Y[rows], train[rows], first_month[rows], horizon),
+            ))
+
+    workers = workers or os.cpu_count() or 1
+    print(f" {len(jobs)} tasks over {len(offsets)} cutoffs on {workers} workers")
+
+    def settle(job, result):
+        ms, c, part, fps, task, _ = job
+        for m in ms:
+            cache = caches[models[m], offsets[c]]
+            if task is panel_task:
+                fc_block = result[models[m]]
+                for j, i in enumerate(part):
+                    fc = fc_block[j]
+                    if np.isfinite(fc).all():
+                        predicted[m, c, i] = fc
+                        cache[parks[i]] = {"fingerprint": fps[j], "forecast": [float(v) for v in fc]}
+            else:
+                for j, i in enumerate(part):
+                    fc, secs = result[parks[i]]
+                    if fc is not None:
+                        predicted[m, c, i] = fc
+                        seconds[models[m]].append(secs)
+                        cache[parks[i]] = {"fingerprint": fps[j], "forecast": fc}
+
+    if workers == 1:
+        for job in jobs:
+            settle(job, job[4](*job[5]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(job[4], *job[5]): job for job in jobs}
+            for done, future in enumerate(as_completed(futures), 1):
+                job = futures[future]
+                try:
+                    settle(job, future.result())
+                except Exception as e:
+                    print(f"  task {', '.join(models[m] for m in job[0])} @ cutoff {job[1]} failed: {e!r}")
+                if done % 20 == 0 or done == len(futures):
+                    print(f"  [{done}/{len(futures)}] tasks done")
+
+    for (model, offset), cache in caches.items():
+        if cache:
+            save_cache(model, offset, horizon, cache)
+    return parks, actual, predicted, seconds
+
+
+def leaderboard(models, parks, actual, predicted, seconds) -> tuple:
+    """(leaderboard, best model per park) frames from a run_backtest result."""
+    metrics = panel_metrics(actual[None], predicted)  # each [models x cutoffs x parks]
+    made = np.isfinite(metrics["RMSE"])
+    common = made.all(0)
+    # rank of each model's RMSE per (cutoff, park) where every model forecast
+    ranks = np.where(common, metrics["RMSE"], np.inf).argsort(0).argsort(0) + 1.0
+    ranks[:, ~common] = np.nan
+
+    rows = []
+    for m, model in enumerate(models):
+        ok = made[m]
+        row = {
+            "Model": model,
+            "Mean_Rank": np.nanmean(ranks[m]) if common.any() else np.nan,
+            "Wins": int((ranks[m] == 1).sum()),
+            "Coverage": ok.sum() / max(np.isfinite(actual).all(-1).sum(), 1),
+        }
+        for name in METRICS:
+            values = metrics[name][m][ok]
+            row[name] = values.mean() if len(values) else np.nan
+            row[f"{name}_median"] = np.median(values) if len(values) else np.nan
+        fits = seconds.get(model) or []
+        row["Fit_Seconds"] = float(np.mean(fits)) if fits else np.nan
+        rows.append(row)
+    board = pd.DataFrame(rows).sort_values(["Mean_Rank", "SMAPE_median"]).reset_index(drop=True)
+
+    counts = made.sum(1)  # [models x parks]
+    per_park_rmse = np.where(
+        counts > 0, np.where(made, metrics["RMSE"], 0).sum(1) / np.maximum(counts, 1), np.nan
+    )
+    scored = np.isfinite(per_park_rmse).any(0)
+    best = np.where(np.isfinite(per_park_rmse), per_park_rmse, np.inf).argmin(0)
+    per_park = pd.DataFrame({
+        "Park": np.asarray(parks)[scored],
+        "Best_Model": np.asarray(models)[best[scored]],
+        "Mean_RMSE": per_park_rmse[best[scored], np.flatnonzero(scored)],
+    })
+    return board, per_park
+
+
+def main(argv=None):
+    all_models = list(forecast.MODELS) + list(PANEL_MODELS)
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the forecasting models.")
+    parser.add_argument("--csv", nargs="?", const=forecast.CSV_PATH, default=None,
+                        help=f"read a cleaned CSV instead of the Parquet dataset (default CSV: {forecast.CSV_PATH})")
+    parser.add_argument("--models", nargs="+", default=all_models, choices=all_models)
+    parser.add_argument("--parks", nargs="+", help="only these parks")
+    parser.add_argument("--cutoffs", type=int, default=CUTOFFS, help="number of forecast origins")
+    parser.add_argument("--step", type=int, default=STEP, help="months between origins")
+    parser.add_argument("--horizon", type=int, default=forecast.HORIZON, help="months forecast from each origin")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds per per-park fit (default: forecast.MODEL_TIMEOUTS)")
+    parser.add_argument("--no-cache", action="store_true", help="refit everything, ignoring cached forecasts")
+    parser.add_argument("--out", default=OUT_FILE, help=f"leaderboard CSV (default: {OUT_FILE})")
+    args = parser.parse_args(argv)
+
+    models = [m for m in args.models if m in PANEL_MODELS] + forecast.available_models(
+        [m for m in args.models if m not in PANEL_MODELS]
+    )
+    offsets = [args.horizon + i * args.step for i in range(args.cutoffs)]
+    series = forecast.park_series(forecast.read_visits(args.csv), args.parks)
+    print(f"Backtesting {', '.join(models)} on {len(series)} parks, origins {offsets} months before the end")
+
+    t0 = time.perf_counter()
+    parks, actual, predicted, seconds = run_backtest(
+        series, models, offsets, args.horizon, args.workers, args.timeout, not args.no_cache
+    )
+    board, per_park = leaderboard(models, parks, actual, predicted, seconds)
+    elapsed = time.perf_counter() - t0
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    board.to_csv(out, index=False)
+    per_park.to_csv(out.with_name(PER_PARK_FILE.name), index=False)
+
+    cols = ["Model", "Mean_Rank", "Wins", "Coverage", "RMSE", "MAE", "MAPE_median", "SMAPE", "SMAPE_median",
+            "Fit_Seconds"]
+    print(f"\n Leaderboard ({len(offsets)} cutoffs x {len(parks)} parks x {args.horizon} months, {elapsed:.1f}s):")
+    print(board[cols].round(3).to_string(index=False))
+    by_step = pd.DataFrame(smape_by_step(actual[None], predicted), index=models,
+                           columns=range(1, args.horizon + 1))
+    print("\n sMAPE by months ahead:")
+    print(by_step.round(1).to_string())
+    print(f"\n Wrote {out} and {out.with_name(PER_PARK_FILE.name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# baselines.py
+#
+# Seasonal baselines for every park at once. The monthly series are stacked
+# into a [parks x months] matrix, left-aligned and NaN-padded. Series from
+# forecast.park_series have no missing months, so column t of every row is
+# the same step of that park's seasonal cycle, and each method runs as
+# array operations over all rows:
+#   SNaive   the last observed season repeated
+#   SMean    the mean of each step of the cycle over the whole history
+#   HW-add   Holt-Winters, additive trend and seasonality
+#   HW-mul   Holt-Winters, additive trend, multiplicative seasonality
+# Holt-Winters smoothing parameters are chosen per park by grid search:
+# every (alpha, beta, gamma) of the grid is one more leading axis of the
+# same recursion, scored by its one-step-ahead SSE.
+#
+# models/forecast.py uses them as the fallback for parks whose models all
+# fail, and to flag parks where the chosen model loses to a baseline on the
+# holdout. Standalone, they forecast the full park list in seconds (run
+# from the repo root):
+#   python models/baselines.py
+#   python models/baselines.py --csv --out app/monthly_forecasts.csv
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+SEASON = 12
+METHODS = ("SNaive", "SMean", "HW-add", "HW-mul")
+
+ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.0, 0.01, 0.05, 0.1, 0.2)
+GAMMAS = (0.0, 0.05, 0.1, 0.2, 0.4)
+
+OUT_FILE = Path("data/cleaned/baseline_forecasts.csv")
+
+# floor for divisors in the multiplicative recursion
+EPS = 1e-8
+
+
+def stack(series) -> tuple:
+    """(Y [parks x months], lengths) from a list of 1-D series."""
+    lengths = np.array([len(y) for y in series], dtype=np.int64)
+    Y = np.full((len(series), lengths.max(initial=0)), np.nan)
+    for i, y in enumerate(series):
+        Y[i, :len(y)] = y
+    return Y, lengths
+
+
+def _cycle_steps(lengths, horizon, m):
+    """[parks x horizon] step of the cycle of each forecast month."""
+    return (lengths[:, None] + np.arange(horizon)) % m
+
+
+def seasonal_naive(Y, lengths, horizon, m=SEASON):
+    last = lengths[:, None] - m + np.arange(horizon) % m
+    return np.take_along_axis(Y, last, axis=1)
+
+
+def seasonal_mean(Y, lengths, horizon, m=SEASON):
+    live = np.arange(Y.shape[1]) < lengths[:, None]
+    steps = np.arange(Y.shape[1]) % m
+    means = np.empty((len(Y), m))
+    for j in range(m):
+        cols = steps == j
+        means[:, j] = np.where(live[:, cols], Y[:, cols], 0).sum(1) / np.maximum(live[:, cols].sum(1), 1)
+    return np.take_along_axis(means, _cycle_steps(lengths, horizon, m), axis=1)
+
+
+def holt_winters(Y, lengths, alpha, beta, gamma, horizon, seasonal="add", m=SEASON):
+    """
+    Holt-Winters on every row of Y up to its length. alpha / beta / gamma
+    broadcast against [rows], e.g. shape [K, 1] runs K parameter sets.
+    States start from the first two seasons (level: mean of the first,
+    trend: mean change per month between them, seasonal: first season
+    minus / over the level). Returns (forecasts [..., rows, horizon],
+    one-step-ahead SSE [..., rows]).
+    """
+    mul = seasonal == "mul"
+    shape = np.broadcast_shapes(np.shape(alpha), np.shape(beta), np.shape(gamma), (len(Y),))
+    a, b, g = (np.broadcast_to(np.asarray(p, dtype=float), shape) for p in (alpha, beta, gamma))
+
+    first = Y[:, :m]
+    level0 = first.mean(1)
+    trend0 = (Y[:, m:2 * m].mean(1) - level0) / m
+    season0 = first / np.maximum(level0, EPS)[:, None] if mul else first - level0[:, None]
+    level = np.broadcast_to(level0, shape).copy()
+    trend = np.broadcast_to(trend0, shape).copy()
+    season = np.broadcast_to(season0, shape + (m,)).copy()
+    sse = np.zeros(shape)
+
+    with np.errstate(invalid="ignore", over="ignore"):
+        for t in range(m, Y.shape[1]):
+            y = Y[:, t]
+            live = t < lengths
+            j = t % m
+            s = season[..., j]
+            base = level + trend
+            err = y - (base * s if mul else base + s)
+            sse += np.where(live, err * err, 0)
+            if mul:
+                new_level = a * (y / np.maximum(s, EPS)) + (1 - a) * base
+                new_season = g * (y / np.maximum(base, EPS)) + (1 - g) * s
+            else:
+                new_level = a * (y - s) + (1 - a) * base
+                new_season = g * (y - base) + (1 - g) * s
+            trend = np.where(live, b * (new_level - level) + (1 - b) * trend, trend)
+            level = np.where(live, new_level, level)
+            season[..., j] = np.where(live, new_season, s)
+
+    steps = np.arange(1, horizon + 1)
+    cycle = np.broadcast_to(_cycle_steps(lengths, horizon, m), shape + (horizon,))
+    s = np.take_along_axis(season, cycle, axis=-1)
+    base = level[..., None] + trend[..., None] * steps
+    return (base * s if mul else base + s), sse
+
+
+def parameter_grid() -> np.ndarray:
+    """[K x 3] (alpha, beta, gamma) combinations searched by fit_holt_winters."""
+    return np.stack(np.meshgrid(ALPHAS, BETAS, GAMMAS, indexing="ij"), -1).reshape(-1, 3)
+
+
+def fit_holt_winters(Y, lengths, horizon, seasonal="add", grid=None):
+    """
+    Holt-Winters with the grid's lowest-SSE parameters per row. Returns
+    (forecasts [rows x horizon], params [rows x 3]); rows the method does
+    not fit (multiplicative with zero visits, diverging) are NaN.
+    """
+    grid = parameter_grid() if grid is None else np.asarray(grid, dtype=float)
+    fc, sse = holt_winters(Y, lengths, grid[:, :1], grid[:, 1:2], grid[:, 2:], horizon, seasonal)
+    sse = np.where(np.isfinite(sse) & np.isfinite(fc).all(-1), sse, np.inf)
+    if seasonal == "mul":
+        live = np.arange(Y.shape[1]) < lengths[:, None]
+        sse[:, (np.where(live, Y, 1) <= 0).any(1)] = np.inf
+
+    best = sse.argmin(0)
+    rows = np.arange(len(Y))
+    fitted = np.isfinite(sse[best, rows])
+    out = np.where(fitted[:, None], fc[best, rows], np.nan)
+    params = np.where(fitted[:, None], grid[best], np.nan)
+    return out, params
+
+
+def forecast_all(Y, lengths, horizon, methods=METHODS) -> dict:
+    """{method: forecasts [rows x horizon]} (NaN rows where a method does not fit)."""
+    out = {}
+    for method in methods:
+        if method == "SNaive":
+            out[method] = seasonal_naive(Y, lengths, horizon)
+        elif method == "SMean":
+            out[method] = seasonal_mean(Y, lengths, horizon)
+        else:
+            out[method] = fit_holt_winters(Y, lengths, horizon, method.split("-")[1])[0]
+    return out
+
+
+def holdout_split(Y, lengths, holdout):
+    """(lengths without the last holdout months, actuals [rows x holdout])."""
+    train = lengths - holdout
+    return train, np.take_along_axis(Y, train[:, None] + np.arange(holdout), axis=1)
+
+
+def main(argv=None):
+    import pandas as pd
+
+    import forecast
+
+    parser = argparse.ArgumentParser(description="Seasonal baseline forecasts for every park.")
+    parser.add_argument("--csv", nargs="?", const=forecast.CSV_PATH, default=None,
+                        help=f"read a cleaned CSV instead of the Parquet dataset (default CSV: {forecast.CSV_PATH})")
+    parser.add_argument("--out", default=OUT_FILE, help=f"forecast file to write (default: {OUT_FILE})")
+    parser.add_argument("--horizon", type=int, default=forecast.HORIZON, help="months to forecast")
+    args = parser.parse_args(argv)
+
+    series = forecast.park_series(forecast.read_visits(args.csv))
+    t0 = time.perf_counter()
+    results, metrics = forecast.baseline_results(series, args.horizon)
+    seconds = time.perf_counter() - t0
+
+    frames = [forecast.forecast_frame(results[p], series[p][1][-1], series[p][2]) for p in series if p in results]
+    out = forecast.write_forecasts(frames, args.out)
+    print(f" Wrote {args.out} with {len(out):,} rows for {len(results)} parks in {seconds:.2f}s")
+    print(" Mean holdout metrics per method:")
+    print(metrics.groupby("Model")[["RMSE", "MAE", "MAPE", "SMAPE", "R2"]].mean().round(2).to_string())
+    best = pd.Series([r["best"] for r in results.values()]).value_counts()
+    print(" Best method counts: " + ", ".join(f"{m} {n}" for m, n in best.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,645 @@
+# forecast.py
+#
+# Batch version of the per-park forecasting loop in Models_capstone.ipynb,
+# writing the monthly_forecasts.csv the app reads (app/src/loader.py):
+#   cleaned visits -> one monthly series per park -> per park, fit every
+#   model on all but the last HOLDOUT months, score them on the holdout,
+#   refit the best one on the whole series -> HORIZON months of forecasts.
+#
+# Parks are fanned out over a process pool. Each park runs on its worker's
+# main thread, so every model fit gets a SIGALRM time limit (the notebook's
+# signal.alarm only worked in the kernel's main thread). A park whose task
+# fails (final refit timed out, worker crashed) is retried up to --retries
+# times; a model that fails or times out during selection is just left out,
+# as in the notebook. Parks/minute and per-model fit times are printed at
+# the end.
+#
+# Runs are incremental: a store (data/cleaned/.forecast_store/store.json)
+# records per park a fingerprint of its training series (+ run settings),
+# the chosen Best_Model, each model's fitted parameters and the forecasts.
+# Parks whose fingerprint is unchanged are copied through without fitting;
+# the others are refitted, ETS and SARIMA starting from their stored
+# parameters, which converges in a fraction of a cold fit.
+#
+# The vectorized seasonal baselines (baselines.py) run over all parks in
+# seconds: a park whose models all fail gets the best baseline's forecast
+# instead of being dropped, and parks whose Best_Model has a higher holdout
+# RMSE than a baseline are listed as a sanity check.
+#
+# Run from the repo root:
+#   python models/forecast.py
+#   python models/forecast.py --full        # refit every park, cold
+#   python models/forecast.py --workers 8 --retries 2 --timeout 60
+#   python models/forecast.py --models ETS SARIMA --parks "Zion NP" "Acadia NP"
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+
+# one BLAS thread per worker; the pool already uses every core
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "etl"))
+from parks_dataset import DATASET_DIR, read_dataset  # noqa: E402
+
+import baselines  # noqa: E402
+
+CSV_PATH = Path("data/cleaned/all_parks_recreation_visits.csv")
+OUT_FILE = Path("app/monthly_forecasts.csv")
+STORE_FILE = Path("data/cleaned/.forecast_store/store.json")
+# Bump when model definitions or the store layout change so stored parks
+# are refitted
+STORE_VERSION = 1
+
+HORIZON = 12
+HOLDOUT = 12
+MIN_MONTHS = 36
+# Longer runs of missing months are not interpolated: the series starts after them
+MAX_GAP = 12
+SEASON = 12
+
+# seconds per fit, from the notebook's alarms
+MODEL_TIMEOUTS = {"ETS": 15, "SARIMA": 20, "Prophet": 20}
+
+# Columns of monthly_forecasts.csv; Forecast_Month is day-first, which is
+# how src/loader.read_forecasts parses it.
+OUT_COLUMNS = [
+    "Park", "Best_Model", "Forecast_Month", "Predicted_Visits",
+    "Unit Code", "Park Type", "Region", "State", "Year", "Month",
+]
+META_COLS = ["Unit Code", "Park Type", "Region", "State"]
+
+
+class FitTimeout(Exception):
+    pass
+
+
+# =========================================================
+# METRICS  (calculate_metrics from the notebook)
+# =========================================================
+
+def calculate_metrics(actual, predicted) -> dict:
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+
+    # Replace zeros to avoid division errors
+    actual = np.where(actual == 0, 1e-8, actual)
+
+    err = predicted - actual
+    rmse = np.sqrt(np.mean(err ** 2))
+    mae = np.mean(np.abs(err))
+    mape = np.mean(np.abs(err / actual)) * 100
+    smape = 100 * np.mean(np.abs(err) / ((np.abs(predicted) + np.abs(actual)) / 2))
+    # sklearn's r2_score, including its constant-actuals convention
+    ss_res = np.sum(err ** 2)
+    ss_tot = np.sum((actual - actual.mean()) ** 2)
+    if ss_tot == 0:
+        r2 = 1.0 if ss_res == 0 else 0.0
+    else:
+        r2 = 1 - ss_res / ss_tot
+
+    metrics = {"RMSE": rmse, "MAE": mae, "MAPE": mape, "SMAPE": smape, "R2": r2}
+    # Replace invalids with 0
+    return {k: 0.0 if not np.isfinite(v) else float(v) for k, v in metrics.items()}
+
+
+def composite_scores(metrics: pd.DataFrame) -> pd.Series:
+    """
+    The notebook's model ranking (lower is better): min-max normalized
+    RMSE, MAE and MAPE plus 1 - R2, equally weighted.
+    """
+    metrics = metrics.replace([np.inf, -np.inf], np.nan).fillna(0)
+    metrics["MAPE"] = metrics["MAPE"].clip(0, 1000)
+    score = 0.25 * (1 - metrics["R2"])
+    for col in ["RMSE", "MAE", "MAPE"]:
+        values = metrics[col]
+        if values.nunique() > 1:
+            score += 0.25 * (values - values.min()) / (values.max() - values.min())
+    return score
+
+
+# =========================================================
+# MODELS
+# =========================================================
+
+# Each model returns (forecast, fitted parameters as a list or None) and
+# takes start, parameters of an earlier fit to start the optimizer from.
+
+def ets_forecast(y: np.ndarray, dates: pd.DatetimeIndex, horizon: int, start=None):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    model = ExponentialSmoothing(y, trend="add", seasonal="add", seasonal_periods=SEASON)
+    if start is None:
+        fit = model.fit()
+    else:
+        # no brute-force grid over the smoothing parameters: start is
+        # already near the optimum
+        fit = model.fit(start_params=np.asarray(start), use_brute=False)
+    p = fit.params
+    params = [
+        p["smoothing_level"], p["smoothing_trend"], p["smoothing_seasonal"],
+        p["initial_level"], p["initial_trend"], *p["initial_seasons"],
+    ]
+    return np.asarray(fit.forecast(horizon)), [float(v) for v in params]
+
+
+def sarima_forecast(y: np.ndarray, dates: pd.DatetimeIndex, horizon: int, start=None):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    model = SARIMAX(y, order=(1, 1, 1), seasonal_order=(1, 1, 1, SEASON))
+    fit = model.fit(start_params=None if start is None else np.asarray(start), disp=False)
+    return np.asarray(fit.forecast(horizon)), [float(v) for v in fit.params]
+
+
+def prophet_forecast(y: np.ndarray, dates: pd.DatetimeIndex, horizon: int, start=None):
+    import logging
+
+    from prophet import Prophet
+
+    # cmdstanpy logs every chain at INFO
+    logging.getLogger("cmdstanpy").disabled = True
+    model = Prophet(yearly_seasonality=True)
+    model.fit(pd.DataFrame({"ds": dates, "y": y}))
+    future = model.make_future_dataframe(periods=horizon, freq="MS")
+    return model.predict(future)["yhat"].to_numpy()[-horizon:], None
+
+
+MODELS = {
+    "ETS": ets_forecast,
+    "SARIMA": sarima_forecast,
+    "Prophet": prophet_forecast,
+}
+
+
+def available_models(names):
+    """names minus models whose library is not installed (Prophet is optional)."""
+    out = []
+    for name in names:
+        if name == "Prophet":
+            try:
+                import prophet  # noqa: F401
+            except ImportError:
+                print("  Prophet is not installed, skipping it.")
+                continue
+        out.append(name)
+    return out
+
+
+# =========================================================
+# PER-PARK TASK  (runs in the worker processes)
+# =========================================================
+
+@contextmanager
+def time_limit(seconds):
+    """Raise FitTimeout in the block after `seconds` (main thread only)."""
+    if not seconds or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise FitTimeout(f"timed out after {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def timed_fit(name, y, dates, horizon, timeout, start=None):
+    """
+    (forecast, params, seconds, warm) of one model fit under its time limit.
+    A warm start that fails or gives a non-finite forecast is redone cold.
+    """
+    t0 = time.perf_counter()
+    # statsmodels warns on most short series (convergence, start params),
+    # as the notebook found; failures that matter surface as exceptions
+    with warnings.catch_warnings(), time_limit(timeout or MODEL_TIMEOUTS.get(name)):
+        warnings.simplefilter("ignore")
+        if start is not None:
+            try:
+                fc, params = MODELS[name](y, dates, horizon, start)
+                if np.isfinite(fc).all():
+                    return fc, params, time.perf_counter() - t0, True
+            except FitTimeout:
+                raise
+            except Exception:
+                pass
+        fc, params = MODELS[name](y, dates, horizon)
+    return fc, params, time.perf_counter() - t0, False
+
+
+def forecast_park(park, y, dates, models, horizon=HORIZON, holdout=HOLDOUT, timeout=None, warm=None):
+    """
+    Select the best of `models` for one park on its last `holdout` months
+    and forecast `horizon` months after the series with it. warm maps a
+    model to parameters of an earlier fit to start from.
+
+    Returns a dict with best model, forecasts, per-model metrics, fitted
+    params per model, fits [(model, stage, seconds, warm)] and failures
+    [(model, message)]. Raises when no model can be refitted on the full
+    series.
+    """
+    warm = warm or {}
+    train, test = y[:-holdout], y[-holdout:]
+    fits, failures, scored, params = [], [], [], {}
+    for name in models:
+        try:
+            fc, fitted, seconds, warmed = timed_fit(
+                name, train, dates[:-holdout], holdout, timeout, warm.get(name)
+            )
+        except Exception as e:
+            failures.append((name, f"{type(e).__name__}: {e}"))
+            continue
+        fits.append((name, "select", seconds, warmed))
+        scored.append({"Model": name, **calculate_metrics(test, fc)})
+        if fitted is not None:
+            params[name] = fitted
+
+    if not scored:
+        raise RuntimeError("all models failed or timed out: " + "; ".join(f"{m}: {e}" for m, e in failures))
+
+    metrics = pd.DataFrame(scored)
+    metrics["Composite_Score"] = composite_scores(metrics)
+    best = metrics.sort_values("Composite_Score", kind="stable")["Model"].iloc[0]
+
+    fc, fitted, seconds, warmed = timed_fit(best, y, dates, horizon, timeout, params.get(best, warm.get(best)))
+    fits.append((best, "final", seconds, warmed))
+    if fitted is not None:
+        params[best] = fitted
+    return {
+        "park": park,
+        "best": best,
+        "forecast": np.asarray(fc, dtype=float),
+        "metrics": metrics.to_dict("records"),
+        "params": params,
+        "fits": fits,
+        "failures": failures,
+    }
+
+
+# =========================================================
+# BASELINES
+# =========================================================
+
+def baseline_results(series: dict, horizon=HORIZON, holdout=HOLDOUT):
+    """
+    The best seasonal baseline per park, chosen on the holdout with the
+    same metrics and composite score as forecast_park. Returns
+    ({park: result like forecast_park's}, holdout metrics with a Park column).
+    """
+    parks = list(series)
+    Y, lengths = baselines.stack([series[p][0] for p in parks])
+    train, actual = baselines.holdout_split(Y, lengths, holdout)
+    scored = baselines.forecast_all(Y, train, holdout)
+    final = baselines.forecast_all(Y, lengths, horizon)
+
+    results, frames = {}, []
+    for i, park in enumerate(parks):
+        usable = [m for m in scored if np.isfinite(scored[m][i]).all() and np.isfinite(final[m][i]).all()]
+        if not usable:
+            continue
+        metrics = pd.DataFrame([{"Model": m, **calculate_metrics(actual[i], scored[m][i])} for m in usable])
+        metrics["Composite_Score"] = composite_scores(metrics)
+        best = metrics.sort_values("Composite_Score", kind="stable")["Model"].iloc[0]
+        results[park] = {
+            "park": park,
+            "best": best,
+            "forecast": final[best][i],
+            "metrics": metrics.to_dict("records"),
+            "params": {},
+            "fits": [],
+            "failures": [],
+        }
+        frames.append(metrics.assign(Park=park))
+    return results, pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def baseline_check(results: dict, baseline_metrics: pd.DataFrame, show=5):
+    """Print parks whose Best_Model has a higher holdout RMSE than the best baseline."""
+    if baseline_metrics.empty or not results:
+        return
+    floor = baseline_metrics.groupby("Park")["RMSE"].min()
+    worse = []
+    for park, r in results.items():
+        chosen = [m["RMSE"] for m in r["metrics"] if m["Model"] == r["best"]]
+        if chosen and park in floor.index and chosen[0] > floor[park]:
+            worse.append((chosen[0] / max(floor[park], 1e-9), park, r["best"]))
+    print(f" {len(worse)} of {len(results)} parks: Best_Model has a higher holdout RMSE than a seasonal baseline")
+    for ratio, park, best in sorted(worse, reverse=True)[:show]:
+        print(f"   {park}: {best} RMSE {ratio:.2f}x the baseline's")
+
+
+# =========================================================
+# STORE  (incremental runs)
+# =========================================================
+
+def series_fingerprint(y, dates, meta: dict, settings: dict) -> str:
+    """sha256 of one park's training series, metadata and the run settings."""
+    h = hashlib.sha256(json.dumps([STORE_VERSION, settings], sort_keys=True).encode())
+    h.update(json.dumps({k: str(v) for k, v in meta.items()}, sort_keys=True).encode())
+    h.update(np.asarray(dates, dtype="datetime64[ns]").view(np.int64).tobytes())
+    h.update(np.asarray(y, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def load_store(path=STORE_FILE) -> dict:
+    """{park: entry} from the last run; empty when missing or stale."""
+    try:
+        with open(path) as f:
+            store = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if store.get("version") != STORE_VERSION:
+        return {}
+    return store.get("parks", {})
+
+
+def save_store(parks: dict, path=STORE_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"version": STORE_VERSION, "parks": parks}, f, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def store_entry(result: dict, fingerprint: str) -> dict:
+    return {
+        "fingerprint": fingerprint,
+        "best": result["best"],
+        "forecast": [float(v) for v in result["forecast"]],
+        "metrics": result["metrics"],
+        "params": result["params"],
+    }
+
+
+def stored_result(park: str, entry: dict) -> dict:
+    """A forecast_park result served from the store (no fits)."""
+    return {
+        "park": park,
+        "best": entry["best"],
+        "forecast": np.asarray(entry["forecast"], dtype=float),
+        "metrics": entry["metrics"],
+        "params": entry["params"],
+        "fits": [],
+        "failures": [],
+    }
+
+
+# =========================================================
+# INPUT / OUTPUT
+# =========================================================
+
+def read_visits(csv_path=None) -> pd.DataFrame:
+    """Cleaned visits: the Parquet dataset, or csv_path when given / when there is no dataset."""
+    if csv_path is None and DATASET_DIR.exists():
+        return read_dataset(DATASET_DIR)
+    return pd.read_csv(csv_path or CSV_PATH)
+
+
+def contiguous(y: pd.Series) -> pd.Series:
+    """y (indexed by month start) over every month from its first to its last (see park_series)."""
+    months = pd.date_range(y.index[0], y.index[-1], freq="MS")
+    if len(months) == len(y):
+        return y
+    y = y.reindex(months)
+    missing = y.isna().to_numpy().astype(np.int8)
+    edges = np.flatnonzero(np.diff(np.r_[0, missing, 0]))
+    starts, ends = edges[::2], edges[1::2]
+    long = ends - starts > MAX_GAP
+    if long.any():
+        y = y.iloc[ends[long][-1]:]
+    return y.interpolate("linear")
+
+
+def park_series(visits: pd.DataFrame, parks=None, min_months=MIN_MONTHS):
+    """
+    {park: (visits array, month-start dates, metadata dict)} for parks with
+    at least min_months months, in park order. Each series covers every
+    month from its first to its last; missing months in between are filled
+    by linear interpolation, so position i is always i months after the
+    start (the baselines and the global model rely on that). After a gap of
+    more than MAX_GAP months only the months following it are kept.
+    """
+    visits = visits.dropna(subset=["Park", "Year", "Month", "Recreation Visits"])
+    visits = visits.assign(Park=visits["Park"].astype(str).str.strip())
+    if parks:
+        visits = visits[visits["Park"].isin(set(parks))]
+    monthly = (
+        visits.groupby(["Park", "Year", "Month"], as_index=False, observed=True)
+        .agg(**{"Recreation Visits": ("Recreation Visits", "sum")},
+             **{c: (c, "first") for c in META_COLS if c in visits.columns})
+        .sort_values(["Park", "Year", "Month"], kind="stable")
+    )
+    monthly["YearMonth"] = pd.to_datetime(
+        {"year": monthly["Year"].astype(int), "month": monthly["Month"].astype(int), "day": 1}
+    )
+
+    series = {}
+    for park, group in monthly.groupby("Park", sort=True):
+        if len(group) < min_months:
+            continue
+        y = group.set_index("YearMonth")["Recreation Visits"].astype(float)
+        y = contiguous(y)
+        if len(y) < min_months:
+            continue
+        meta = {c: group[c].iloc[0] for c in META_COLS if c in group.columns}
+        series[park] = (y.to_numpy(float), pd.DatetimeIndex(y.index), meta)
+    return series
+
+
+def forecast_frame(result: dict, last_date, meta: dict) -> pd.DataFrame:
+    """One park's forecasts as monthly_forecasts.csv rows."""
+    months = pd.date_range(last_date + pd.offsets.MonthBegin(1), periods=len(result["forecast"]), freq="MS")
+    df = pd.DataFrame({
+        "Park": result["park"],
+        "Best_Model": result["best"],
+        "Forecast_Month": months,
+        "Predicted_Visits": result["forecast"],
+    })
+    for col in META_COLS:
+        df[col] = meta.get(col, np.nan)
+    df["Year"] = months.year
+    df["Month"] = months.month
+    return df
+
+
+def write_forecasts(frames, path=OUT_FILE) -> pd.DataFrame:
+    """Combine and write atomically (readers never see a partial file)."""
+    path = Path(path)
+    out = pd.concat(frames, ignore_index=True)
+    # no negative visits, whole numbers
+    out["Predicted_Visits"] = out["Predicted_Visits"].clip(lower=0).round().astype(int)
+    out["Forecast_Month"] = out["Forecast_Month"].dt.strftime("%d-%m-%Y")
+    out = out[OUT_COLUMNS]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    out.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return out
+
+
+# =========================================================
+# POOL
+# =========================================================
+
+def run_parks(series: dict, models, workers=None, retries=1, timeout=None, horizon=HORIZON, warm=None):
+    """
+    forecast_park for every park in a process pool (in-process with one
+    worker), warm-started from warm[park] when given. Returns
+    ({park: result}, {park: error}) after retries.
+    """
+    warm = warm or {}
+    workers = workers or os.cpu_count() or 1
+    attempts = dict.fromkeys(series, 0)
+    results, errors = {}, {}
+    pending = list(series)
+
+    def settle(park, run):
+        try:
+            results[park] = run()
+            errors.pop(park, None)
+            return
+        except Exception as e:
+            errors[park] = f"{type(e).__name__}: {e}"
+        attempts[park] += 1
+        if attempts[park] <= retries:
+            print(f"  retry {attempts[park]}/{retries} {park}: {errors[park]}")
+            pending.append(park)
+        else:
+            print(f"  FAILED {park}: {errors[park]}")
+
+    while pending:
+        batch, pending[:] = list(pending), []
+        if workers == 1:
+            for park in batch:
+                y, dates, _ = series[park]
+                settle(park, lambda: forecast_park(
+                    park, y, dates, models, horizon, timeout=timeout, warm=warm.get(park)
+                ))
+            continue
+        # a fresh pool per round: one that lost a worker cannot take more tasks
+        with ProcessPoolExecutor(max_workers=min(workers, len(batch))) as pool:
+            futures = {
+                pool.submit(
+                    forecast_park, park, series[park][0], series[park][1], models, horizon,
+                    timeout=timeout, warm=warm.get(park),
+                ): park
+                for park in batch
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                park = futures[future]
+                settle(park, future.result)
+                if park in results:
+                    print(f"  [{done}/{len(batch)}] {park}: {results[park]['best']}")
+    return results, errors
+
+
+def fit_report(results: dict, seconds: float):
+    """Throughput and per-model fit time summary of the refitted parks."""
+    fits = pd.DataFrame(
+        [fit for r in results.values() for fit in r["fits"]],
+        columns=["model", "stage", "seconds", "warm"],
+    )
+    failures = pd.DataFrame(
+        [(m, e) for r in results.values() for m, e in r["failures"]], columns=["model", "error"]
+    )
+    print(
+        f" Forecast {len(results)} parks in {seconds:.1f}s "
+        f"({len(results) / max(seconds, 1e-9) * 60:,.1f} parks/minute)"
+    )
+    if fits.empty:
+        return
+    summary = fits.groupby(["model", "stage"])["seconds"].describe(percentiles=[0.5, 0.95])
+    summary = summary[["count", "mean", "50%", "95%", "max"]].round(3)
+    summary["warm"] = fits.groupby(["model", "stage"])["warm"].sum().astype(int)
+    summary["failed"] = [
+        int((failures["model"] == m).sum()) if stage == "select" else 0 for m, stage in summary.index
+    ]
+    print(" Fit seconds per model:")
+    print(summary.to_string())
+    best = pd.Series([r["best"] for r in results.values()]).value_counts()
+    print(" Best model counts: " + ", ".join(f"{m} {n}" for m, n in best.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast monthly visits for every park.")
+    parser.add_argument("--csv", nargs="?", const=CSV_PATH, default=None,
+                        help=f"read a cleaned CSV instead of {DATASET_DIR} (default CSV: {CSV_PATH})")
+    parser.add_argument("--out", default=OUT_FILE, help=f"forecast file to write (default: {OUT_FILE})")
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--parks", nargs="+", help="only these parks")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--retries", type=int, default=1, help="retries for a park whose task failed")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds per model fit (default: per model, see MODEL_TIMEOUTS)")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="months to forecast")
+    parser.add_argument("--store", default=STORE_FILE, help=f"forecast store (default: {STORE_FILE})")
+    parser.add_argument("--full", action="store_true", help="ignore the store: refit every park, cold")
+    args = parser.parse_args(argv)
+
+    models = available_models(args.models)
+    if not models:
+        raise SystemExit("No forecasting model is available.")
+
+    t0 = time.perf_counter()
+    series = park_series(read_visits(args.csv), args.parks)
+    store = {} if args.full else load_store(args.store)
+    settings = {"models": models, "horizon": args.horizon, "holdout": HOLDOUT}
+    fingerprints = {p: series_fingerprint(*series[p], settings) for p in series}
+    unchanged = {
+        p: stored_result(p, store[p])
+        for p in series
+        if p in store and store[p]["fingerprint"] == fingerprints[p]
+    }
+    todo = {p: s for p, s in series.items() if p not in unchanged}
+    print(
+        f"Forecasting {len(series)} parks with {', '.join(models)}: {len(todo)} to refit, "
+        f"{len(unchanged)} unchanged; {args.workers or os.cpu_count()} workers"
+    )
+
+    warm = {p: store[p]["params"] for p in todo if p in store}
+    refitted, errors = run_parks(todo, models, args.workers, args.retries, args.timeout, args.horizon, warm)
+    results = {**unchanged, **refitted}
+
+    fallback, baseline_metrics = baseline_results(series, args.horizon)
+    fallen_back = [p for p in errors if p in fallback]
+    for park in fallen_back:
+        results[park] = fallback[park]
+    if fallen_back:
+        print(f" {len(fallen_back)} failed parks use their best seasonal baseline instead")
+    if not results:
+        raise SystemExit("No park could be forecast!")
+
+    frames = [forecast_frame(results[p], series[p][1][-1], series[p][2]) for p in series if p in results]
+    out = write_forecasts(frames, args.out)
+    print(f" Wrote {args.out} with {len(out):,} rows; {len(errors) - len(fallen_back)} parks failed.")
+
+    # failed parks keep their old entry (stale fingerprint) for the next warm start
+    entries = {p: store[p] for p in errors if p in store}
+    entries.update({p: store_entry(r, fingerprints[p]) for p, r in results.items() if p not in errors})
+    save_store(entries, args.store)
+    fit_report(refitted, time.perf_counter() - t0)
+    baseline_check({p: r for p, r in results.items() if p not in errors}, baseline_metrics)
+
+
+if __name__ == "__main__":
+    main()
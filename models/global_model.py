@@ -0,0 +1,214 @@
+# global_model.py
+#
+# One forecasting model for all parks instead of a fit per park. The park
+# series are stacked into the [parks x months] panel of baselines.py (on a
+# log1p scale, so parks of every size share one model) and every
+# (park, month) cell with MAX_LAG months of history becomes a training row:
+#   lags 1, 2, 3, 6, 12, 24, mean of the last 12 months, change over the
+#   last year (lag 1 - lag 13) and the calendar month
+# built with array indexing over the whole panel at once. One scikit-learn
+# model is fitted on all rows:
+#   gbm     HistGradientBoostingRegressor (month as a categorical feature)
+#   linear  Ridge on the same features, months one-hot encoded
+# Forecasts are recursive: each step predicts the next month of every park
+# in one batch, writes it into the panel and builds the next step's lags
+# from it.
+#
+# With --compare the model is also scored on the last HOLDOUT months
+# (trained without them) with forecast.calculate_metrics, next to the
+# per-park models' holdout metrics from the forecast store (forecast.py)
+# and the seasonal baselines. Both of those pick their model on that same
+# holdout, so their numbers are optimistic next to the global model's.
+#
+# Run from the repo root:
+#   python models/global_model.py --compare
+#   python models/global_model.py --model linear --out app/monthly_forecasts.csv
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import baselines
+import forecast
+
+OUT_FILE = Path("data/cleaned/global_forecasts.csv")
+
+LAGS = (1, 2, 3, 6, 12, 24)
+MAX_LAG = 24  # months of history the lag24 feature needs
+FEATURES = [f"lag{k}" for k in LAGS] + ["mean12", "yoy", "month"]
+MODEL_NAMES = {"gbm": "Global-GBM", "linear": "Global-Linear"}
+
+
+# =========================================================
+# FEATURES
+# =========================================================
+
+def panel(series: dict):
+    """(parks, log1p panel [parks x months], lengths, calendar month of column 0 per park)."""
+    parks = list(series)
+    Y, lengths = baselines.stack([np.clip(series[p][0], 0, None) for p in parks])
+    first_month = np.array([series[p][1][0].month for p in parks]) - 1
+    return parks, np.log1p(Y), lengths, first_month
+
+
+def features(Z, rows, pos, first_month) -> np.ndarray:
+    """[N x FEATURES] for predicting Z[rows, pos] from the months before it."""
+    last12 = Z[rows[:, None], pos[:, None] - np.arange(1, 13)]
+    cols = [Z[rows, pos - k] for k in LAGS]
+    cols.append(last12.mean(1))
+    cols.append(Z[rows, pos - 1] - Z[rows, pos - 13])
+    cols.append((first_month[rows] + pos) % 12)
+    return np.column_stack(cols)
+
+
+def training_rows(Z, lengths, first_month):
+    """(X, y) over every cell with MAX_LAG months of history, all parks at once."""
+    live = (np.arange(Z.shape[1]) >= MAX_LAG) & (np.arange(Z.shape[1]) < lengths[:, None])
+    rows, pos = np.nonzero(live)
+    return features(Z, rows, pos, first_month), Z[rows, pos]
+
+
+# =========================================================
+# MODEL
+# =========================================================
+
+def make_model(kind: str):
+    month = FEATURES.index("month")
+    if kind == "gbm":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        return HistGradientBoostingRegressor(
+            max_iter=300, learning_rate=0.05, categorical_features=[month], random_state=0
+        )
+
+    from sklearn.compose import ColumnTransformer
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    encode = ColumnTransformer(
+        [("month", OneHotEncoder(categories=[np.arange(12)]), [month])], remainder="passthrough"
+    )
+    return make_pipeline(encode, Ridge(alpha=1.0))
+
+
+def fit(Z, lengths, first_month, kind="gbm"):
+    X, y = training_rows(Z, lengths, first_month)
+    return make_model(kind).fit(X, y)
+
+
+def predict(model, Z, lengths, first_month, horizon) -> np.ndarray:
+    """
+    Recursive forecasts [parks x horizon] in visits: one batched predict
+    per step, fed back into a copy of the panel for the next step's lags.
+    """
+    rows = np.arange(len(Z))
+    width = int(lengths.max()) + horizon
+    work = np.full((len(Z), width), np.nan)
+    keep = min(width, Z.shape[1])
+    work[:, :keep] = Z[:, :keep]
+    # cells past a park's own length belong to its forecast
+    work[np.arange(width) >= lengths[:, None]] = np.nan
+
+    for h in range(horizon):
+        pos = lengths + h
+        step = model.predict(features(work, rows, pos, first_month))
+        work[rows, pos] = np.clip(step, 0, None)
+    out = work[rows[:, None], lengths[:, None] + np.arange(horizon)]
+    return np.expm1(out)
+
+
+# =========================================================
+# COMPARISON
+# =========================================================
+
+def holdout_metrics(series: dict, kind="gbm", holdout=forecast.HOLDOUT) -> pd.DataFrame:
+    """calculate_metrics per park for the global model trained without the last holdout months."""
+    parks, Z, lengths, first_month = panel(series)
+    train = lengths - holdout
+    model = fit(Z, train, first_month, kind)
+    fc = predict(model, Z, train, first_month, holdout)
+    rows = []
+    for i, park in enumerate(parks):
+        actual = series[park][0][-holdout:]
+        rows.append({"Park": park, "Model": MODEL_NAMES[kind], **forecast.calculate_metrics(actual, fc[i])})
+    return pd.DataFrame(rows)
+
+
+def per_park_metrics(store: dict) -> pd.DataFrame:
+    """Holdout metrics of each stored park's Best_Model (see forecast.py's store)."""
+    rows = []
+    for park, entry in store.items():
+        for m in entry["metrics"]:
+            if m["Model"] == entry["best"]:
+                rows.append({"Park": park, **m, "Model": "Per-park best"})
+    return pd.DataFrame(rows)
+
+
+def compare(series: dict, kind: str, store_path):
+    metrics = [holdout_metrics(series, kind)]
+    store = {p: e for p, e in forecast.load_store(store_path).items() if p in series}
+    if store:
+        metrics.append(per_park_metrics(store))
+    else:
+        print(f" No forecast store at {store_path}; run models/forecast.py for the per-park numbers.")
+    _, baseline = forecast.baseline_results(series)
+    best = baseline.loc[baseline.groupby("Park")["Composite_Score"].idxmin()]
+    metrics.append(best.assign(Model="Best baseline"))
+
+    table = pd.concat(metrics, ignore_index=True)
+    table = table[table["Park"].isin(set.intersection(*(set(m["Park"]) for m in metrics)))]
+    cols = ["RMSE", "MAE", "MAPE", "SMAPE"]
+    print(f" Holdout accuracy over {table['Park'].nunique()} parks (last {forecast.HOLDOUT} months):")
+    summary = table.groupby("Model")[cols].agg(["mean", "median"]).round(1)
+    print(summary.to_string())
+
+    wide = table.pivot(index="Park", columns="Model", values="RMSE")
+    name = MODEL_NAMES[kind]
+    for other in wide.columns.drop(name):
+        wins = int((wide[name] < wide[other]).sum())
+        print(f" {name} has the lower RMSE than {other} for {wins} of {len(wide)} parks")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast every park with one global model.")
+    parser.add_argument("--csv", nargs="?", const=forecast.CSV_PATH, default=None,
+                        help=f"read a cleaned CSV instead of the Parquet dataset (default CSV: {forecast.CSV_PATH})")
+    parser.add_argument("--out", default=OUT_FILE, help=f"forecast file to write (default: {OUT_FILE})")
+    parser.add_argument("--model", choices=list(MODEL_NAMES), default="gbm")
+    parser.add_argument("--horizon", type=int, default=forecast.HORIZON, help="months to forecast")
+    parser.add_argument("--compare", action="store_true",
+                        help="score on the holdout against the per-park models and baselines")
+    parser.add_argument("--store", default=forecast.STORE_FILE,
+                        help=f"forecast store with the per-park metrics (default: {forecast.STORE_FILE})")
+    args = parser.parse_args(argv)
+
+    series = forecast.park_series(forecast.read_visits(args.csv))
+    t0 = time.perf_counter()
+    parks, Z, lengths, first_month = panel(series)
+    model = fit(Z, lengths, first_month, args.model)
+    t_fit = time.perf_counter() - t0
+    fc = predict(model, Z, lengths, first_month, args.horizon)
+    seconds = time.perf_counter() - t0
+
+    name = MODEL_NAMES[args.model]
+    frames = [
+        forecast.forecast_frame(
+            {"park": p, "best": name, "forecast": fc[i]}, series[p][1][-1], series[p][2]
+        )
+        for i, p in enumerate(parks)
+    ]
+    out = forecast.write_forecasts(frames, args.out)
+    print(
+        f" Wrote {args.out} with {len(out):,} rows for {len(parks)} parks: "
+        f"{name} fitted in {t_fit:.2f}s, {seconds:.2f}s with prediction"
+    )
+    if args.compare:
+        compare(series, args.model, args.store)
+
+
+if __name__ == "__main__":
+    main()
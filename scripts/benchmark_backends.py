@@ -0,0 +1,223 @@
+# benchmark_backends.py
+#
+# Memory backend (parks_df + cube) vs the embedded DuckDB backend on the
+# local data scaled up 1x / 10x / 100x. A scale of k clones every park k
+# times under a new name ("Acadia NP #3"), so rows, parks and groups grow
+# k-fold while years, months and states stay as they are. Each scale is
+# written as a Hive-partitioned Parquet dataset, like app/parks_dataset.
+#
+# Per backend and scale:
+#   setup    read the dataset and build the bundle (memory: clean +
+#            compact parks_df, filter masks, cube, state tables; duckdb:
+#            load park_visits + mv_state_month_visits)
+#   held MB  parks_df + cube arrays / DuckDB's own memory
+#   peak MB  peak RSS of the process that built and queried the bundle
+#   rollups  one filter change: every FilterContext rollup + KPIs, caches
+#            cleared first (what the storyline callbacks wait for)
+#   map      the choropleth's status + top parks for the same filters
+# "pandas" is the pre-cube path for reference: the same rollups as boolean
+# scans + groupby over parks_df.
+# Each backend runs in a forked child, so one that runs out of memory is
+# reported as such and the others still run.
+#
+# Run from the app/ folder:
+#   python ../scripts/benchmark_backends.py [repeats] [scales...]
+
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import core  # noqa: E402
+from src import loader  # noqa: E402
+from src.duckdb_backend import DuckDbBackend, connect_local  # noqa: E402
+
+REPEATS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+SCALES = [int(s) for s in sys.argv[2:]] or [1, 10, 100]
+
+RAW_COLUMNS = ["Park", "Park Type", "State", "Year", "Month", "Recreation Visits"]
+
+
+def base_rows() -> pd.DataFrame:
+    df = loader.clean_parks(pd.read_csv(loader.LOCAL_CSV))
+    return loader.compact_parks(df[RAW_COLUMNS])
+
+
+def write_scaled(base: pd.DataFrame, k: int, path: str):
+    """Write base cloned k times (see module notes) under path."""
+    parks = base["Park"].cat
+    names = [f"{p} #{i}" if i else p for i in range(k) for p in parks.categories]
+    codes = (
+        np.tile(parks.codes.to_numpy(np.int64), k)
+        + np.repeat(np.arange(k) * len(parks.categories), len(base))
+    )
+    scaled = pd.DataFrame({
+        "Park": pd.Categorical.from_codes(codes, names),
+        **{c: np.tile(base[c].to_numpy(), k) for c in RAW_COLUMNS[1:] if c != "Park Type"},
+        "Park Type": pd.Categorical.from_codes(
+            np.tile(base["Park Type"].cat.codes.to_numpy(), k), base["Park Type"].cat.categories
+        ),
+    })
+    ds.write_dataset(
+        pa.Table.from_pandas(scaled, preserve_index=False),
+        path,
+        format="parquet",
+        partitioning=["Year"],
+        partitioning_flavor="hive",
+    )
+
+
+# =========================================================
+# BACKENDS
+# =========================================================
+
+def memory_bundle(path: str):
+    table = ds.dataset(path, format="parquet", partitioning="hive").to_table(columns=RAW_COLUMNS)
+    df = loader.compact_parks(loader.clean_parks(table.to_pandas()))
+    return core.DataBundle(df)
+
+
+def memory_bytes(bundle) -> int:
+    cube = bundle.cube
+    return loader.frame_bytes(bundle.parks_df) + cube.visits.nbytes + cube.rows.nbytes
+
+
+def duckdb_bundle(path: str):
+    backend = DuckDbBackend(connect_local(dataset=path), core.REGIONS, core.state_codes, f"bench-{path}")
+    return core.DataBundle(backend=backend)
+
+
+def duckdb_bytes(bundle) -> int:
+    ((used,),) = bundle.backend.engine.execute("SELECT SUM(memory_usage_bytes) FROM duckdb_memory()").fetchall()
+    return int(used or 0)
+
+
+def legacy_totals(keys, month_val=None, year_val=None, region_val=None, dest_val=None, park_type_val=None):
+    df = core.current().parks_df
+    mask = np.ones(len(df), dtype=bool)
+    if year_val is not None:
+        mask &= (df["Year"] == int(year_val)).to_numpy()
+    if month_val is not None:
+        mask &= (df["Month"] == int(month_val)).to_numpy()
+    if region_val and region_val != "All":
+        mask &= df["State"].isin(set(core.REGIONS.get(region_val, []))).to_numpy()
+    if dest_val in ("National Park", "City"):
+        is_np = df["Park Type"].astype(str).str.contains("National Park", case=False, na=False).to_numpy()
+        mask &= is_np if dest_val == "National Park" else ~is_np
+    if park_type_val and park_type_val != "All":
+        mask &= (df["Park Type"] == park_type_val).to_numpy()
+    return df[mask].groupby(list(keys), as_index=False, observed=True)["Recreation Visits"].sum()
+
+
+# =========================================================
+# TIMING
+# =========================================================
+
+def filter_keys(bundle):
+    latest = int(max(y for y in bundle.years if y <= core.default_year()))
+    return [
+        (core.DEFAULT_MONTH, latest, "All", "All", "All"),
+        (1, latest - 3, "West", "National Park", "All"),
+        (10, latest - 8, "South", "City", "All"),
+    ]
+
+
+def time_changes(bundle, with_map=True):
+    """Mean ms per filter change: (rollups + KPIs, map status + top parks)."""
+    rollups = mapping = 0.0
+    keys = filter_keys(bundle)
+    with core.using(bundle):
+        for _ in range(REPEATS):
+            for key in keys:
+                core.invalidate_caches()
+                t0 = time.perf_counter()
+                core.FilterContext(key).compute()
+                t1 = time.perf_counter()
+                if with_map:
+                    core.build_base_map_df(*key)
+                rollups += t1 - t0
+                mapping += time.perf_counter() - t1
+    n = REPEATS * len(keys)
+    return rollups / n * 1e3, mapping / n * 1e3
+
+
+def peak_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def report(name, k, rows, setup=None, held=None, rollups=None, mapping=None, note=""):
+    def cell(value, fmt, width):
+        return f"{value:{width}{fmt}}" if value is not None else f"{'-':>{width}}"
+
+    print(
+        f"{k:>5}x{rows:>12,}  {name:<8}{cell(setup, '.2f', 9)}{cell(held and held / 1e6, '.1f', 10)}"
+        f"{cell(peak_mb() if not note else None, '.0f', 9)}{cell(rollups, '.1f', 12)}{cell(mapping, '.1f', 10)}"
+        f"{note}",
+        flush=True,
+    )
+
+
+def run_memory(path, k, rows):
+    t0 = time.perf_counter()
+    bundle = memory_bundle(path)
+    setup = time.perf_counter() - t0
+    bundle.warm_store = None
+    report("memory", k, rows, setup, memory_bytes(bundle), *time_changes(bundle))
+    core.totals = legacy_totals
+    report("pandas", k, rows, rollups=time_changes(bundle, with_map=False)[0])
+
+
+def run_duckdb(path, k, rows):
+    t0 = time.perf_counter()
+    bundle = duckdb_bundle(path)
+    setup = time.perf_counter() - t0
+    bundle.warm_store = None
+    report("duckdb", k, rows, setup, duckdb_bytes(bundle), *time_changes(bundle))
+
+
+def run_child(name, k, rows, target, *args):
+    child = multiprocessing.get_context("fork").Process(target=target, args=args)
+    child.start()
+    child.join()
+    if child.exitcode:
+        note = "  killed (out of memory)" if child.exitcode == -9 else f"  failed (exit {child.exitcode})"
+        report(name, k, rows, note=note)
+
+
+def main():
+    base = base_rows()
+    print(f"\nbase rows: {len(base):,}   repeats: {REPEATS}   scales: {SCALES}\n")
+    header = (
+        f"{'scale':>6}{'rows':>12}  {'backend':<8}{'setup s':>9}{'held MB':>10}{'peak MB':>9}"
+        f"{'rollups ms':>12}{'map ms':>10}"
+    )
+    print(header)
+    print("-" * len(header), flush=True)
+
+    for k in SCALES:
+        tmp = tempfile.mkdtemp(prefix=f"parks_x{k}_")
+        try:
+            path = os.path.join(tmp, "parks_dataset")
+            # in a child too, so the copies made while writing do not count
+            # towards the backends' peak memory
+            rows = len(base) * k
+            run_child("write", k, rows, write_scaled, base, k, path)
+            run_child("memory", k, rows, run_memory, path, k, rows)
+            run_child("duckdb", k, rows, run_duckdb, path, k, rows)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmark_builders.py
+#
+# Per-builder latency, before vs after the [park, year, month] cube:
+#   before -> copy parks_df + boolean scans + pandas groupby (old filter_parks)
+#   after  -> core.totals() rollups from core.DATA.cube
+#
+# "agg" columns only count time spent producing the grouped totals; the
+# rest is shaping those totals into chart data, identical in both.
+# Caches are cleared before every call so each run is a cold build; the
+# last column is the same call served from core.RESULT_CACHE.
+#
+# Run from the app/ folder:
+#   python ../scripts/benchmark_builders.py [repeats]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import core  # noqa: E402
+
+REPEATS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+FILTERS = (core.DEFAULT_MONTH, int(core.default_year()), "West", "State", "All")
+
+# What the callbacks run per filter change: chart trace updates (sent as a
+# Dash Patch) and the KPI dict.
+BUILDERS = {
+    "map": core.map_traces,
+    "heatmap": core.heatmap_traces,
+    "sparkline": lambda m, *rest: core.sparkline_traces(*rest),
+    "yearly trend": core.trend_traces,
+    "top5 parks": core.top5_traces,
+    "top park per year": core.top_states_traces,
+    "active parks": core.active_parks_traces,
+    "avg spend": core.avg_spend_traces,
+    "kpis": core.compute_kpis,
+}
+
+
+def legacy_filter(month_val=None, year_val=None, region_val=None, dest_val=None, park_type_val=None):
+    df = core.DATA.parks_df.copy()
+    if year_val is not None:
+        df = df[df["Year"] == int(year_val)]
+    if month_val is not None:
+        df = df[df["Month"] == int(month_val)]
+    if region_val and region_val != "All":
+        df = df[df["State"].isin(set(core.REGIONS.get(region_val, [])))]
+    if dest_val == "National Park":
+        df = df[df["Park Type"].str.contains("National Park", case=False, na=False)]
+    elif dest_val == "City":
+        df = df[~df["Park Type"].str.contains("National Park", case=False, na=False)]
+    if park_type_val and park_type_val != "All":
+        df = df[df["Park Type"] == park_type_val]
+    return df
+
+
+def legacy_totals(keys, *filters):
+    df = legacy_filter(*filters)
+    return df.groupby(list(keys), as_index=False)["Recreation Visits"].sum()
+
+
+def timed(totals_fn, agg_time):
+    def wrapper(keys, *filters):
+        t0 = time.perf_counter()
+        out = totals_fn(keys, *filters)
+        agg_time[0] += time.perf_counter() - t0
+        return out
+    return wrapper
+
+
+def run(totals_fn, builder):
+    agg_time = [0.0]
+    core.totals = timed(totals_fn, agg_time)
+    t0 = time.perf_counter()
+    for _ in range(REPEATS):
+        core.invalidate_caches()
+        builder(*FILTERS)
+    total = time.perf_counter() - t0
+    return total / REPEATS * 1e3, agg_time[0] / REPEATS * 1e3
+
+
+def run_cached(builder):
+    core.invalidate_caches()
+    builder(*FILTERS)
+    t0 = time.perf_counter()
+    for _ in range(REPEATS):
+        builder(*FILTERS)
+    return (time.perf_counter() - t0) / REPEATS * 1e3
+
+
+def main():
+    cube_totals = core.totals
+    core.DATA.warm_store = None  # measure live computation, not src.warm_cache hits
+    print(f"rows: {len(core.DATA.parks_df):,}   cube: {core.DATA.cube.visits.shape}   repeats: {REPEATS}")
+    print(f"filters: {FILTERS}\n")
+    header = f"{'builder':<20}{'before ms':>11}{'after ms':>11}{'agg before':>12}{'agg after':>11}{'agg x':>8}{'cached ms':>11}"
+    print(header)
+    print("-" * len(header))
+    try:
+        for name, builder in BUILDERS.items():
+            before, agg_before = run(legacy_totals, builder)
+            after, agg_after = run(cube_totals, builder)
+            speedup = agg_before / agg_after if agg_after else float("inf")
+            cached = run_cached(builder)
+            print(
+                f"{name:<20}{before:>11.2f}{after:>11.2f}"
+                f"{agg_before:>12.2f}{agg_after:>11.2f}{speedup:>8.1f}{cached:>11.3f}"
+            )
+    finally:
+        core.totals = cube_totals
+    print(f"\nresult cache: {core.RESULT_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main()